@@ -0,0 +1,136 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class AnalysisEvent:
+    """One pushed change: the fields that changed and the log's sequence number"""
+    __slots__ = ('seq', 'changes', 'timestamp')
+
+    def __init__(self, seq, changes, timestamp):
+        self.seq = seq
+        self.changes = changes
+        self.timestamp = timestamp
+
+
+class AnalysisEventLog:
+    """Per-session log of analysis deltas for Server-Sent Events
+
+    publish() merges fields into the current analysis state and records an
+    event holding only the fields whose value changed; publishing the same
+    values again records nothing. The last `history` events are kept so a
+    reconnecting client can resume from its Last-Event-ID. Event ids carry
+    the log's epoch, so ids from before a restart (or from another session)
+    are recognized and answered with a full snapshot instead.
+
+    Threads block in wait(); other consumers (e.g. an event loop) can
+    register a listener callback that is called on every publish and close.
+    """
+
+    def __init__(self, history=256):
+        self.state = {}
+        self.seq = 0
+        self._events = deque(maxlen=history)
+        self._condition = threading.Condition()
+        self._listeners = ()
+        self.closed = False
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self.published = 0
+        self.suppressed = 0
+
+    def event_id(self, seq):
+        return f"{self.epoch}-{seq}"
+
+    def parse_id(self, event_id):
+        """Sequence number of one of our event ids, or None"""
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.rpartition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def publish(self, fields):
+        """Merge fields into the state; returns the new event or None if nothing changed"""
+        with self._condition:
+            changes = {key: value for key, value in fields.items()
+                       if key not in self.state or self.state[key] != value}
+            if not changes:
+                self.suppressed += 1
+                return None
+            self.state.update(changes)
+            self.seq += 1
+            event = AnalysisEvent(self.seq, changes, time.time())
+            self._events.append(event)
+            self.published += 1
+            self._condition.notify_all()
+        self._notify()
+        return event
+
+    def snapshot(self):
+        """(seq, copy of the full state)"""
+        with self._condition:
+            return self.seq, dict(self.state)
+
+    def events_since(self, seq):
+        """Events after seq, or None if they are no longer (or never were) in the log"""
+        with self._condition:
+            return self._events_since(seq)
+
+    def _events_since(self, seq):
+        if seq is None or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self._events or self._events[0].seq > seq + 1:
+            return None
+        return [event for event in self._events if event.seq > seq]
+
+    def wait(self, seq, timeout=15.0):
+        """Block until there are events after seq (None if they fell out of the log)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.seq != seq or self.closed, timeout=timeout)
+            return self._events_since(seq)
+
+    def add_listener(self, callback):
+        """Call callback() after every publish (from the publishing thread)"""
+        with self._condition:
+            self._listeners = self._listeners + (callback,)
+
+    def remove_listener(self, callback):
+        with self._condition:
+            self._listeners = tuple(l for l in self._listeners if l is not callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                print(f"⚠️ Event listener failed: {e}")
+
+    def close(self):
+        """Wake waiting streams so they can end"""
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        self._notify()
+
+    def get_stats(self):
+        return {
+            "seq": self.seq,
+            "published": self.published,
+            "suppressed": self.suppressed,
+            "buffered": len(self._events)
+        }
+
+
+def format_sse(data, event_id=None, event=None):
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, separators=(',', ':'), default=str))
+    return ("\n".join(lines) + "\n\n").encode('utf-8')
@@ -1,20 +1,66 @@
-from flask import Flask, jsonify
-import numpy as np
+from flask import Flask, jsonify, request, Response, g
 from datetime import datetime
 import random
 import cv2
 import threading
 import time
-import base64
+import atexit
+import os
+from analysis_events import AnalysisEventLog, format_sse
+from frame_cache import EncodedFrameCache
+from frame_encoder import LadderEncoder, RungSelector, AUTO, shared_encoder_pool
+from frame_capture import FrameCapture
+from overlay import OverlayLayer, draw_text_panel
+from pose_detection.quality_controller import AdaptiveQualityController
+from session_manager import SessionManager, SessionLimitError, MAX_SESSIONS, SESSION_IDLE_TIMEOUT
+from stream_server import StreamServer
+from workout_store import WorkoutStore
+from ml_models.rep_engine import RepEngine
+from ml_models.form_rules import form_rules
+from ml_models.streaming_stats import RollingWindow
 
 app = Flask(__name__)
 
+# MJPEG streaming limits (per viewer)
+STREAM_DEFAULT_FPS = 15
+STREAM_MAX_FPS = 30
+JPEG_QUALITY = 95  # OpenCV's default, used by the original feed endpoints
+STREAM_DEFAULT_RUNG = AUTO
+
+# JPEG encoder threads shared by all sessions (and camera_service, if loaded)
+encoder_pool = shared_encoder_pool()
+
+# Server-Sent Events (analysis deltas)
+SSE_KEEPALIVE_S = 15.0
+SSE_RETRY_MS = 2000
+
+# asyncio server for the long-lived streams (Flask keeps serving them too)
+STREAM_PORT = int(os.environ.get('STREAM_PORT', 5001))
+
+# Per-client sessions
+SESSION_COOKIE = 'fitness_session'
+SESSION_HEADER = 'X-Session-ID'
+
+# Workouts, sets and reps persist across sessions and restarts; writes are
+# batched onto disk by the store's background writer
+USER_HEADER = 'X-User-ID'
+WORKOUT_DB = os.environ.get('WORKOUT_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workouts.db'))
+workout_store = WorkoutStore(WORKOUT_DB)
+atexit.register(workout_store.close)
+
 # Enable CORS manually
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
+    response.headers.add('Access-Control-Allow-Headers', f'Content-Type,Authorization,{SESSION_HEADER},{USER_HEADER}')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    response.headers.add('Access-Control-Expose-Headers', SESSION_HEADER)
+    
+    # Hand newly created sessions back to the client
+    new_session_id = g.get('new_session_id')
+    if new_session_id:
+        response.headers[SESSION_HEADER] = new_session_id
+        response.set_cookie(SESSION_COOKIE, new_session_id, httponly=True, samesite='Lax')
     return response
 
 # Simple ML Models (defined inline to avoid import issues)
@@ -54,99 +100,25 @@ class SimpleFormAnalyzer:
         
     def analyze_form(self, angles, exercise_type):
         """Simple form analysis"""
-        if exercise_type == "squats":
-            return self._analyze_squat(angles)
-        elif exercise_type == "pushups":
-            return self._analyze_pushup(angles)
-        else:
-            return {"form_score": 75, "feedback": ["Basic analysis"]}
-    
-    def _analyze_squat(self, angles):
-        """Analyze squat form"""
-        avg_knee = (angles['left_knee'] + angles['right_knee']) / 2
-        avg_hip = (angles['left_hip'] + angles['right_hip']) / 2
-        
-        feedback = []
-        score = 100
-        
-        # Depth analysis
-        if avg_knee > 140:
-            feedback.append("⬇️ Go deeper")
-            score -= 20
-        elif avg_knee < 80:
-            feedback.append("🔥 Perfect depth!")
-            score += 5
-            
-        # Posture analysis
-        if avg_hip < 80:
-            feedback.append("🚨 Back rounding!")
-            score -= 30
-        elif avg_hip < 100:
-            feedback.append("📐 Maintain spine")
-            score -= 10
-            
-        # Symmetry
-        knee_diff = abs(angles['left_knee'] - angles['right_knee'])
-        if knee_diff > 15:
-            feedback.append("⚖️ Knee asymmetry")
-            score -= 10
-            
-        return {
-            "form_score": max(score, 0),
-            "feedback": feedback,
-            "metrics": {
-                "depth": avg_knee,
-                "posture": avg_hip,
-                "symmetry": 100 - knee_diff
-            }
-        }
-    
-    def _analyze_pushup(self, angles):
-        """Analyze push-up form"""
-        avg_elbow = (angles['left_elbow'] + angles['right_elbow']) / 2
-        avg_hip = (angles['left_hip'] + angles['right_hip']) / 2
-        
-        feedback = []
-        score = 100
-        
-        # Depth analysis
-        if avg_elbow > 120:
-            feedback.append("⬇️ Go lower")
-            score -= 25
-        elif avg_elbow < 90:
-            feedback.append("🔥 Chest to ground!")
-            score += 5
-            
-        # Body alignment
-        if avg_hip < 150:
-            feedback.append("🚨 Don't sag hips!")
-            score -= 30
-            
-        return {
-            "form_score": max(score, 0),
-            "feedback": feedback,
-            "metrics": {
-                "depth": avg_elbow,
-                "alignment": avg_hip
-            }
-        }
+        if form_rules.supports(exercise_type):
+            return form_rules.analyze(angles, exercise_type)
+        return {"form_score": 75, "feedback": ["Basic analysis"]}
 
 class SimpleFatigueDetector:
     def __init__(self):
-        self.form_scores = []
+        # Last 10 scores; running sums of the oldest and newest five
+        self.form_scores = RollingWindow(10, heads=(5,), tails=(5,))
         self.fatigue_level = 0
         
     def analyze_fatigue(self, form_score):
         """Simple fatigue detection"""
-        self.form_scores.append(form_score)
-        if len(self.form_scores) > 10:
-            self.form_scores.pop(0)
+        self.form_scores.push(form_score)
             
         # Calculate fatigue based on form degradation
         if len(self.form_scores) >= 5:
-            recent_avg = np.mean(self.form_scores[-5:])
+            recent_avg = self.form_scores.tail_mean(5)
             if len(self.form_scores) >= 10:
-                older_avg = np.mean(self.form_scores[:5])
+                older_avg = self.form_scores.head_mean(5)
                 if recent_avg < older_avg - 10:
                     self.fatigue_level = min(100, self.fatigue_level + 20)
                 else:
@@ -166,19 +138,44 @@ class SimpleFatigueDetector:
         }
 
 class MLEnhancedFitnessAI:
-    def __init__(self):
+    def __init__(self, latency_budget_ms=12.0, encoder_pool=None, workout_store=None):
         self.exercise_counts = {"squats": 0, "pushups": 0, "lunges": 0}
-        self.workout_history = []
+        self.workout_store = workout_store
+        self.workout_id = None
+        self.user_id = None
+        self.session_id = None
         self.workout_active = False
         self.camera_active = False
         self.camera = None
         self.current_frame = None
         self.camera_thread = None
+        self.capture = None
+        self.frame_reader = None
+        self.frame_seq = 0
+        self.frame_condition = threading.Condition()
+        self.frame_listeners = ()
+        self.frame_cache = EncodedFrameCache()
+        
+        # Streams' resolution/quality rungs are encoded ahead on the pool
+        self.encoder = LadderEncoder(self.frame_cache, encoder_pool)
+        
+        # Analysis overlay, re-rendered only when the analysis changes and
+        # composited once per captured frame
+        self.overlay = OverlayLayer()
+        self.analysis_version = 0
+        self.annotated_frame = None
+        
+        # Analysis cadence adapts to the per-session latency budget
+        self.quality = AdaptiveQualityController(budget_ms=latency_budget_ms)
         
         # Initialize simple ML models
         self.pose_detector = SimplePoseDetector()
         self.form_analyzer = SimpleFormAnalyzer()
         self.fatigue_detector = SimpleFatigueDetector()
+        self.rep_engine = RepEngine()
+        
+        # Analysis changes pushed to /api/events subscribers
+        self.events = AnalysisEventLog()
         
     def start_camera(self):
         """Start real camera with ML analysis"""
@@ -194,6 +191,9 @@ class MLEnhancedFitnessAI:
             
             if self.camera.isOpened():
                 self.camera_active = True
+                self.capture = FrameCapture(self.camera)
+                self.frame_reader = self.capture.reader()
+                self.capture.start()
                 self.camera_thread = threading.Thread(target=self._camera_loop)
                 self.camera_thread.daemon = True
                 self.camera_thread.start()
@@ -210,19 +210,66 @@ class MLEnhancedFitnessAI:
             return {"error": f"Camera error: {str(e)}", "mode": "ml_simulation"}
     
     def _camera_loop(self):
-        """Camera loop with ML"""
+        """Camera loop with ML, fed with the freshest frame by the capture thread"""
         frame_count = 0
-        while self.camera_active and self.camera and self.camera.isOpened():
-            ret, frame = self.camera.read()
-            if ret:
-                self.current_frame = frame
-                frame_count += 1
-                
-                # Perform ML analysis every 5 frames
-                if frame_count % 5 == 0:
-                    self._ml_analysis_cycle()
-                    
-            time.sleep(0.033)  # ~30 FPS for smooth video
+        while self.camera_active and self.capture.running:
+            frame = self.frame_reader.read(timeout=1.0)
+            if frame is None:
+                continue
+            # Streams and encoders read the frame later; the ring slot gets reused
+            frame = frame.copy()
+            annotated = self._annotate(frame.image)
+            with self.frame_condition:
+                self.current_frame = frame.image
+                self.annotated_frame = annotated
+                self.frame_seq = frame.seq
+                self.frame_condition.notify_all()
+            self.encoder.publish(frame.seq, {'raw': frame.image, 'analysis': annotated})
+            for listener in self.frame_listeners:
+                listener(frame.seq, frame.image, annotated)
+            frame_count += 1
+            
+            # Perform ML analysis on the controller's stride
+            if self.quality.should_analyze(frame_count):
+                start = time.perf_counter()
+                self._ml_analysis_cycle()
+                self.quality.record(time.perf_counter() - start)
+    
+    def _annotate(self, image):
+        """Composite the analysis overlay onto a captured frame"""
+        version = self.analysis_version
+        if not self.overlay.is_current(version, image.shape):
+            analysis = getattr(self, 'latest_ml_analysis', None)
+            self.overlay.render(image.shape, version, draw_text_panel(analysis_overlay_lines(analysis)))
+        return self.overlay.composite(image)
+    
+    def add_frame_listener(self, listener):
+        """Call listener(seq, raw, annotated) from the camera loop for every frame"""
+        self.frame_listeners = self.frame_listeners + (listener,)
+    
+    def remove_frame_listener(self, listener):
+        self.frame_listeners = tuple(l for l in self.frame_listeners if l != listener)
+    
+    def wait_for_frame(self, last_seq, timeout=1.0, with_analysis=False):
+        """Block until a frame newer than last_seq is captured"""
+        with self.frame_condition:
+            self.frame_condition.wait_for(
+                lambda: self.frame_seq != last_seq or not self.camera_active,
+                timeout=timeout
+            )
+            if self.frame_seq == last_seq:
+                return last_seq, None
+            return self.frame_seq, self.annotated_frame if with_analysis else self.current_frame
+    
+    def get_latest_frame(self, with_analysis=False):
+        """Return (seq, frame) for the most recent captured (or annotated) frame"""
+        with self.frame_condition:
+            return self.frame_seq, self.annotated_frame if with_analysis else self.current_frame
+    
+    def encode_frame(self, seq, frame, with_analysis=False, quality=JPEG_QUALITY):
+        """JPEG-encode a captured (or annotated) frame once per (seq, variant, quality)"""
+        variant = 'analysis' if with_analysis else 'raw'
+        return self.frame_cache.get(seq, frame, quality, variant=variant)
     
     def _ml_analysis_cycle(self):
         """Perform ML analysis cycle"""
@@ -244,6 +291,15 @@ class MLEnhancedFitnessAI:
                 "error": f"ML analysis error: {str(e)}",
                 "mode": "real_camera_ml"
             }
+        self.analysis_version += 1
+        
+        analysis = self.latest_ml_analysis
+        self.events.publish({
+            "pose_detected": analysis.get("pose_detected", False),
+            "state": analysis.get("state"),
+            "angles": {k: round(v, 1) for k, v in analysis.get("angles", {}).items()},
+            "error": analysis.get("error")
+        })
     
     def analyze_exercise_ml(self, exercise_type):
         """Analyze exercise using ML models"""
@@ -259,15 +315,26 @@ class MLEnhancedFitnessAI:
         # Fatigue analysis
         fatigue_analysis = self.fatigue_detector.analyze_fatigue(form_analysis['form_score'])
         
-        # Count rep if in good position
-        should_count = False
-        if exercise_type == "squats" and state in ["full_squat", "half_squat"]:
-            should_count = True
-        elif exercise_type == "pushups" and state == "pushup":
-            should_count = True
-            
+        # A rep counts once the exercise's driving angle goes down and back up
+        completed = self.rep_engine.update_dict(angles, time.monotonic())
+        should_count = exercise_type in completed
         if should_count:
             self.exercise_counts[exercise_type] += 1
+            if self.workout_active and self.workout_store:
+                self.workout_store.record_rep(
+                    self.workout_id, exercise_type, self.exercise_counts[exercise_type],
+                    form_score=form_analysis['form_score'],
+                    fatigue_level=fatigue_analysis['fatigue_level']
+                )
+        
+        self.events.publish({
+            "exercise": exercise_type,
+            "rep_counts": dict(self.exercise_counts),
+            "form_score": form_analysis['form_score'],
+            "feedback": form_analysis['feedback'],
+            "fatigue_level": fatigue_analysis['fatigue_level'],
+            "recommendation": fatigue_analysis['recommendation']
+        })
         
         return {
             "exercise": exercise_type,
@@ -285,25 +352,72 @@ class MLEnhancedFitnessAI:
             "status": "success"
         }
     
-    def start_workout(self):
+    def start_workout(self, user_id=None, session_id=None):
+        if self.workout_active:
+            self.end_workout()
+        self.user_id = user_id
+        self.session_id = session_id
+        if self.workout_store:
+            self.workout_id = self.workout_store.start_workout(user_id, session_id)
         self.workout_active = True
         self.exercise_counts = {"squats": 0, "pushups": 0, "lunges": 0}
+        self.rep_engine.reset()
         self.fatigue_detector.fatigue_level = 0
-        return {"message": "🏋️ Workout started with ML!", "status": "active"}
+        self.events.publish({
+            "workout_active": True,
+            "rep_counts": dict(self.exercise_counts),
+            "fatigue_level": 0
+        })
+        return {"message": "🏋️ Workout started with ML!", "status": "active", "workout_id": self.workout_id}
+    
+    def end_workout(self):
+        """Finish the active workout; its row is written by the store in the background"""
+        if not self.workout_active:
+            return None
+        self.workout_active = False
+        self.events.publish({"workout_active": False})
+        workout_data = {
+            "workout_id": self.workout_id,
+            "date": datetime.now().strftime("%Y-%m-%d"),
+            "exercises": self.exercise_counts.copy(),
+            "total_reps": sum(self.exercise_counts.values()),
+            "final_fatigue": self.fatigue_detector.fatigue_level
+        }
+        if self.workout_store:
+            self.workout_store.end_workout(self.workout_id, workout_data["total_reps"], workout_data["final_fatigue"])
+        return workout_data
     
     def stop_camera(self):
         self.camera_active = False
+        with self.frame_condition:
+            self.frame_condition.notify_all()
+        if self.capture:
+            self.capture.stop()
         if self.camera:
             self.camera.release()
         cv2.destroyAllWindows()
         return {"message": "📹 Camera stopped"}
     
+    def close(self):
+        """Release the camera, save any active workout and end event streams (session closed)"""
+        if self.camera_active:
+            self.stop_camera()
+        self.end_workout()
+        self.events.close()
+    
     def get_camera_status(self):
         if self.camera_active:
             return {
                 "camera_active": True,
                 "mode": "real_camera_ml",
-                "message": "📹 Camera with ML active"
+                "message": "📹 Camera with ML active",
+                "frame_seq": self.frame_seq,
+                "capture": {**self.capture.get_stats(), **self.frame_reader.get_stats()},
+                "quality": self.quality.get_status(),
+                "frame_cache": self.frame_cache.get_stats(),
+                "encoder": self.encoder.get_stats(),
+                "events": self.events.get_stats(),
+                "overlay": self.overlay.get_stats()
             }
         else:
             return {
@@ -312,30 +426,134 @@ class MLEnhancedFitnessAI:
                 "message": "Camera not started"
             }
 
-# Initialize AI
-fitness_ai = MLEnhancedFitnessAI()
+# Each client gets its own MLEnhancedFitnessAI (camera, detectors, counters)
+sessions = SessionManager(
+    lambda: MLEnhancedFitnessAI(encoder_pool=encoder_pool, workout_store=workout_store),
+    max_sessions=MAX_SESSIONS,
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    close=lambda ai: ai.close()
+)
+
+stream_server = StreamServer(
+    sessions,
+    port=STREAM_PORT,
+    default_fps=STREAM_DEFAULT_FPS,
+    max_fps=STREAM_MAX_FPS,
+    default_rung=STREAM_DEFAULT_RUNG,
+    keepalive_s=SSE_KEEPALIVE_S,
+    retry_ms=SSE_RETRY_MS,
+    session_header=SESSION_HEADER,
+    session_cookie=SESSION_COOKIE
+)
+
+def _requested_session_id():
+    return (request.headers.get(SESSION_HEADER)
+            or request.args.get('session_id')
+            or request.cookies.get(SESSION_COOKIE))
+
+def _requested_user_id():
+    return request.headers.get(USER_HEADER) or request.args.get('user_id')
+
+def current_session():
+    """Return the caller's MLEnhancedFitnessAI, creating a session if needed"""
+    if 'fitness_session' not in g:
+        session_id = _requested_session_id()
+        session = sessions.get(session_id) if session_id else None
+        if session is None:
+            session = sessions.create()
+            g.new_session_id = session.session_id
+        g.fitness_session = session
+    return g.fitness_session.state
+
+@app.errorhandler(SessionLimitError)
+def session_limit_reached(e):
+    return jsonify({"error": str(e), "status": "error"}), 503
+
+# ========== SESSION ENDPOINTS ==========
+
+@app.route('/api/session', methods=['GET', 'POST'])
+def session_info():
+    """Create (POST) or look up (GET) the caller's session"""
+    if request.method == 'POST':
+        session = sessions.create()
+        g.new_session_id = session.session_id
+    else:
+        current_session()
+        session = g.fitness_session
+    return jsonify({**session.describe(), "status": "success"})
+
+@app.route('/api/session', methods=['DELETE'])
+def end_session():
+    """End the caller's session and release its camera"""
+    session_id = _requested_session_id()
+    if session_id and sessions.close(session_id):
+        response = jsonify({"message": "👋 Session ended", "status": "success"})
+        response.delete_cookie(SESSION_COOKIE)
+        return response
+    return jsonify({"error": "No such session", "status": "error"}), 404
+
+@app.route('/api/sessions')
+def list_sessions():
+    return jsonify(sessions.get_stats())
+
+@app.route('/api/streams')
+def list_streams():
+    """asyncio stream server status with per-client queue depth and drops"""
+    return jsonify(stream_server.get_stats())
 
 # ========== VIDEO STREAMING ENDPOINTS ==========
 
-@app.route('/api/camera/feed')
-def get_camera_feed():
-    """Get current camera frame as base64 image"""
-    try:
-        if fitness_ai.camera_active and fitness_ai.current_frame is not None:
-            # Encode frame as JPEG
-            ret, buffer = cv2.imencode('.jpg', fitness_ai.current_frame)
-            if ret:
-                jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-                return jsonify({
-                    "frame": f"data:image/jpeg;base64,{jpg_as_text}",
-                    "timestamp": time.time(),
-                    "status": "success"
-                })
-        
+def _frame_feed_response(with_analysis):
+    """JSON frame response that honours If-None-Match with a 304"""
+    fitness_ai = current_session()
+    seq, frame = fitness_ai.get_latest_frame(with_analysis)
+    if not fitness_ai.camera_active or frame is None:
         return jsonify({
             "error": "No camera feed available",
             "status": "error"
         })
+    
+    variant = 'analysis' if with_analysis else 'raw'
+    rung = request.args.get('rung')
+    if rung:
+        # A ladder rung picks both size and quality
+        try:
+            etag = fitness_ai.encoder.make_etag(seq, frame.shape, variant, rung)
+        except ValueError as e:
+            return jsonify({"error": str(e), "status": "error"}), 400
+    else:
+        quality = request.args.get('quality', JPEG_QUALITY, type=int)
+        quality = max(10, min(quality, 100))
+        etag = fitness_ai.frame_cache.make_etag(seq, variant, quality)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    if rung:
+        encoded = fitness_ai.encoder.encode(seq, frame, variant, rung)
+    else:
+        encoded = fitness_ai.encode_frame(seq, frame, with_analysis, quality)
+    if encoded is None:
+        return jsonify({"error": "Frame encoding failed", "status": "error"})
+    
+    payload = {
+        "frame": encoded.data_uri,
+        "seq": seq,
+        "timestamp": time.time(),
+        "status": "success"
+    }
+    if with_analysis:
+        payload["ml_analysis"] = getattr(fitness_ai, 'latest_ml_analysis', {})
+    response = jsonify(payload)
+    response.set_etag(encoded.etag)
+    return response
+
+@app.route('/api/camera/feed')
+def get_camera_feed():
+    """Get current camera frame as base64 image"""
+    try:
+        return _frame_feed_response(with_analysis=False)
     except Exception as e:
         return jsonify({"error": f"Feed error: {str(e)}", "status": "error"})
 
@@ -343,43 +561,167 @@ def get_camera_feed():
 def get_camera_feed_with_analysis():
     """Get camera feed with ML analysis overlay"""
     try:
-        if fitness_ai.camera_active and fitness_ai.current_frame is not None:
-            frame = fitness_ai.current_frame.copy()
+        return _frame_feed_response(with_analysis=True)
+    except Exception as e:
+        return jsonify({"error": f"Feed error: {str(e)}", "status": "error"})
+
+@app.route('/api/camera/analysis')
+def get_camera_analysis():
+    """Get latest ML analysis without a frame"""
+    fitness_ai = current_session()
+    if fitness_ai.camera_active and hasattr(fitness_ai, 'latest_ml_analysis'):
+        return jsonify({
+            "ml_analysis": fitness_ai.latest_ml_analysis,
+            "timestamp": time.time(),
+            "status": "success"
+        })
+    return jsonify({"error": "No ML analysis available", "status": "error"})
+
+def generate_analysis_events(session, last_event_id=None):
+    """Yield SSE messages for a session's analysis changes
+    
+    A new client (or one whose Last-Event-ID can no longer be replayed)
+    first gets a 'snapshot' of the full state; after that every message is
+    an 'analysis' event with just the changed fields.
+    """
+    log = session.state.events
+    seq = log.parse_id(last_event_id)
+    events = log.events_since(seq)
+    yield f"retry: {SSE_RETRY_MS}\n\n".encode()
+    while not log.closed:
+        if events is None:
+            seq, state = log.snapshot()
+            yield format_sse({**state, "seq": seq}, log.event_id(seq), event='snapshot')
+        elif events:
+            for event in events:
+                yield format_sse({**event.changes, "seq": event.seq, "timestamp": event.timestamp},
+                                 log.event_id(event.seq), event='analysis')
+            seq = events[-1].seq
+        else:
+            # Comment line: keeps proxies from timing out and detects gone clients
+            yield b": keepalive\n\n"
+        
+        # An open event stream keeps the session from being evicted as idle
+        session.touch()
+        events = log.wait(seq, timeout=SSE_KEEPALIVE_S)
+
+@app.route('/api/events')
+def analysis_event_stream():
+    """Push analysis changes as Server-Sent Events (resumes from Last-Event-ID)"""
+    current_session()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return Response(
+        generate_analysis_events(g.fitness_session, last_event_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def analysis_overlay_lines(ml_data):
+    """Overlay text lines (text, colour, scale) for the ML analysis"""
+    if not ml_data:
+        return []
+    lines = [("AI Fitness Coach - Live ML Analysis", (0, 255, 0), 0.7)]
+    if 'angles' in ml_data:
+        angles = ml_data['angles']
+        lines += [
+            (f"Knee Angle: {angles.get('left_knee', 0):.1f}°", (255, 255, 255), 0.6),
+            (f"Elbow Angle: {angles.get('left_elbow', 0):.1f}°", (255, 255, 255), 0.6),
+            (f"State: {ml_data.get('state', 'unknown')}", (255, 255, 255), 0.6),
+        ]
+    return lines
+
+def generate_mjpeg(session, max_fps, with_analysis=False, rung=STREAM_DEFAULT_RUNG):
+    """Yield multipart JPEG parts as the capture thread produces frames
+    
+    rung is a ladder rung name, or 'auto' to follow the throughput the viewer
+    actually takes (bytes over wall time, see RungSelector).
+    """
+    ai = session.state
+    variant = 'analysis' if with_analysis else 'raw'
+    selector = RungSelector(ai.encoder, max_fps) if rung == AUTO else None
+    subscription = ai.encoder.subscribe(variant, selector.rung if selector else rung, max_fps)
+    min_interval = 1.0 / max_fps
+    last_seq = 0
+    last_sent = 0.0
+    try:
+        while ai.camera_active:
+            # An open stream keeps the session from being evicted as idle
+            session.touch()
             
-            # Add ML analysis information to the frame
-            if hasattr(fitness_ai, 'latest_ml_analysis'):
-                ml_data = fitness_ai.latest_ml_analysis
-                
-                # Add text overlay with ML data
-                cv2.putText(frame, "AI Fitness Coach - Live ML Analysis", (10, 30), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                
-                if 'angles' in ml_data:
-                    angles = ml_data['angles']
-                    cv2.putText(frame, f"Knee Angle: {angles.get('left_knee', 0):.1f}°", 
-                               (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(frame, f"Elbow Angle: {angles.get('left_elbow', 0):.1f}°", 
-                               (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-                    cv2.putText(frame, f"State: {ml_data.get('state', 'unknown')}", 
-                               (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            # Throttle to this viewer's frame rate before waiting for a new frame
+            delay = min_interval - (time.monotonic() - last_sent)
+            if delay > 0:
+                time.sleep(delay)
             
-            # Encode the enhanced frame
-            ret, buffer = cv2.imencode('.jpg', frame)
-            if ret:
-                jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-                return jsonify({
-                    "frame": f"data:image/jpeg;base64,{jpg_as_text}",
-                    "ml_analysis": getattr(fitness_ai, 'latest_ml_analysis', {}),
-                    "timestamp": time.time(),
-                    "status": "success"
-                })
-        
+            seq, frame = ai.wait_for_frame(last_seq, with_analysis=with_analysis)
+            if frame is None:
+                continue
+            last_seq = seq
+            
+            encoded = ai.encoder.encode(seq, frame, variant, subscription.rung)
+            if encoded is None:
+                continue
+            
+            last_sent = time.monotonic()
+            jpeg = encoded.jpeg
+            part = (b'--frame\r\n'
+                    b'Content-Type: image/jpeg\r\n'
+                    b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' +
+                    jpeg + b'\r\n')
+            yield part
+            
+            # The generator resumes once the server has handed the part to the
+            # socket, which blocks only when the viewer falls behind
+            if selector:
+                written = time.monotonic()
+                subscription.switch(selector.record(len(part), written - last_sent, now=written))
+    finally:
+        subscription.close()
+
+def _stream_response(with_analysis):
+    """Build a multipart/x-mixed-replace response for the camera stream"""
+    fitness_ai = current_session()
+    if not fitness_ai.camera_active:
+        return jsonify({"error": "No camera feed available", "status": "error"}), 503
+    
+    fps = request.args.get('fps', STREAM_DEFAULT_FPS, type=float)
+    fps = max(1.0, min(fps, STREAM_MAX_FPS))
+    rung = request.args.get('rung', STREAM_DEFAULT_RUNG)
+    if rung != AUTO and rung not in fitness_ai.encoder.rungs:
         return jsonify({
-            "error": "No camera feed available",
+            "error": f"Unknown rung '{rung}'",
+            "rungs": [AUTO] + list(fitness_ai.encoder.rungs),
             "status": "error"
-        })
-    except Exception as e:
-        return jsonify({"error": f"Feed error: {str(e)}", "status": "error"})
+        }), 400
+    return Response(
+        generate_mjpeg(g.fitness_session, fps, with_analysis, rung),
+        mimetype='multipart/x-mixed-replace; boundary=frame',
+        headers={'Cache-Control': 'no-cache, no-store'}
+    )
+
+@app.route('/api/camera/ladder')
+def camera_ladder():
+    """Resolution/quality rungs a stream or feed can ask for with ?rung="""
+    fitness_ai = current_session()
+    return jsonify({
+        "rungs": [
+            {"name": rung.name, "scale": rung.scale, "quality": rung.quality,
+             "typical_bytes": int(fitness_ai.encoder.frame_bytes.get(rung.name, 0)) or None}
+            for rung in fitness_ai.encoder.ladder
+        ],
+        "default": STREAM_DEFAULT_RUNG,
+        "status": "success"
+    })
+
+@app.route('/api/camera/stream')
+def camera_stream():
+    """Stream raw camera frames as MJPEG (?fps= caps the viewer frame rate, ?rung= picks size/quality)"""
+    return _stream_response(with_analysis=False)
+
+@app.route('/api/camera/stream-with-analysis')
+def camera_stream_with_analysis():
+    """Stream camera frames with the ML overlay as MJPEG"""
+    return _stream_response(with_analysis=True)
 
 # ========== VIDEO DEMO PAGE ==========
 
@@ -534,45 +876,53 @@ def video_demo():
         </div>
 
         <script>
-            let videoInterval;
-            let analysisInterval;
+            let analysisEvents;
+            let mlState = {};
+            let streamBase = '';
+            let streamQuery = '';
             
-            // Video streaming functions
-            async function startVideoStream() {
-                videoInterval = setInterval(async () => {
-                    try {
-                        const response = await fetch('/api/camera/feed');
-                        const data = await response.json();
-                        if (data.status === 'success') {
-                            document.getElementById('videoFrame').src = data.frame;
-                            updateCameraStatus(true);
-                        }
-                    } catch (error) {
-                        console.error('Video stream error:', error);
+            // Prefer the asyncio stream server for the long-lived streams
+            async function resolveStreamServer() {
+                try {
+                    const info = await (await fetch('/api/streams')).json();
+                    if (info.running) {
+                        const session = await (await fetch('/api/session')).json();
+                        streamBase = `${location.protocol}//${location.hostname}:${info.port}`;
+                        streamQuery = `session_id=${session.session_id}&`;
                     }
-                }, 100); // 10 FPS
+                } catch (error) {
+                    console.error('Stream server lookup failed:', error);
+                }
             }
             
-            async function startAnalysisStream() {
-                analysisInterval = setInterval(async () => {
-                    try {
-                        const response = await fetch('/api/camera/feed-with-analysis');
-                        const data = await response.json();
-                        if (data.status === 'success') {
-                            document.getElementById('analysisFrame').src = data.frame;
-                            if (data.ml_analysis) {
-                                updateMLAnalysis(data.ml_analysis);
-                            }
-                        }
-                    } catch (error) {
-                        console.error('Analysis stream error:', error);
-                    }
-                }, 200); // 5 FPS for analysis
+            // Video streaming functions (MJPEG pushed by the server)
+            function startVideoStream() {
+                document.getElementById('videoFrame').src =
+                    streamBase + '/api/camera/stream?' + streamQuery + 'fps=15&t=' + Date.now();
+                updateCameraStatus(true);
+            }
+            
+            function startAnalysisStream() {
+                document.getElementById('analysisFrame').src =
+                    streamBase + '/api/camera/stream-with-analysis?' + streamQuery + 'fps=10&t=' + Date.now();
+                
+                // Analysis changes are pushed; EventSource resumes with Last-Event-ID
+                if (analysisEvents) analysisEvents.close();
+                analysisEvents = new EventSource(streamBase + '/api/events?' + streamQuery);
+                analysisEvents.addEventListener('snapshot', (event) => {
+                    mlState = JSON.parse(event.data);
+                    updateMLAnalysis(mlState);
+                });
+                analysisEvents.addEventListener('analysis', (event) => {
+                    Object.assign(mlState, JSON.parse(event.data));
+                    updateMLAnalysis(mlState);
+                });
+                analysisEvents.onerror = () => console.error('Analysis stream interrupted, reconnecting...');
             }
             
             function stopVideoStreams() {
-                if (videoInterval) clearInterval(videoInterval);
-                if (analysisInterval) clearInterval(analysisInterval);
+                if (analysisEvents) analysisEvents.close();
+                analysisEvents = null;
                 document.getElementById('videoFrame').src = '';
                 document.getElementById('analysisFrame').src = '';
                 updateCameraStatus(false);
@@ -585,6 +935,7 @@ def video_demo():
                     const data = await response.json();
                     
                     if (data.mode && data.mode.includes('camera')) {
+                        await resolveStreamServer();
                         startVideoStream();
                         startAnalysisStream();
                     }
@@ -684,10 +1035,17 @@ def home():
         "features": ["live_video", "ml_analysis", "real_time_feedback"],
         "endpoints": [
             "/video-demo",
+            "/api/session",
             "/api/camera/start",
+            "/api/camera/stream",
+            "/api/camera/stream-with-analysis",
+            "/api/events",
+            "/api/streams",
             "/api/analyze/squats", 
             "/api/workout/start",
-            "/api/stats"
+            "/api/workouts",
+            "/api/stats",
+            "/api/stats/history"
         ]
     })
 
@@ -697,81 +1055,127 @@ def health():
         "status": "healthy", 
         "ai_ready": True, 
         "camera_capable": True,
-        "video_streaming": True
+        "video_streaming": True,
+        "mjpeg_streaming": True,
+        "workout_store": workout_store.get_stats()
     })
 
 # 🎥 CAMERA ENDPOINTS
 @app.route('/api/camera/start')
 def start_camera():
+    fitness_ai = current_session()
+    budget_ms = request.args.get('budget_ms', type=float)
+    if budget_ms and budget_ms > 0:
+        fitness_ai.quality.budget_ms = budget_ms
     result = fitness_ai.start_camera()
     return jsonify(result)
 
 @app.route('/api/camera/stop')
 def stop_camera():
+    fitness_ai = current_session()
     result = fitness_ai.stop_camera()
     return jsonify(result)
 
 @app.route('/api/camera/status')
 def camera_status():
+    fitness_ai = current_session()
     result = fitness_ai.get_camera_status()
     return jsonify(result)
 
 # 🏋️ EXERCISE ANALYSIS WITH ML
 @app.route('/api/analyze/<exercise>')
 def analyze_exercise(exercise):
+    fitness_ai = current_session()
     result = fitness_ai.analyze_exercise_ml(exercise)
     return jsonify(result)
 
 # 📊 WORKOUT MANAGEMENT
 @app.route('/api/workout/start')
 def start_workout():
-    result = fitness_ai.start_workout()
+    fitness_ai = current_session()
+    result = fitness_ai.start_workout(_requested_user_id(), g.fitness_session.session_id)
     return jsonify(result)
 
 @app.route('/api/workout/end')
 def end_workout():
-    if fitness_ai.workout_active:
-        fitness_ai.workout_active = False
-        workout_data = {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "exercises": fitness_ai.exercise_counts.copy(),
-            "total_reps": sum(fitness_ai.exercise_counts.values()),
-            "final_fatigue": fitness_ai.fatigue_detector.fatigue_level
-        }
-        fitness_ai.workout_history.append(workout_data)
+    fitness_ai = current_session()
+    workout_data = fitness_ai.end_workout()
+    if workout_data:
         return jsonify({"message": "✅ Workout saved!", "summary": workout_data})
     return jsonify({"error": "No active workout"})
 
 @app.route('/api/workout/summary')
 def workout_summary():
+    fitness_ai = current_session()
     return jsonify({
         "workout_active": fitness_ai.workout_active,
         "exercise_counts": fitness_ai.exercise_counts,
         "total_reps": sum(fitness_ai.exercise_counts.values()),
         "camera_active": fitness_ai.camera_active,
-        "current_fatigue": fitness_ai.fatigue_detector.fatigue_level
+        "current_fatigue": fitness_ai.fatigue_detector.fatigue_level,
+        "analysis_quality": fitness_ai.quality.get_status()
     })
 
 @app.route('/api/stats')
 def get_stats():
-    total_workout_reps = sum(
-        sum(workout["exercises"].values()) 
-        for workout in fitness_ai.workout_history
-    )
-    current_reps = sum(fitness_ai.exercise_counts.values())
+    fitness_ai = current_session()
+    # Precomputed rollup: one primary-key lookup however long the history is
+    history = workout_store.totals(_requested_user_id() or fitness_ai.user_id, g.fitness_session.session_id)
+    # Reps counted during a workout are already in the rollup
+    unsaved_reps = 0 if fitness_ai.workout_id else sum(fitness_ai.exercise_counts.values())
     
     return jsonify({
         "current_workout": fitness_ai.exercise_counts,
-        "total_workouts": len(fitness_ai.workout_history),
-        "total_reps_all_time": total_workout_reps + current_reps,
+        "total_workouts": history["workouts"],
+        "total_reps_all_time": history["reps"] + unsaved_reps,
+        "avg_form_score_all_time": history["avg_form_score"],
+        "peak_fatigue_all_time": history["peak_fatigue"],
+        "exercise_totals": history["exercises"],
         "workout_active": fitness_ai.workout_active,
         "camera_active": fitness_ai.camera_active,
         "current_fatigue": fitness_ai.fatigue_detector.fatigue_level
     })
 
+@app.route('/api/stats/history')
+def stats_history():
+    """Daily/weekly rollups: ?granularity=day|week|all&start=YYYY-MM-DD&end=YYYY-MM-DD&exercise="""
+    fitness_ai = current_session()
+    granularity = request.args.get('granularity', 'day')
+    try:
+        buckets = workout_store.rollups(
+            _requested_user_id() or fitness_ai.user_id, g.fitness_session.session_id,
+            granularity=granularity,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            exercise=request.args.get('exercise')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e), "status": "error"}), 400
+    return jsonify({"granularity": granularity, "buckets": buckets, "status": "success"})
+
+@app.route('/api/workouts')
+def list_workouts():
+    """Saved workouts of the caller (by X-User-ID / user_id, else by session), newest first"""
+    current_session()
+    limit = max(1, min(request.args.get('limit', 20, type=int), 200))
+    workouts = workout_store.recent_workouts(_requested_user_id(), g.fitness_session.session_id, limit)
+    return jsonify({"workouts": workouts, "status": "success"})
+
+@app.route('/api/workouts/<workout_id>')
+def get_workout(workout_id):
+    """One saved workout of the caller with its sets and per-rep records"""
+    current_session()
+    # Other users' workouts look the same as missing ones
+    workout = workout_store.get_workout(workout_id, _requested_user_id(), g.fitness_session.session_id)
+    if workout is None:
+        return jsonify({"error": "No such workout", "status": "error"}), 404
+    return jsonify({**workout, "status": "success"})
+
 @app.route('/api/reset')
 def reset_all():
+    fitness_ai = current_session()
     fitness_ai.exercise_counts = {"squats": 0, "pushups": 0, "lunges": 0}
+    fitness_ai.rep_engine.reset()
     fitness_ai.fatigue_detector.fatigue_level = 0
     fitness_ai.fatigue_detector.form_scores.clear()
     return jsonify({
@@ -788,4 +1192,7 @@ if __name__ == '__main__':
     print("   2. Click 'Start Camera'")
     print("   3. See live video from your webcam!")
     print("   4. Click 'Analyze Squat' for ML analysis")
+    # Under the debug reloader only the serving child process runs the stream server
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        stream_server.start()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
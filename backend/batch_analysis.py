@@ -0,0 +1,293 @@
+"""Offline re-scoring of recorded workout videos.
+
+Runs the RealCameraProcessor pose + analysis pipeline over every recording
+in a directory as fast as the CPU allows, one MediaPipe Pose per worker
+process, and writes a JSON report per file. Landmark recordings (*.lmrec
+directories) are replayed straight into the rep counter and form rules,
+without pose inference.
+
+    python batch_analysis.py recordings/ --out reports/ --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from video_sources import VIDEO_EXTENSIONS, IMAGE_EXTENSIONS, open_source
+from pose_detection.quality_controller import AdaptiveQualityController, QualityLevel
+from ml_models.fatigue_detection import FatigueDetector
+from ml_models.form_rules import form_rules
+from pose_detection.angles import joint_angles
+from pose_detection.recording import LandmarkRecording, LandmarkReplay, FILE_EXTENSION
+from ml_models.rep_engine import RepEngine
+
+# One pipeline per worker process, built once by the pool initializer
+_processor = None
+
+
+def _build_processor(model_complexity=1, input_width=640):
+    """RealCameraProcessor that analyses every frame at one quality level
+
+    Offline work has no latency budget, so the stride is fixed and the
+    live-only shortcuts (reusing results while the scene is static, idle
+    mode while nobody is in view) are off: every frame gets a full analysis.
+    """
+    # camera_processor has no import-time side effects (the shared pools live in camera_service)
+    from camera_processor import RealCameraProcessor
+    quality = AdaptiveQualityController(
+        levels=(QualityLevel(model_complexity, input_width, 1),), start_level=0
+    )
+    return RealCameraProcessor(quality=quality, motion_gating=False, presence_detection=False)
+
+
+def _init_worker(model_complexity, input_width):
+    global _processor
+    # Parallelism comes from the process pool; keep OpenCV single-threaded
+    cv2.setNumThreads(1)
+    _processor = _build_processor(model_complexity, input_width)
+
+
+class RepTracker:
+    """Turn RepEngine events into per-rep records (start and end times)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.reps = []
+        self._rep_start = {}
+
+    @property
+    def counts(self):
+        return self.engine.counts()
+
+    def update(self, completed, timestamp):
+        """Record one frame after the engine's update; returns the completed rep records"""
+        records = []
+        for exercise in self.engine.names:
+            if self.engine.just_entered_down(exercise):
+                self._rep_start[exercise] = timestamp
+            if exercise in completed:
+                records.append({
+                    "exercise": exercise,
+                    "rep": self.engine.count(exercise),
+                    "start": round(self._rep_start[exercise], 3),
+                    "end": round(timestamp, 3)
+                })
+        self.reps.extend(records)
+        return records
+
+
+def score_reps(reps, landmarks, timestamps, fallback_scores):
+    """Give each rep the worst rule-engine form score seen during it
+
+    All frames of the recording are scored at once per exercise; exercises
+    without a rule table fall back to the per-frame analysis scores.
+    """
+    if not reps:
+        return reps
+    timestamps = np.asarray(timestamps)
+    angles = joint_angles(np.asarray(landmarks))
+    scores = {}
+    for rep in reps:
+        exercise = rep["exercise"]
+        if exercise not in scores:
+            scores[exercise] = (form_rules.score(angles, exercise) if form_rules.supports(exercise)
+                                else np.asarray(fallback_scores))
+        in_rep = (timestamps >= rep["start"] - 1e-3) & (timestamps <= rep["end"] + 1e-3)
+        rep["form_score"] = float(scores[exercise][in_rep].min())
+    return reps
+
+
+def analyze_video(path, stride=1, processor=None):
+    """Analyze one recording (video file or image directory) and return its report"""
+    processor = processor or _processor or _build_processor()
+    processor.reset_tracking()
+    source = open_source(path)
+    if not source.isOpened():
+        return {"file": path, "status": "error", "error": "Could not open recording"}
+
+    tracker = RepTracker(processor.rep_engine)
+    form_scores = []
+    landmarks = []
+    timestamps = []
+    frames = analyzed = detected = 0
+    started = time.perf_counter()
+
+    try:
+        while True:
+            ret, frame = source.read()
+            if not ret:
+                break
+            frames += 1
+            if (frames - 1) % stride:
+                continue
+            analyzed += 1
+
+            analysis = processor.process_frame(frame, seq=frames, timestamp=source.timestamp)
+            if not analysis.get("pose_detected"):
+                continue
+            detected += 1
+            form_scores.append(analysis["form_score"])
+            landmarks.append(processor.landmarks.data.copy())
+            timestamps.append(source.timestamp)
+            if not analysis.get("unchanged"):
+                tracker.update(analysis["reps_completed"], source.timestamp)
+    finally:
+        source.release()
+
+    duration = frames / source.fps if source.fps else 0.0
+    return _build_report(path, tracker, landmarks, timestamps, form_scores, frames, analyzed,
+                         detected, duration, time.perf_counter() - started)
+
+
+def analyze_recording(path, speed=None):
+    """Re-score a landmark recording (.lmrec) by replaying it, without pose inference
+
+    speed paces the replay (1.0 = as recorded); None replays as fast as possible.
+    """
+    recording = LandmarkRecording(path)
+    tracker = RepTracker(RepEngine())
+    form_scores = []
+    landmarks = []
+    timestamps = []
+    detected = 0
+    started = time.perf_counter()
+
+    for item in LandmarkReplay(recording, speed=speed):
+        if not item.pose_detected:
+            continue
+        detected += 1
+        frame = item.landmarks
+        form_scores.append(float(recording.form_scores[item.index]))
+        landmarks.append(frame.data)
+        timestamps.append(frame.timestamp)
+        if not item.unchanged:
+            completed = tracker.engine.update(joint_angles(frame.data), frame.timestamp)
+            tracker.update(completed, frame.timestamp)
+
+    return _build_report(path, tracker, landmarks, timestamps, form_scores, len(recording), len(recording),
+                         detected, recording.duration, time.perf_counter() - started)
+
+
+def _build_report(path, tracker, landmarks, timestamps, form_scores, frames, analyzed, detected,
+                  duration, elapsed):
+    # Re-score every rep with the form rules in one vectorized pass
+    score_reps(tracker.reps, landmarks, timestamps, form_scores)
+    fatigue = FatigueDetector()
+    fatigue_curve = []
+    for rep in tracker.reps:
+        result = fatigue.analyze_fatigue(rep["form_score"], timestamp=rep["end"])
+        fatigue_curve.append({
+            "t": rep["end"],
+            "rep": len(fatigue_curve) + 1,
+            "fatigue_level": result["fatigue_level"]
+        })
+
+    return {
+        "file": path,
+        "status": "success",
+        "frames": frames,
+        "frames_analyzed": analyzed,
+        "poses_detected": detected,
+        "duration_s": round(duration, 2),
+        "processing_s": round(elapsed, 2),
+        "speed_x": round(duration / elapsed, 2) if elapsed > 0 else None,
+        "rep_counts": tracker.counts,
+        "reps": tracker.reps,
+        "form_score": {
+            "mean": round(float(np.mean(form_scores)), 1) if form_scores else None,
+            "min": float(min(form_scores)) if form_scores else None
+        },
+        "fatigue_curve": fatigue_curve,
+        "final_fatigue": fatigue.fatigue_level
+    }
+
+
+def _analyze_in_worker(path, stride):
+    try:
+        if path.endswith(FILE_EXTENSION):
+            return analyze_recording(path)
+        return analyze_video(path, stride)
+    except Exception as e:
+        return {"file": path, "status": "error", "error": str(e)}
+
+
+def find_recordings(directory):
+    """Video files, landmark recordings and image-sequence subdirectories directly under directory"""
+    recordings = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and name.lower().endswith(VIDEO_EXTENSIONS):
+            recordings.append(path)
+        elif os.path.isdir(path) and name.lower().endswith(FILE_EXTENSION):
+            recordings.append(path)
+        elif os.path.isdir(path) and any(f.lower().endswith(IMAGE_EXTENSIONS) for f in os.listdir(path)):
+            recordings.append(path)
+    return recordings
+
+
+def _report_path(out_dir, recording):
+    # Keep the extension: a.mp4, a.lmrec/ and an image folder a/ need separate reports
+    name = os.path.basename(os.path.normpath(recording))
+    return os.path.join(out_dir, f"{name}.json")
+
+
+def analyze_directory(directory, out_dir=None, workers=None, stride=1,
+                      model_complexity=1, input_width=640):
+    """Analyze every recording in directory across a process pool"""
+    recordings = find_recordings(directory)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    reports = []
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(recordings), 1)),
+                             initializer=_init_worker,
+                             initargs=(model_complexity, input_width)) as pool:
+        futures = {pool.submit(_analyze_in_worker, path, stride): path for path in recordings}
+        for future in as_completed(futures):
+            report = future.result()
+            reports.append(report)
+            if out_dir:
+                with open(_report_path(out_dir, report["file"]), 'w') as f:
+                    json.dump(report, f, indent=2)
+            if report["status"] == "success":
+                print(f"✅ {report['file']}: {report['rep_counts']} "
+                      f"({report['speed_x']}x real time)")
+            else:
+                print(f"❌ {report['file']}: {report['error']}")
+    reports.sort(key=lambda r: r["file"])
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score recorded workout videos offline")
+    parser.add_argument("directory", help="Directory of video files / landmark recordings / image-sequence folders")
+    parser.add_argument("--out", default="reports", help="Where to write per-file JSON reports")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--stride", type=int, default=1, help="Analyze every Nth frame")
+    parser.add_argument("--complexity", type=int, default=1, choices=(0, 1, 2),
+                        help="MediaPipe Pose model complexity")
+    parser.add_argument("--input-width", type=int, default=640, help="Inference input width")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    reports = analyze_directory(args.directory, args.out, args.workers, args.stride,
+                                args.complexity, args.input_width)
+    ok = [r for r in reports if r["status"] == "success"]
+    summary = {
+        "recordings": len(reports),
+        "succeeded": len(ok),
+        "total_frames": sum(r["frames"] for r in ok),
+        "wall_time_s": round(time.perf_counter() - started, 2)
+    }
+    with open(os.path.join(args.out, "summary.json"), 'w') as f:
+        json.dump({**summary, "reports": [_report_path(args.out, r["file"]) for r in reports]}, f, indent=2)
+    print(f"📊 {summary}")
+
+
+if __name__ == '__main__':
+    main()
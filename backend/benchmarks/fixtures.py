@@ -0,0 +1,93 @@
+"""Synthetic inputs for the benchmarks: camera-sized frames and a landmark
+recording of someone squatting, so nothing needs a webcam or a display."""
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from pose_detection.landmarks import (
+    LandmarkFrame, NUM_LANDMARKS,
+    NOSE, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST,
+    LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE,
+    LEFT_HEEL, RIGHT_HEEL, LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX
+)
+from pose_detection.recording import LandmarkRecorder, LandmarkRecording
+from video_sources import SyntheticSource
+
+FPS = 30.0
+SHIN = THIGH = 0.2
+TORSO = 0.28
+UPPER_ARM = FOREARM = 0.14
+
+
+def synthetic_frames(count=30, width=640, height=480):
+    """BGR frames from the synthetic video source"""
+    source = SyntheticSource(width=width, height=height, num_frames=count)
+    frames = []
+    while True:
+        ok, frame = source.read()
+        if not ok:
+            return frames
+        frames.append(frame)
+
+
+def _rotate(vector, degrees):
+    rad = math.radians(degrees)
+    c, s = math.cos(rad), math.sin(rad)
+    return np.array([vector[0] * c - vector[1] * s, vector[0] * s + vector[1] * c])
+
+
+def squat_pose(knee_angle, elbow_angle=160.0):
+    """(33, 4) landmarks of a side-on figure with the given knee and elbow angles"""
+    data = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+    data[:, 3] = 0.95
+    for side, dx in ((0, -0.02), (1, 0.02)):
+        ankle = np.array([0.5 + dx, 0.9])
+        # Shin leans forward as the knee bends; the thigh closes the knee angle
+        lean = (180.0 - knee_angle) / 2.0
+        knee = ankle + _rotate((0.0, -SHIN), lean)
+        hip = knee + _rotate(ankle - knee, -knee_angle) * (THIGH / SHIN)
+        shoulder = hip + np.array([0.04, -TORSO])
+        elbow = shoulder + np.array([0.0, UPPER_ARM])
+        wrist = elbow + _rotate(shoulder - elbow, -elbow_angle) * (FOREARM / UPPER_ARM)
+        ids = ((LEFT_ANKLE, RIGHT_ANKLE), (LEFT_KNEE, RIGHT_KNEE), (LEFT_HIP, RIGHT_HIP),
+               (LEFT_SHOULDER, RIGHT_SHOULDER), (LEFT_ELBOW, RIGHT_ELBOW), (LEFT_WRIST, RIGHT_WRIST))
+        for pair, point in zip(ids, (ankle, knee, hip, shoulder, elbow, wrist)):
+            data[pair[side], :2] = point
+        data[(LEFT_HEEL, RIGHT_HEEL)[side], :2] = ankle + (-0.03, 0.02)
+        data[(LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX)[side], :2] = ankle + (0.06, 0.02)
+    data[NOSE, :2] = (data[LEFT_SHOULDER, 0] + 0.03, data[LEFT_SHOULDER, 1] - 0.1)
+    return data
+
+
+def squat_sequence(reps=10, rep_seconds=2.0, fps=FPS):
+    """(N, 33, 4) landmarks and timestamps: knee 170° -> 75° -> 170° per rep"""
+    count = int(reps * rep_seconds * fps)
+    timestamps = np.arange(count) / fps
+    phase = (1 - np.cos(2 * np.pi * timestamps / rep_seconds)) / 2
+    knees = 170.0 - 95.0 * phase
+    elbows = 165.0 - 80.0 * phase
+    poses = np.stack([squat_pose(k, e) for k, e in zip(knees, elbows)])
+    return poses, timestamps
+
+
+def landmark_recording(path=None, reps=10):
+    """A LandmarkRecording of squat_sequence(), written to path (or a temp file)"""
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"benchmark_squats_{reps}.lmrec")
+    poses, timestamps = squat_sequence(reps)
+    recorder = LandmarkRecorder(path, metadata={"source": "benchmarks.fixtures"})
+    for seq, (pose, timestamp) in enumerate(zip(poses, timestamps)):
+        recorder.record(float(timestamp), seq, pose)
+    recorder.close()
+    return LandmarkRecording(path)
+
+
+def landmark_frames(recording):
+    """LandmarkFrames for every frame of a recording with a detected pose"""
+    detected = recording.pose_detected
+    return [
+        LandmarkFrame(np.array(recording.landmarks[i]), float(recording.timestamps[i]), int(recording.seqs[i]))
+        for i in range(len(recording)) if detected[i]
+    ]
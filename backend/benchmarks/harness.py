@@ -0,0 +1,175 @@
+"""Timing, allocation tracking and baseline comparison for the benchmarks."""
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+
+class Skip(Exception):
+    """Raised by a benchmark's setup when it cannot run here (e.g. a model isn't available)"""
+
+
+class Benchmark:
+    """A named hot path: setup(fixtures) returns a zero-argument callable doing one operation"""
+
+    def __init__(self, name, setup, group):
+        self.name = name
+        self.setup = setup
+        self.group = group
+
+
+REGISTRY = []
+
+
+def benchmark(name, group='analysis'):
+    """Register a benchmark setup function"""
+    def register(setup):
+        REGISTRY.append(Benchmark(name, setup, group))
+        return setup
+    return register
+
+
+def _percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def measure(op, min_time=1.0, rounds=5, min_iterations=20, max_iterations=1_000_000, warmup=0.1, allocations=True):
+    """Time op() call by call, then count what it allocates
+
+    Timing runs with the garbage collector off for `rounds` rounds sharing
+    min_time (each with at least min_iterations calls). Besides the
+    percentiles over every call, best_p50_us is the lowest per-round
+    median: other load on the machine only ever makes a round slower, so it
+    is the steadiest number to compare across runs. The allocation pass
+    runs separately under tracemalloc, which slows calls down, and reports
+    the largest transient allocation of a call and the bytes left behind
+    per call.
+    Only memory Python and numpy know about is seen; buffers native
+    libraries (MediaPipe, OpenCV internals) manage themselves are not.
+    """
+    warmup_end = time.perf_counter() + warmup
+    while time.perf_counter() < warmup_end:
+        op()
+
+    samples = []
+    round_medians = []
+    clock = time.perf_counter_ns
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            timings = []
+            deadline = time.perf_counter() + min_time / rounds
+            while len(timings) < max_iterations // rounds and (
+                    len(timings) < min_iterations or time.perf_counter() < deadline):
+                start = clock()
+                op()
+                timings.append(clock() - start)
+            timings.sort()
+            round_medians.append(_percentile(timings, 0.50))
+            samples.extend(timings)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    samples.sort()
+    total_ns = sum(samples)
+    result = {
+        "iterations": len(samples),
+        "ops_per_sec": round(len(samples) / (total_ns / 1e9), 1),
+        "mean_us": round(total_ns / len(samples) / 1000, 3),
+        "p50_us": round(_percentile(samples, 0.50) / 1000, 3),
+        "best_p50_us": round(min(round_medians) / 1000, 3),
+        "p99_us": round(_percentile(samples, 0.99) / 1000, 3),
+    }
+
+    if allocations:
+        calls = max(1, min(len(samples), 200))
+        gc.collect()
+        tracemalloc.start()
+        try:
+            op()  # first traced call populates caches
+            before = tracemalloc.get_traced_memory()[0]
+            peak = 0
+            for _ in range(calls):
+                tracemalloc.reset_peak()
+                start = tracemalloc.get_traced_memory()[0]
+                op()
+                peak = max(peak, tracemalloc.get_traced_memory()[1] - start)
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        result["alloc_peak_kb"] = round(peak / 1024, 2)
+        result["retained_bytes_per_op"] = round(max(0, after - before) / calls, 1)
+    return result
+
+
+def _cpu_model():
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": _cpu_model(),
+        "cpus": os.cpu_count()
+    }
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    """Write results as a baseline; skipped benchmarks are kept as {"skipped": reason}"""
+    baseline = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "results": results
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, tolerance=0.25, alloc_slack_kb=1.0):
+    """Regressions of results against a baseline
+
+    A benchmark regresses when its best per-round median gets more than
+    `tolerance` slower, its p99 more than twice that (tails are noisier),
+    or its peak allocation grows by more than `tolerance` plus
+    alloc_slack_kb. A benchmark the baseline measured but this run had to
+    skip counts as a regression too (metric "skipped"), so losing one is
+    never silent; one skipped in the baseline is only measured.
+    Returns a list of (name, metric, baseline value, current value).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = (baseline or {}).get("results", {}).get(name)
+        if base is None or "skipped" in base:
+            continue
+        if "skipped" in result:
+            regressions.append((name, "skipped", base["best_p50_us"], result["skipped"]))
+            continue
+        if result["best_p50_us"] > base["best_p50_us"] * (1 + tolerance):
+            regressions.append((name, "best_p50_us", base["best_p50_us"], result["best_p50_us"]))
+        if result["p99_us"] > base["p99_us"] * (1 + 2 * tolerance):
+            regressions.append((name, "p99_us", base["p99_us"], result["p99_us"]))
+        if "alloc_peak_kb" in result and "alloc_peak_kb" in base:
+            if result["alloc_peak_kb"] > base["alloc_peak_kb"] * (1 + tolerance) + alloc_slack_kb:
+                regressions.append((name, "alloc_peak_kb", base["alloc_peak_kb"], result["alloc_peak_kb"]))
+    return regressions
@@ -0,0 +1,261 @@
+"""Micro-benchmarks for the analysis and media hot paths.
+
+Headless and CPU-only: frames come from the synthetic video source and
+landmarks from a generated squat recording (or --landmarks FILE.lmrec).
+Run from backend/:
+
+    python -m benchmarks.run                     # compare with benchmarks/baseline.json
+    python -m benchmarks.run --filter pose       # only matching benchmarks
+    python -m benchmarks.run --save-baseline     # record a new baseline
+
+Exits with status 1 if any benchmark regressed against the baseline.
+Timings only compare on the same machine: the checked-in baseline
+records the machine it came from, and CI should record its own baseline
+from the base commit on the runner that measures the change:
+
+    python -m benchmarks.run --save-baseline --baseline /tmp/base.json   # on the base commit
+    python -m benchmarks.run --baseline /tmp/base.json                   # on the change
+"""
+import argparse
+import base64
+import itertools
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from benchmarks import fixtures
+from benchmarks.harness import REGISTRY, Skip, benchmark, compare, load_baseline, machine_info, measure, save_baseline
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+JPEG_QUALITY = 80
+
+
+class Fixtures:
+    """Inputs shared by every benchmark, built once"""
+
+    def __init__(self, landmarks_path=None):
+        self.frames = fixtures.synthetic_frames(30)
+        if landmarks_path:
+            self.recording = fixtures.LandmarkRecording(landmarks_path)
+        else:
+            self.recording = fixtures.landmark_recording()
+        self.landmark_frames = fixtures.landmark_frames(self.recording)
+        if not self.landmark_frames:
+            raise ValueError("The landmark recording has no detected poses")
+        self.angle_rows = np.asarray(self.recording.angles[self.recording.pose_detected])
+
+
+# ---------- media ----------
+
+@benchmark('media.bgr_to_rgb', group='media')
+def bgr_to_rgb(fx):
+    frames = itertools.cycle(fx.frames)
+    return lambda: cv2.cvtColor(next(frames), cv2.COLOR_BGR2RGB)
+
+
+def _pose_process(model_complexity):
+    def setup(fx):
+        import mediapipe as mp
+        try:
+            pose = mp.solutions.pose.Pose(model_complexity=model_complexity, min_detection_confidence=0.5,
+                                          min_tracking_confidence=0.5)
+        except Exception as e:
+            raise Skip(f"pose model {model_complexity} unavailable: {e}")
+        frames = itertools.cycle([cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in fx.frames])
+        return lambda: pose.process(next(frames))
+    return setup
+
+
+for _complexity in (0, 1, 2):
+    benchmark(f'media.pose_process[c{_complexity}]', group='pose')(_pose_process(_complexity))
+
+
+@benchmark('media.imencode_base64', group='media')
+def imencode_base64(fx):
+    frames = itertools.cycle(fx.frames)
+    params = [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY]
+
+    def op():
+        ok, buffer = cv2.imencode('.jpg', next(frames), params)
+        return base64.b64encode(buffer).decode('ascii')
+    return op
+
+
+# ---------- analysis ----------
+
+@benchmark('analysis.real_pose_analysis')
+def real_pose_analysis(fx):
+    from camera_processor import RealCameraProcessor
+    processor = RealCameraProcessor(frame_bus=True)  # no Pose of its own; only the analysis is timed
+    frames = itertools.cycle(fx.landmark_frames)
+    return lambda: processor._real_pose_analysis(next(frames))
+
+
+@benchmark('analysis.calculate_angle')
+def calculate_angle(fx):
+    from pose_detection.exercise_analyzer import ExerciseAnalyzer
+    from pose_detection.landmarks import LEFT_HIP, LEFT_KNEE, LEFT_ANKLE
+    analyzer = ExerciseAnalyzer()
+    triplets = itertools.cycle([
+        (frame[LEFT_HIP][:2].tolist(), frame[LEFT_KNEE][:2].tolist(), frame[LEFT_ANKLE][:2].tolist())
+        for frame in fx.landmark_frames
+    ])
+    return lambda: analyzer.calculate_angle(*next(triplets))
+
+
+@benchmark('analysis.form_score')
+def form_score(fx):
+    from ml_models.form_analyzer import AdvancedFormAnalyzer
+    analyzer = AdvancedFormAnalyzer()
+    rows = itertools.cycle(fx.angle_rows)
+    return lambda: analyzer.analyze_squat_form(next(rows))
+
+
+@benchmark('analysis.form_score_batch')
+def form_score_batch(fx):
+    from ml_models.form_analyzer import AdvancedFormAnalyzer
+    analyzer = AdvancedFormAnalyzer()
+    return lambda: analyzer.score_batch(fx.angle_rows, "squats")
+
+
+@benchmark('analysis.analyze_fatigue')
+def analyze_fatigue(fx):
+    from ml_models.fatigue_detection import FatigueDetector
+    detector = FatigueDetector()
+    # One rep every 2 s with slowly declining form, then around again
+    reps = itertools.cycle([(90.0 - (i % 20), i * 2.0) for i in range(200)])
+
+    def op():
+        score, timestamp = next(reps)
+        return detector.analyze_fatigue(score, timestamp)
+    return op
+
+
+# ---------- serialization ----------
+
+@benchmark('json.analysis_payload', group='serialization')
+def json_analysis_payload(fx):
+    from camera_processor import RealCameraProcessor
+    processor = RealCameraProcessor(frame_bus=True)
+    payloads = [processor._real_pose_analysis(frame) for frame in fx.landmark_frames[:60]]
+    payloads = itertools.cycle(payloads)
+    return lambda: json.dumps(next(payloads))
+
+
+@benchmark('json.ml_payload', group='serialization')
+def json_ml_payload(fx):
+    payload = {
+        "exercise": "squats",
+        "count": 12,
+        "feedback": ["✅ Good depth", "⚠️ Keep knees behind toes"],
+        "form_score": 85,
+        "fatigue_level": 25,
+        "analysis_source": "ml_enhanced",
+        "ml_data": {
+            "exercise_phase": "down",
+            "angles": {"left_knee": 92.4, "right_knee": 95.1, "left_elbow": 160.2, "right_elbow": 158.7},
+            "recommendation": "Keep going! 💪"
+        },
+        "rep_counted": True,
+        "status": "success"
+    }
+    return lambda: json.dumps(payload)
+
+
+# ---------- CLI ----------
+
+def _format_row(name, result, base):
+    if "skipped" in result:
+        return f"  ⏭️  {name:<34} skipped: {result['skipped']}"
+    line = (f"  {name:<37} {result['ops_per_sec']:>12,.1f} ops/s  p50 {result['p50_us']:>10.2f} us"
+            f"  p99 {result['p99_us']:>10.2f} us")
+    if "alloc_peak_kb" in result:
+        line += f"  alloc {result['alloc_peak_kb']:>9.2f} KB  retained {result['retained_bytes_per_op']:>7.1f} B/op"
+    if base and "skipped" in base:
+        line += "  (skipped in baseline)"
+    elif base:
+        change = (result['best_p50_us'] - base['best_p50_us']) / base['best_p50_us'] * 100 if base['best_p50_us'] else 0.0
+        line += f"  ({change:+.0f}% vs baseline)"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis and media hot paths")
+    parser.add_argument('--filter', default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument('--min-time', type=float, default=1.0, help="Seconds of timed calls per benchmark")
+    parser.add_argument('--landmarks', default=None, help="Landmark recording (.lmrec) to use as input")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON to compare with")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--no-alloc', action='store_true', help="Skip the allocation pass")
+    parser.add_argument('--threads', type=int, default=1, help="OpenCV threads (1 keeps numbers stable)")
+    parser.add_argument('--json', default=None, help="Also write the results to this file")
+    args = parser.parse_args(argv)
+
+    cv2.setNumThreads(args.threads)
+    benchmarks = [b for b in REGISTRY if not args.filter or args.filter in b.name]
+    if not benchmarks:
+        print(f"❌ No benchmarks match '{args.filter}'")
+        return 2
+
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    if baseline and baseline.get("machine") != machine_info():
+        print(f"⚠️ Baseline was recorded on a different machine ({baseline['machine'].get('platform')}); "
+              f"timings may not be comparable")
+
+    fx = Fixtures(args.landmarks)
+    print(f"🏁 Running {len(benchmarks)} benchmarks ({len(fx.frames)} synthetic frames, "
+          f"{len(fx.landmark_frames)} landmark frames)")
+    results = {}
+    ops = {}
+    for bench in benchmarks:
+        try:
+            ops[bench.name] = bench.setup(fx)
+            result = measure(ops[bench.name], min_time=args.min_time, allocations=not args.no_alloc)
+        except Skip as e:
+            result = {"skipped": str(e)}
+        results[bench.name] = result
+        base = (baseline or {}).get("results", {}).get(bench.name)
+        print(_format_row(bench.name, result, base))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"machine": machine_info(), "results": results}, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"💾 Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"ℹ️ No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+    if regressions:
+        # Measure suspects again so one noisy run doesn't fail the build
+        suspects = sorted({name for name, metric, *_ in regressions if metric != "skipped"})
+        print(f"🔁 Re-measuring {len(suspects)} suspected regression(s)...")
+        for name in suspects:
+            retry = measure(ops[name], min_time=args.min_time, allocations=not args.no_alloc)
+            for key in ("best_p50_us", "p99_us", "alloc_peak_kb"):
+                if key in retry:
+                    results[name][key] = min(results[name][key], retry[key])
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+    untracked = sorted(name for name, base in baseline.get("results", {}).items()
+                       if "skipped" in base and name in results)
+    if untracked:
+        print(f"ℹ️ Skipped when the baseline was recorded, not compared: {', '.join(untracked)}")
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against the baseline:")
+        for name, metric, before, after in regressions:
+            print(f"   {name}: {metric} {before} -> {after}")
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Entry points of the frame bus worker processes.
+
+FramePipeline spawns these, so a child imports this module (and what it
+needs for inference) instead of the server that started the pipeline.
+Keep it free of import-time side effects: no sessions, pools or threads.
+"""
+import time
+
+import cv2
+
+from frame_bus import FrameBus, ResultBus, SharedRing, H_SKIPPED, H_OVERRUNS, POLL_INTERVAL_S
+
+
+def _wait_for_new(ring, last_write, stop, read=None):
+    """Poll until ring has a write newer than last_write (None once stop is set)"""
+    read = read or ring.latest
+    while not stop.is_set():
+        slot = read()
+        if slot is not None and slot.write_no != last_write:
+            return slot
+        time.sleep(POLL_INTERVAL_S)
+    return None
+
+
+def inference_worker(frame_bus_name, result_bus_name, stop, processor_options=None):
+    """Pose inference + analysis on the newest frame of a FrameBus"""
+    from camera_processor import RealCameraProcessor
+
+    processor_options = dict(processor_options or {})
+    frames = FrameBus(processor_options.pop('shape'), name=frame_bus_name, create=False)
+    results = ResultBus(name=result_bus_name, create=False)
+    processor = RealCameraProcessor(**processor_options)
+    last_write = 0
+    try:
+        while True:
+            slot = _wait_for_new(frames, last_write, stop, frames.latest_frame)
+            if slot is None:
+                break
+            if last_write:
+                results.count(H_SKIPPED, slot.write_no - last_write - 1)
+            last_write = slot.write_no
+
+            # Take the frame out and make sure it is whole before the
+            # processor's state (reps, filters, recorder) sees it
+            image = slot.payload.copy()
+            if not frames.valid(slot.write_no):
+                # Capture lapped us while copying; the copy may mix two frames
+                results.count(H_OVERRUNS)
+                continue
+            analysis = processor.process_frame(image, seq=slot.seq, timestamp=slot.timestamp)
+            landmarks = processor.landmarks.data if analysis.get("pose_detected") else None
+            results.write_result(slot.seq, slot.timestamp, landmarks, analysis, processor.quality.get_status())
+    finally:
+        processor.close()
+        frames.close()
+        results.close()
+
+
+def encoder_worker(variants, stop, quality=80, size=None):
+    """JPEG-encode the newest frame of each {variant: (frame bus, jpeg bus)} pair"""
+    cv2.setNumThreads(1)
+    buses = {}
+    for variant, (frame_bus_name, jpeg_bus_name, shape) in variants.items():
+        frames = FrameBus(shape, name=frame_bus_name, create=False)
+        buses[variant] = (frames, SharedRing(name=jpeg_bus_name, create=False))
+    last_write = {variant: 0 for variant in buses}
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    try:
+        while not stop.is_set():
+            idle = True
+            for variant, (frames, jpegs) in buses.items():
+                slot = frames.latest_frame()
+                if slot is None or slot.write_no == last_write[variant]:
+                    continue
+                idle = False
+                if last_write[variant]:
+                    jpegs.count(H_SKIPPED, slot.write_no - last_write[variant] - 1)
+                last_write[variant] = slot.write_no
+
+                image = slot.payload
+                if size and (image.shape[1], image.shape[0]) != tuple(size):
+                    image = cv2.resize(image, tuple(size), interpolation=cv2.INTER_AREA)
+                ret, buffer = cv2.imencode('.jpg', image, params)
+                if not ret or not frames.valid(slot.write_no):
+                    jpegs.count(H_OVERRUNS)
+                    continue
+                if not jpegs.write(buffer, slot.seq, slot.timestamp):
+                    jpegs.count(H_OVERRUNS)
+            if idle:
+                time.sleep(POLL_INTERVAL_S)
+    finally:
+        for frames, jpegs in buses.values():
+            frames.close()
+            jpegs.close()
@@ -1,46 +1,173 @@
 import cv2
 import mediapipe as mp
-import numpy as np
 import threading
 import time
-import base64
+from mediapipe.framework.formats import landmark_pb2
+from frame_bus import FramePipeline
+from frame_cache import EncodedFrame, EncodedFrameCache
+from frame_encoder import LadderEncoder
+from overlay import OverlayLayer, draw_text_panel
+from frame_capture import FrameCapture
+from pose_detection.quality_controller import AdaptiveQualityController
+from pose_detection.roi_tracker import ROITracker
+from pose_detection.landmark_filter import OneEuroFilter
+from pose_detection.motion_gate import MotionGate
+from pose_detection.presence import PresenceMonitor
+from pose_detection.landmarks import LandmarkFrame
+from pose_detection.recording import LandmarkRecorder
+from pose_detection.angles import joint_angles, angles_to_dict, JOINT_INDEX
+from ml_models.rep_engine import RepEngine
+
+# How long a quality change may wait for a pooled pose graph before keeping the current one
+POSE_LEASE_TIMEOUT_S = 2.0
 
 class RealCameraProcessor:
-    def __init__(self):
+    def __init__(self, latency_budget_ms=12.0, quality=None, pose_pool=None, roi_tracking=True,
+                 landmark_filter=True, motion_gating=True, presence_detection=True, encoder_pool=None,
+                 frame_bus=False):
         self.camera = None
+        self.capture = None
+        self.frame_reader = None
+        self.camera_thread = None
         self.is_running = False
         self.current_frame = None
+        self.frame_seq = 0
+        self.frame_cache = EncodedFrameCache()
+        self.encoder = LadderEncoder(self.frame_cache, encoder_pool)
         self.latest_analysis = {}
+        
+        # Skeleton and status layer, re-rendered per analysis and composited
+        # onto every captured frame (the raw frame is never drawn on)
+        self.overlay = OverlayLayer()
+        self.analysis_version = 0
+        self.annotated_frame = None
+        self._published = (0, None, None)
         self.camera_available = False
         
-        # MediaPipe setup
+        # Stride, input size and model complexity adapt to the latency budget
+        self.quality = quality or AdaptiveQualityController(budget_ms=latency_budget_ms)
+        
+        # Landmark buffer refilled in place for every analysed frame
+        self.landmarks = LandmarkFrame(source="real_camera")
+        
+        # Run inference on a crop around the person found in the previous frame
+        self.roi_tracker = ROITracker() if roi_tracking else None
+        
+        # Our own temporal smoothing replaces MediaPipe's smooth_landmarks
+        self.landmark_filter = OneEuroFilter() if landmark_filter else None
+        
+        # Reuse the previous result while nothing in view moves
+        self.motion_gate = MotionGate() if motion_gating else None
+        self._last_result = None
+        self._last_pose_landmarks = None
+        
+        # Low-rate, low-resolution person checks while nobody is in view
+        self.presence = PresenceMonitor() if presence_detection else None
+        
+        # Reps for every known exercise, counted from the same angle row
+        self.rep_engine = RepEngine()
+        
+        # Optional per-frame landmark + analysis recording (see start_recording)
+        self.recorder = None
+        
+        # With the frame bus, inference and encoding run in their own
+        # processes (started on the first frame, once its size is known)
+        self.frame_bus = frame_bus
+        self.pipeline = None
+        self._worker_quality = None
+        self._feature_options = {
+            "roi_tracking": roi_tracking,
+            "landmark_filter": landmark_filter,
+            "motion_gating": motion_gating,
+            "presence_detection": presence_detection
+        }
+        
+        # MediaPipe setup (graphs are leased from pose_pool when one is given)
+        self.pose_pool = pose_pool
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+        self.pose_complexity = self.quality.level.model_complexity
+        self.pose = None if frame_bus else self._create_pose(self.pose_complexity)
+        self.mp_drawing = mp.solutions.drawing_utils
+    
+    def _create_pose(self, model_complexity, timeout=None):
+        """Build (or lease) a MediaPipe Pose graph for the given complexity"""
+        if self.pose_pool:
+            return self.pose_pool.acquire(model_complexity, timeout=timeout)
+        return self.mp_pose.Pose(
             static_image_mode=False,
-            model_complexity=1,
-            smooth_landmarks=True,
+            model_complexity=model_complexity,
+            smooth_landmarks=self.landmark_filter is None,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        self.mp_drawing = mp.solutions.drawing_utils
+    
+    def _apply_quality_level(self):
+        """Rebuild the pose graph if the controller changed model complexity"""
+        complexity = self.quality.level.model_complexity
+        if complexity == self.pose_complexity and self.pose is not None:
+            return
+        old_pose = self.pose
+        if self.pose_pool and old_pose is not None:
+            # Give ours back before asking for another: holding it while
+            # every pooled graph is leased would wait forever
+            self.pose = None
+            self._release_pose(old_pose)
+        try:
+            new_pose = self._create_pose(complexity, timeout=POSE_LEASE_TIMEOUT_S)
+        except TimeoutError:
+            print(f"⚠️ No pose graph free for complexity {complexity}; keeping {self.pose_complexity}")
+            self.quality.fall_back_to(self.pose_complexity)
+            self._restore_pose()
+            return
+        except Exception as e:
+            # e.g. the heavy model cannot be downloaded; stay on what works
+            print(f"⚠️ Pose model complexity {complexity} unavailable: {e}")
+            self.quality.mark_unavailable(complexity, self.pose_complexity)
+            self._restore_pose()
+            return
+        if self.pose is not None:
+            self._release_pose(self.pose)
+        self.pose = new_pose
+        self.pose_complexity = complexity
+    
+    def _restore_pose(self):
+        """Lease the current complexity again after a failed switch (pose stays None if none is free)"""
+        if self.pose is not None:
+            return
+        try:
+            self.pose = self._create_pose(self.pose_complexity, timeout=POSE_LEASE_TIMEOUT_S)
+        except TimeoutError:
+            print("⚠️ No pose graph free; analysis resumes when one is released")
+    
+    def _release_pose(self, pose):
+        if self.pose_pool:
+            self.pose_pool.release(pose)
+        else:
+            pose.close()
         
-    def start_camera(self, camera_id=0):
-        """Force real camera usage"""
+    def start_camera(self, camera_id=0, source=None):
+        """Force real camera usage (or run on a given VideoSource instead)"""
         try:
-            print(f"🎥 Attempting to start REAL camera at ID: {camera_id}")
-            
             # Release any existing camera
+            if self.is_running:
+                self.stop_camera()
             if self.camera:
                 self.camera.release()
-                
-            self.camera = cv2.VideoCapture(camera_id)
             
-            # Set camera properties for better performance
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.camera.set(cv2.CAP_PROP_FPS, 30)
+            if source is not None:
+                print(f"🎞️ Starting video source: {source.describe()}")
+                self.camera = source
+                camera_id = None
+            else:
+                print(f"🎥 Attempting to start REAL camera at ID: {camera_id}")
+                self.camera = cv2.VideoCapture(camera_id)
+                
+                # Set camera properties for better performance
+                self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+                self.camera.set(cv2.CAP_PROP_FPS, 30)
             
-            if not self.camera.isOpened():
+            if not self.camera.isOpened() and source is None:
                 print("❌ Primary camera failed, trying alternatives...")
                 # Try other camera IDs
                 for alt_id in [1, 2, 3]:
@@ -59,7 +186,15 @@ class RealCameraProcessor:
                 if ret:
                     print(f"✅ REAL CAMERA WORKING! Frame size: {test_frame.shape}")
                     
-                    # Start camera thread
+                    # Start capture and processing threads; with the frame bus,
+                    # frames are captured straight into its shared memory
+                    ring = None
+                    if self.frame_bus:
+                        self._start_pipeline(test_frame.shape)
+                        ring = self.pipeline.frame_buses['raw']
+                    self.capture = FrameCapture(self.camera, ring=ring)
+                    self.frame_reader = self.capture.reader()
+                    self.capture.start()
                     self.camera_thread = threading.Thread(target=self._camera_loop)
                     self.camera_thread.daemon = True
                     self.camera_thread.start()
@@ -83,88 +218,253 @@ class RealCameraProcessor:
             return {"error": f"Camera initialization failed: {str(e)}"}
     
     def _camera_loop(self):
-        """Real camera processing loop"""
+        """Real camera processing loop, always working on the freshest frame"""
         frame_count = 0
-        while self.is_running and self.camera_available:
-            ret, frame = self.camera.read()
-            if ret:
-                self.current_frame = frame
-                frame_count += 1
-                
-                # Analyze every 3rd frame for performance
-                if frame_count % 3 == 0:
-                    self._analyze_frame(frame)
-                    
-            time.sleep(0.033)  # ~30 FPS
+        while self.is_running and self.camera_available and self.capture.running:
+            frame = self.frame_reader.read(timeout=1.0)
+            if frame is None:
+                continue
+            # Streams and encoders read the frame later; the ring slot gets reused
+            frame = frame.copy()
+            frame_count += 1
+            
+            # Analysis stride is chosen by the quality controller
+            if self.frame_bus:
+                self._exchange_with_bus(frame)
+            elif self.quality.should_analyze(frame_count):
+                self._analyze_frame(frame.image, frame.seq, frame.timestamp)
+            
+            annotated = self._annotate(frame.image)
+            # Publish seq, raw and annotated together so readers never mix frames
+            self._published = (frame.seq, frame.image, annotated)
+            self.annotated_frame = annotated
+            self.current_frame = frame.image
+            self.frame_seq = frame.seq
+            self.encoder.publish(frame.seq, {'raw': frame.image, 'annotated': annotated})
+            if self.pipeline:
+                self.pipeline.publish('annotated', annotated, frame.seq, frame.timestamp)
+    
+    def _start_pipeline(self, shape):
+        """Spawn the inference and encoder processes for frames of this shape"""
+        self.pipeline = FramePipeline(shape, processor_options={
+            "latency_budget_ms": self.quality.budget_ms, **self._feature_options
+        }).start()
+        self._worker_quality = None
+    
+    def _exchange_with_bus(self, frame):
+        """Take the inference process's newest result (capture already put the frame on the bus)"""
+        result = self.pipeline.poll_result()
+        if result is None:
+            return
+        self.latest_analysis = result.analysis
+        self._worker_quality = result.quality
+        if result.landmarks is not None:
+            self.landmarks.data[:] = result.landmarks
+            self.landmarks.timestamp = result.timestamp
+            self.landmarks.seq = result.seq
+            self._last_pose_landmarks = self._pose_landmarks_from_array(result.landmarks)
+        else:
+            self._last_pose_landmarks = None
+        if not result.analysis.get("unchanged"):
+            self.analysis_version += 1
+        if self.recorder:
+            self.recorder.record(result.timestamp, result.seq, result.landmarks, result.analysis)
     
-    def _analyze_frame(self, frame):
+    @staticmethod
+    def _pose_landmarks_from_array(data):
+        """MediaPipe landmark list (for drawing) from a (33, 4) array"""
+        pose_landmarks = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z, visibility in data.tolist():
+            pose_landmarks.landmark.add(x=x, y=y, z=z, visibility=visibility)
+        return pose_landmarks
+    
+    def _analyze_frame(self, frame, seq=0, timestamp=None):
         """Analyze pose in real camera frame"""
+        self.latest_analysis = self.process_frame(frame, seq=seq, timestamp=timestamp)
+        if not self.latest_analysis.get("unchanged"):
+            self.analysis_version += 1
+    
+    def _annotate(self, image):
+        """Composite the skeleton/status overlay onto a captured frame"""
+        if not self.overlay.is_current(self.analysis_version, image.shape):
+            self.overlay.render(image.shape, self.analysis_version, self._draw_overlay)
+        return self.overlay.composite(image)
+    
+    def _draw_overlay(self, canvas, alpha):
+        """OverlayLayer draw callback for the latest analysis"""
+        if self._last_pose_landmarks is not None:
+            self._draw_landmarks(canvas, self._last_pose_landmarks)
+            alpha[canvas.any(axis=2)] = 255
+        
+        analysis = self.latest_analysis
+        if analysis.get("pose_detected"):
+            counts = analysis.get("rep_counts", {})
+            lines = [
+                (f"State: {analysis['state']}", (0, 255, 0), 0.6),
+                (f"Knee: {analysis['knee_angle']:.0f}  Elbow: {analysis['elbow_angle']:.0f}", (255, 255, 255), 0.6),
+                ("Reps: " + "  ".join(f"{name} {count}" for name, count in counts.items()), (255, 255, 255), 0.6),
+            ]
+        elif analysis:
+            lines = [("Waiting for person...", (0, 200, 255), 0.6)]
+        else:
+            lines = []
+        draw_text_panel(lines)(canvas, alpha)
+    
+    def process_frame(self, frame, draw=False, seq=0, timestamp=None):
+        """Run pose inference and analysis on one BGR frame and return the result
+
+        The landmarks are left in self.landmarks (reused between frames).
+        While the scene is static the previous result is returned again,
+        marked with "unchanged": True.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
         try:
-            # Convert BGR to RGB for MediaPipe
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.pose.process(rgb_frame)
+            if self._last_result is not None and (
+                    (self.presence and not self.presence.should_check(timestamp)) or
+                    (self.motion_gate and not self.motion_gate.should_analyze(frame, timestamp))):
+                if draw and self._last_pose_landmarks is not None:
+                    self._draw_landmarks(frame, self._last_pose_landmarks)
+                result = {**self._last_result, "unchanged": True}
+                if "reps_completed" in result:
+                    result["reps_completed"] = []  # events are reported once
+                self._record(result, seq, timestamp)
+                return result
             
-            if results.pose_landmarks:
-                # Extract landmarks
-                landmarks = []
-                for landmark in results.pose_landmarks.landmark:
-                    landmarks.append({
-                        'x': landmark.x, 'y': landmark.y, 'z': landmark.z,
-                        'visibility': landmark.visibility
-                    })
-                
-                # Real analysis
-                analysis = self._real_pose_analysis(landmarks)
-                analysis["mode"] = "real_camera"
-                analysis["person_detected"] = True
-                self.latest_analysis = analysis
-                
-                # Draw pose landmarks on frame (for visualization)
-                self.mp_drawing.draw_landmarks(
-                    frame, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
-                    self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
-                    self.mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2)
-                )
-                
-            else:
-                self.latest_analysis = {
-                    "pose_detected": False, 
-                    "message": "⏳ Waiting for person... Stand in camera view",
-                    "mode": "real_camera",
-                    "person_detected": False
-                }
-                
+            self._last_result = self._process_pose(frame, draw, seq, timestamp)
+            self._record(self._last_result, seq, timestamp)
+            return self._last_result
         except Exception as e:
-            self.latest_analysis = {
+            return {
                 "error": f"Analysis error: {str(e)}",
                 "mode": "real_camera"
             }
     
-    def _real_pose_analysis(self, landmarks):
-        """Real pose analysis using camera data"""
-        try:
-            # MediaPipe landmark indices
-            LEFT_SHOULDER = 11; LEFT_ELBOW = 13; LEFT_WRIST = 15
-            LEFT_HIP = 23; LEFT_KNEE = 25; LEFT_ANKLE = 27
-            RIGHT_SHOULDER = 12; RIGHT_ELBOW = 14; RIGHT_WRIST = 16
-            RIGHT_HIP = 24; RIGHT_KNEE = 26; RIGHT_ANKLE = 28
+    def _process_pose(self, frame, draw, seq, timestamp):
+        """Full pose inference and analysis for one frame"""
+        idle = self.presence is not None and self.presence.idle
+        roi = None
+        if idle:
+            # Cheap person check: full view at reduced resolution
+            pose_input = self.presence.prepare_input(frame)
+        else:
+            pose_input = frame
+            if self.roi_tracker:
+                pose_input, roi = self.roi_tracker.crop(frame)
+            pose_input = self.quality.prepare_input(pose_input)
+        
+        # Convert BGR to RGB for MediaPipe (landmarks are normalized, so
+        # a downscaled input still maps onto the full frame)
+        rgb_frame = cv2.cvtColor(pose_input, cv2.COLOR_BGR2RGB)
+        if self.pose is None:
+            self._apply_quality_level()
+            if self.pose is None:
+                return {"pose_detected": False, "error": "No pose engine available"}
+        start = time.perf_counter()
+        results = self.pose.process(rgb_frame)
+        # Idle checks would skew the latency the quality controller sees
+        if not idle and self.quality.record(time.perf_counter() - start):
+            self._apply_quality_level()
+        if self.presence:
+            self.presence.update(results.pose_landmarks is not None, timestamp)
+        
+        if results.pose_landmarks:
+            # Extract landmarks straight into the (33, 4) buffer
+            landmarks = self.landmarks.fill_from_mediapipe(
+                results.pose_landmarks, timestamp=timestamp, seq=seq
+            )
+            if self.roi_tracker:
+                # Back to full-frame coordinates, then pick the next crop
+                ROITracker.map_array_to_frame(landmarks.data, roi)
+                ROITracker.map_to_frame(results.pose_landmarks.landmark, roi)
+                self.roi_tracker.update(landmarks.data, roi)
+            if self.landmark_filter:
+                self.landmark_filter(landmarks.data, landmarks.timestamp)
             
-            def calculate_angle(a, b, c):
-                a = np.array([a['x'], a['y']])
-                b = np.array([b['x'], b['y']])
-                c = np.array([c['x'], c['y']])
-                
-                radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-                angle = np.abs(np.degrees(radians))
-                return min(angle, 360 - angle)
+            # Real analysis
+            analysis = self._real_pose_analysis(landmarks)
+            analysis["mode"] = "real_camera"
+            analysis["person_detected"] = True
             
-            # Calculate angles
-            left_knee_angle = calculate_angle(
-                landmarks[LEFT_HIP], landmarks[LEFT_KNEE], landmarks[LEFT_ANKLE]
-            )
-            left_elbow_angle = calculate_angle(
-                landmarks[LEFT_SHOULDER], landmarks[LEFT_ELBOW], landmarks[LEFT_WRIST]
-            )
+            # Draw pose landmarks on frame (for visualization)
+            if draw:
+                self._draw_landmarks(frame, results.pose_landmarks)
+            self._last_pose_landmarks = results.pose_landmarks
+            return analysis
+        
+        self._last_pose_landmarks = None
+        if self.roi_tracker:
+            self.roi_tracker.lost()
+        if self.landmark_filter:
+            self.landmark_filter.reset()
+        waiting = {
+            "pose_detected": False, 
+            "message": "⏳ Waiting for person... Stand in camera view",
+            "mode": "real_camera",
+            "person_detected": False
+        }
+        if self.presence and self.presence.idle:
+            waiting["presence"] = "idle"
+        return waiting
+    
+    def start_recording(self, path, metadata=None):
+        """Record every analysed frame's landmarks and analysis to path"""
+        self.stop_recording()
+        self.recorder = LandmarkRecorder(path, metadata={"source": "real_camera", **(metadata or {})})
+        print(f"⏺️ Recording landmarks to {path}")
+        return self.recorder.get_stats()
+    
+    def stop_recording(self):
+        """Finish the current recording; returns its stats (or None)"""
+        if self.recorder is None:
+            return None
+        recorder, self.recorder = self.recorder, None
+        recorder.close()
+        print(f"⏹️ Recorded {recorder.frames_recorded} frames to {recorder.path}")
+        return recorder.get_stats()
+    
+    def _record(self, result, seq, timestamp):
+        recorder = self.recorder
+        if recorder is not None and "error" not in result:
+            landmarks = self.landmarks.data if result.get("pose_detected") else None
+            recorder.record(timestamp, seq, landmarks, result)
+    
+    def analyze_landmarks(self, landmarks):
+        """Run the analyzers on already-extracted landmarks (e.g. a replayed recording)"""
+        analysis = self._real_pose_analysis(landmarks)
+        analysis["mode"] = "replay"
+        analysis["timestamp"] = landmarks.timestamp
+        return analysis
+    
+    def _draw_landmarks(self, frame, pose_landmarks):
+        self.mp_drawing.draw_landmarks(
+            frame, pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
+            self.mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=2),
+            self.mp_drawing.DrawingSpec(color=(255, 0, 0), thickness=2, circle_radius=2)
+        )
+    
+    def reset_tracking(self):
+        """Forget MediaPipe tracking state (e.g. between unrelated videos)"""
+        if hasattr(self.pose, 'reset'):
+            self.pose.reset()
+        if self.roi_tracker:
+            self.roi_tracker.lost()
+        if self.landmark_filter:
+            self.landmark_filter.reset()
+        if self.motion_gate:
+            self.motion_gate.reset()
+        if self.presence:
+            self.presence.reset()
+        self._last_result = None
+        self.rep_engine.reset()
+    
+    def _real_pose_analysis(self, landmarks):
+        """Real pose analysis using camera data (landmarks is a LandmarkFrame)"""
+        try:
+            # All joint angles in one vectorized call
+            angles = joint_angles(landmarks.data)
+            left_knee_angle = float(angles[JOINT_INDEX['left_knee']])
+            left_elbow_angle = float(angles[JOINT_INDEX['left_elbow']])
+            reps_completed = self.rep_engine.update(angles, landmarks.timestamp)
             
             # Determine exercise state
             feedback = []
@@ -195,37 +495,97 @@ class RealCameraProcessor:
                 "pose_detected": True,
                 "knee_angle": round(left_knee_angle, 1),
                 "elbow_angle": round(left_elbow_angle, 1),
+                "angles": angles_to_dict(angles, decimals=1),
                 "state": state,
                 "feedback": feedback,
                 "form_score": form_score,
+                "rep_counts": self.rep_engine.counts(),
+                "reps_completed": reps_completed,
                 "timestamp": time.time()
             }
             
         except Exception as e:
             return {"pose_detected": False, "error": str(e)}
     
-    def get_frame(self):
+    def get_frame(self, rung=None):
         """Get current frame as base64"""
-        if self.current_frame is not None:
-            # Resize for performance
-            frame = cv2.resize(self.current_frame, (640, 480))
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-            if ret:
-                jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-                return f"data:image/jpeg;base64,{jpg_as_text}"
-        return None
+        encoded = self.get_encoded_frame(rung=rung)
+        return encoded.data_uri if encoded else None
+    
+    def get_encoded_frame(self, quality=80, size=None, annotated=True, rung=None):
+        """Get the current frame's shared JPEG encoding
+        
+        A ladder rung (see frame_encoder.LADDER) overrides quality and size;
+        frames are only resized when a smaller size is actually asked for.
+        """
+        seq, raw, annotated_frame = self._published
+        frame = annotated_frame if annotated else raw
+        if frame is None:
+            return None
+        variant = 'annotated' if annotated else 'raw'
+        if rung:
+            return self.encoder.encode(seq, frame, variant, rung)
+        if self.pipeline and size is None and quality == self.pipeline.quality:
+            # Already encoded by the encoder process (possibly a frame behind)
+            latest = self.pipeline.latest_jpeg(variant)
+            if latest:
+                jpeg_seq, jpeg = latest
+                return EncodedFrame(jpeg_seq, jpeg, self.frame_cache.make_etag(jpeg_seq, variant, quality))
+        return self.frame_cache.get(seq, frame, quality, size, variant=variant)
     
     def get_analysis(self):
         """Get latest real analysis"""
         return self.latest_analysis
     
+    def get_status(self):
+        """Camera, capture and adaptive quality status"""
+        return {
+            "camera_active": self.is_running and self.camera_available,
+            "mode": "real_camera",
+            "capture": self.get_capture_stats(),
+            # Quality adapts in the inference process when the frame bus is on
+            "quality": self._worker_quality if self.frame_bus else self.quality.get_status(),
+            "pose_pool": self.pose_pool.get_stats() if self.pose_pool else None,
+            "roi_tracking": self.roi_tracker.get_stats() if self.roi_tracker else None,
+            "landmark_filter": self.landmark_filter.get_stats() if self.landmark_filter else None,
+            "motion_gate": self.motion_gate.get_stats() if self.motion_gate else None,
+            "presence": self.presence.get_stats() if self.presence else None,
+            "overlay": self.overlay.get_stats(),
+            "encoder": self.encoder.get_stats(),
+            "frame_bus": self.pipeline.get_stats() if self.pipeline else None,
+            "recording": self.recorder.get_stats() if self.recorder else None,
+            # Reps are counted in the inference process when the frame bus is on
+            "reps": self.latest_analysis.get("rep_counts") if self.frame_bus else self.rep_engine.get_status()
+        }
+    
+    def get_capture_stats(self):
+        """Capture FPS and delivered/dropped/duplicate frame counters"""
+        if not self.capture:
+            return {"running": False}
+        return {**self.capture.get_stats(), **self.frame_reader.get_stats()}
+    
     def stop_camera(self):
         """Stop camera"""
         self.is_running = False
+        if self.capture:
+            self.capture.stop()
+        if self.pipeline:
+            if self.camera_thread:
+                self.camera_thread.join(timeout=2)
+            # The capture ring is the pipeline's shared memory; drop our views first
+            self.capture = self.frame_reader = None
+            self.pipeline.close()
+            self.pipeline = None
         if self.camera and self.camera_available:
             self.camera.release()
         cv2.destroyAllWindows()
         return {"message": "📹 Camera stopped", "mode": "real_camera"}
-
-# Global instance
-camera_processor = RealCameraProcessor()
\ No newline at end of file
+    
+    def close(self):
+        """Stop the camera and give the pose graph back"""
+        if self.is_running:
+            self.stop_camera()
+        self.stop_recording()
+        if self.pose is not None:
+            self._release_pose(self.pose)
+            self.pose = None
@@ -0,0 +1,31 @@
+"""Process-wide camera resources for the RealCameraProcessor server.
+
+Importing this module builds the shared pools and the session manager (and
+its reaper thread), so only the serving process should import it. Worker
+processes and offline tools import camera_processor directly.
+"""
+import os
+
+from camera_processor import RealCameraProcessor
+from frame_encoder import shared_encoder_pool
+from pose_detection.pose_pool import PosePool
+from session_manager import SessionManager, MAX_SESSIONS, SESSION_IDLE_TIMEOUT
+
+# Pre-warmed pose graphs shared by all sessions (call pose_pool.prewarm() at start-up)
+# (smoothing is done by each processor's OneEuroFilter, not by MediaPipe)
+pose_pool = PosePool(size=int(os.environ.get('POSE_POOL_SIZE', 2)), smooth_landmarks=False)
+
+# JPEG encoder threads shared by all sessions' stream subscriptions (the same pool app.py uses)
+encoder_pool = shared_encoder_pool()
+
+# One RealCameraProcessor per session instead of a shared global instance
+camera_sessions = SessionManager(
+    lambda: RealCameraProcessor(pose_pool=pose_pool, encoder_pool=encoder_pool,
+                                frame_bus=os.environ.get('FRAME_BUS') == '1'),
+    max_sessions=MAX_SESSIONS,
+    idle_timeout=SESSION_IDLE_TIMEOUT,
+    close=lambda processor: processor.close()
+)
+
+# Build the pool's graphs now, off the request path, so the first sessions get warm ones
+pose_pool.prewarm(background=True)
@@ -0,0 +1,326 @@
+"""Shared-memory frame bus for running a camera's pipeline on several cores.
+
+Capture writes each frame once into a preallocated slot of a SharedRing
+(FrameCapture can retrieve straight into it); the inference and encoder
+processes (bus_workers) read it in place by slot, and send their results
+(landmarks + analysis + the worker's quality status, JPEG bytes) back
+through rings of their own. Every ring has a single writer and needs no locks: a slot's
+write number is cleared while it is rewritten and set again when the
+payload is complete, so readers can tell whether what they read is whole.
+"""
+import json
+import multiprocessing as mp
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pose_detection.landmarks import NUM_LANDMARKS
+
+MAGIC = 0x46425553  # "FBUS"
+ALIGN = 64
+
+# Ring header fields (int64)
+H_MAGIC, H_SLOTS, H_SLOT_BYTES, H_LATEST, H_SKIPPED, H_OVERRUNS = range(6)
+HEADER_FIELDS = 8
+# Per-slot metadata fields (int64)
+M_WRITE, M_SEQ, M_LENGTH = range(3)
+META_FIELDS = 3
+
+Slot = namedtuple('Slot', ['write_no', 'seq', 'timestamp', 'payload'])
+BusResult = namedtuple('BusResult', ['write_no', 'seq', 'timestamp', 'landmarks', 'analysis', 'quality'])
+
+POLL_INTERVAL_S = 0.002
+LANDMARK_BYTES = NUM_LANDMARKS * 4 * 4
+RESULT_SLOT_BYTES = 16 * 1024
+
+
+def _aligned(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _json_default(value):
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class SharedRing:
+    """Fixed number of fixed-size slots in one shared memory block
+
+    Layout: int64 header | int64 (write no, seq, length) per slot |
+    float64 timestamp per slot | slot payloads. One process writes with
+    write(); any number of processes read with latest(), which returns a
+    zero-copy view of the payload that stays intact until `slots - 1`
+    further writes (check with valid()).
+    """
+
+    def __init__(self, name=None, slots=4, slot_bytes=0, create=True):
+        if create:
+            size = self._offsets(slots, slot_bytes)[-1]
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            # Workers are spawned by the owner and share its resource tracker,
+            # so attaching does not hand them the block's lifetime
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = create
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        if create:
+            header[:] = 0
+            header[H_MAGIC] = MAGIC
+            header[H_SLOTS] = slots
+            header[H_SLOT_BYTES] = slot_bytes
+        elif header[H_MAGIC] != MAGIC:
+            raise ValueError(f"Shared memory '{name}' is not a frame bus ring")
+        self.slots = int(header[H_SLOTS])
+        self.slot_bytes = int(header[H_SLOT_BYTES])
+
+        meta_at, stamps_at, data_at, _ = self._offsets(self.slots, self.slot_bytes)
+        self.header = header
+        self.meta = np.ndarray((self.slots, META_FIELDS), dtype=np.int64, buffer=self.shm.buf, offset=meta_at)
+        self.stamps = np.ndarray((self.slots,), dtype=np.float64, buffer=self.shm.buf, offset=stamps_at)
+        self.data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf, offset=data_at)
+        if create:
+            self.meta[:] = 0
+
+    @staticmethod
+    def _offsets(slots, slot_bytes):
+        meta_at = _aligned(HEADER_FIELDS * 8)
+        stamps_at = meta_at + _aligned(slots * META_FIELDS * 8)
+        data_at = stamps_at + _aligned(slots * 8)
+        return meta_at, stamps_at, data_at, data_at + slots * slot_bytes
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def writes(self):
+        return int(self.header[H_LATEST])
+
+    def begin(self):
+        """Claim the next slot; returns (write_no, payload buffer)"""
+        write_no = self.writes + 1
+        index = write_no % self.slots
+        self.meta[index, M_WRITE] = 0  # readers now see the slot as incomplete
+        return write_no, self.data[index]
+
+    def commit(self, write_no, seq, length, timestamp):
+        index = write_no % self.slots
+        self.meta[index, M_SEQ] = seq
+        self.meta[index, M_LENGTH] = length
+        self.stamps[index] = timestamp
+        self.meta[index, M_WRITE] = write_no
+        self.header[H_LATEST] = write_no
+
+    def write(self, payload, seq, timestamp):
+        """Copy bytes (or a uint8 array) into the next slot; False if it does not fit"""
+        payload = np.frombuffer(payload, dtype=np.uint8) if isinstance(payload, (bytes, bytearray, memoryview)) \
+            else payload.reshape(-1).view(np.uint8)
+        if payload.size > self.slot_bytes:
+            return False
+        write_no, buffer = self.begin()
+        buffer[:payload.size] = payload
+        self.commit(write_no, seq, payload.size, timestamp)
+        return True
+
+    def latest(self):
+        """Slot of the newest complete write, or None"""
+        write_no = self.writes
+        if write_no == 0:
+            return None
+        index = write_no % self.slots
+        meta = self.meta[index]
+        length = int(meta[M_LENGTH])
+        seq = int(meta[M_SEQ])
+        timestamp = float(self.stamps[index])
+        if meta[M_WRITE] != write_no:
+            return None  # overwritten while we looked
+        return Slot(write_no, seq, timestamp, self.data[index, :length])
+
+    def valid(self, write_no):
+        """True while the slot of write_no has not been rewritten"""
+        return self.meta[write_no % self.slots, M_WRITE] == write_no
+
+    def count(self, field, n=1):
+        """Bump a header counter (only the ring's writer should call this)"""
+        self.header[field] += n
+
+    def get_stats(self):
+        return {
+            "name": self.name,
+            "slots": self.slots,
+            "writes": self.writes,
+            "skipped": int(self.header[H_SKIPPED]),
+            "overruns": int(self.header[H_OVERRUNS])
+        }
+
+    def close(self):
+        self.header = self.meta = self.stamps = self.data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # Someone still holds a view (e.g. a capture thread that did not stop);
+            # the mapping goes away with the process
+            print(f"⚠️ Shared memory '{self.name}' still in use; leaving it mapped")
+        if self.owner:
+            self.shm.unlink()
+
+
+class FrameBus(SharedRing):
+    """SharedRing of fixed-shape uint8 frames"""
+
+    def __init__(self, shape, name=None, slots=4, create=True):
+        self.shape = tuple(shape)
+        super().__init__(name, slots, int(np.prod(self.shape)), create)
+
+    def write_frame(self, image, seq, timestamp):
+        if image.shape != self.shape:
+            raise ValueError(f"Frame shape {image.shape} does not match the bus ({self.shape})")
+        write_no, buffer = self.begin()
+        buffer.reshape(self.shape)[:] = image
+        self.commit(write_no, seq, buffer.size, timestamp)
+        return write_no
+
+    def frames(self):
+        """(slots, h, w, c) view of every slot, for a writer that fills slots in place
+
+        Pair each filled slot with begin() before and commit() after, as
+        FrameCapture does when it captures into the bus.
+        """
+        return self.data.reshape((self.slots,) + self.shape)
+
+    def latest_frame(self):
+        """Slot whose payload is a zero-copy (h, w, c) view, or None"""
+        slot = self.latest()
+        if slot is None:
+            return None
+        return slot._replace(payload=slot.payload.reshape(self.shape))
+
+
+class ResultBus(SharedRing):
+    """SharedRing of (33, 4) landmarks plus a JSON analysis dict and quality status"""
+
+    def __init__(self, name=None, slots=4, create=True):
+        super().__init__(name, slots, RESULT_SLOT_BYTES, create)
+
+    def write_result(self, seq, timestamp, landmarks, analysis, quality=None):
+        body = json.dumps({"analysis": analysis, "quality": quality}, default=_json_default).encode('utf-8')
+        if LANDMARK_BYTES + 8 + len(body) > self.slot_bytes:
+            body = json.dumps({"analysis": {"error": "Analysis too large for the result bus"},
+                               "quality": quality}).encode('utf-8')
+        write_no, buffer = self.begin()
+        has_landmarks = landmarks is not None
+        buffer[:8].view(np.int64)[0] = has_landmarks
+        if has_landmarks:
+            buffer[8:8 + LANDMARK_BYTES].view(np.float32)[:] = np.asarray(landmarks, dtype=np.float32).reshape(-1)
+        buffer[8 + LANDMARK_BYTES:8 + LANDMARK_BYTES + len(body)] = np.frombuffer(body, dtype=np.uint8)
+        self.commit(write_no, seq, 8 + LANDMARK_BYTES + len(body), timestamp)
+
+    def latest_result(self):
+        """Copy of the newest result as a BusResult, or None"""
+        slot = self.latest()
+        if slot is None:
+            return None
+        payload = slot.payload.copy()
+        if not self.valid(slot.write_no):
+            return None
+        landmarks = None
+        if payload[:8].view(np.int64)[0]:
+            landmarks = payload[8:8 + LANDMARK_BYTES].view(np.float32).reshape(NUM_LANDMARKS, 4)
+        body = json.loads(payload[8 + LANDMARK_BYTES:].tobytes())
+        return BusResult(slot.write_no, slot.seq, slot.timestamp, landmarks, body["analysis"], body["quality"])
+
+
+class FramePipeline:
+    """One camera's capture -> inference / encoder processes, joined by shared memory
+
+    The capturing process fills the 'raw' bus for every frame (publish(),
+    or a FrameCapture capturing straight into frame_buses['raw']) and may
+    publish the annotated frame it composites. It calls poll_result() for
+    analysis it has not seen yet and latest_jpeg() for the encoder's newest
+    JPEG of a variant. Processes are spawned (not forked) so they start without the
+    capture process's threads and MediaPipe graphs.
+    """
+
+    def __init__(self, shape, slots=4, variants=('raw', 'annotated'), quality=80, size=None,
+                 processor_options=None):
+        self.shape = tuple(shape)
+        self.quality = quality
+        self.size = size
+        self.frame_buses = {variant: FrameBus(self.shape, slots=slots) for variant in variants}
+        jpeg_bytes = int(np.prod(self.shape)) + 64 * 1024
+        self.jpeg_buses = {variant: SharedRing(slots=slots, slot_bytes=jpeg_bytes) for variant in variants}
+        self.results = ResultBus(slots=slots)
+        self.processor_options = dict(processor_options or {})
+
+        self._context = mp.get_context('spawn')
+        self._stop = self._context.Event()
+        self.processes = []
+        self._last_result = 0
+
+    def start(self):
+        # Spawned children import only bus_workers (and what it needs), not the server
+        from bus_workers import inference_worker, encoder_worker
+
+        options = {**self.processor_options, "shape": self.shape}
+        inference = self._context.Process(
+            target=inference_worker,
+            args=(self.frame_buses['raw'].name, self.results.name, self._stop, options),
+            name='pose-inference', daemon=True
+        )
+        encoder = self._context.Process(
+            target=encoder_worker,
+            args=({variant: (self.frame_buses[variant].name, self.jpeg_buses[variant].name, self.shape)
+                   for variant in self.frame_buses}, self._stop, self.quality, self.size),
+            name='jpeg-encoder', daemon=True
+        )
+        self.processes = [inference, encoder]
+        for process in self.processes:
+            process.start()
+        print(f"🚌 Frame bus started ({len(self.processes)} worker processes, {self.shape[1]}x{self.shape[0]})")
+        return self
+
+    def publish(self, variant, image, seq, timestamp):
+        return self.frame_buses[variant].write_frame(image, seq, timestamp)
+
+    def poll_result(self):
+        """Newest BusResult not returned before, or None"""
+        result = self.results.latest_result()
+        if result is None or result.write_no == self._last_result:
+            return None
+        self._last_result = result.write_no
+        return result
+
+    def latest_jpeg(self, variant):
+        """(frame seq, JPEG bytes) of the encoder's newest output, or None"""
+        jpegs = self.jpeg_buses[variant]
+        slot = jpegs.latest()
+        if slot is None:
+            return None
+        jpeg = slot.payload.tobytes()
+        if not jpegs.valid(slot.write_no):
+            return None
+        return slot.seq, jpeg
+
+    @property
+    def alive(self):
+        return bool(self.processes) and all(process.is_alive() for process in self.processes)
+
+    def close(self):
+        """Stop the workers and free the shared memory"""
+        self._stop.set()
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        for ring in [*self.frame_buses.values(), *self.jpeg_buses.values(), self.results]:
+            ring.close()
+
+    def get_stats(self):
+        return {
+            "alive": self.alive,
+            "frames": {variant: bus.get_stats() for variant, bus in self.frame_buses.items()},
+            "results": self.results.get_stats(),
+            "jpeg": {variant: bus.get_stats() for variant, bus in self.jpeg_buses.items()}
+        }
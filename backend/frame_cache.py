@@ -0,0 +1,119 @@
+import cv2
+import base64
+import threading
+import time
+from collections import OrderedDict
+
+
+class EncodedFrame:
+    """JPEG bytes for one (frame seq, variant, quality, size) combination"""
+    __slots__ = ('seq', 'jpeg', 'etag', '_data_uri')
+
+    def __init__(self, seq, jpeg, etag):
+        self.seq = seq
+        self.jpeg = jpeg
+        self.etag = etag
+        self._data_uri = None
+
+    @property
+    def data_uri(self):
+        """Base64 data URI, built once on first use"""
+        if self._data_uri is None:
+            jpg_as_text = base64.b64encode(self.jpeg).decode('utf-8')
+            self._data_uri = f"data:image/jpeg;base64,{jpg_as_text}"
+        return self._data_uri
+
+
+class _Encoding:
+    """An encode in progress that other readers of the same key wait on"""
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class EncodedFrameCache:
+    """Encode each captured frame once and share the bytes with every reader"""
+
+    def __init__(self, max_frames=2):
+        self.max_frames = max_frames
+        self._frames = OrderedDict()  # seq -> {key: EncodedFrame}
+        self._encoding = {}  # (seq, key) -> _Encoding
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Sequence numbers restart with the process, so tag ETags with an epoch
+        self.epoch = format(int(time.time() * 1000), 'x')
+
+    def make_etag(self, seq, variant='raw', quality=80, size=None):
+        """ETag value (unquoted) for a frame variant"""
+        size_tag = f"{size[0]}x{size[1]}" if size else "native"
+        return f"{self.epoch}-{seq}-{variant}-q{quality}-{size_tag}"
+
+    def get(self, seq, frame, quality=80, size=None, variant='raw', render=None):
+        """Return the EncodedFrame for seq, encoding it only on the first request
+
+        render, if given, is called with the frame before encoding (e.g. to
+        draw an overlay) and is only invoked on a cache miss.
+        """
+        key = (variant, quality, size)
+        with self._lock:
+            entries = self._frames.get(seq)
+            if entries is not None and key in entries:
+                self.hits += 1
+                return entries[key]
+
+            # Concurrent readers of the same variant wait for one encode
+            # instead of all running their own; other variants (and frames)
+            # encode in parallel.
+            encoding = self._encoding.get((seq, key))
+            if encoding is not None:
+                self.hits += 1
+                owner = False
+            else:
+                self.misses += 1
+                encoding = self._encoding[(seq, key)] = _Encoding()
+                owner = True
+
+        if not owner:
+            encoding.done.wait()
+            return encoding.result
+
+        try:
+            encoding.result = self._encode(seq, frame, quality, size, variant, render)
+        finally:
+            with self._lock:
+                if encoding.result is not None:
+                    entries = self._frames.get(seq)
+                    if entries is None:
+                        entries = self._frames[seq] = {}
+                        while len(self._frames) > self.max_frames:
+                            self._frames.popitem(last=False)
+                    entries[key] = encoding.result
+                del self._encoding[(seq, key)]
+            encoding.done.set()
+        return encoding.result
+
+    def _encode(self, seq, frame, quality, size, variant, render):
+        image = render(frame) if render else frame
+        if size and (image.shape[1], image.shape[0]) != tuple(size):
+            image = cv2.resize(image, tuple(size), interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ret:
+            return None
+        return EncodedFrame(seq, buffer.tobytes(), self.make_etag(seq, variant, quality, size))
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+    def get_stats(self):
+        """Cache hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "cached_frames": len(self._frames)
+        }
@@ -0,0 +1,202 @@
+import cv2
+import numpy as np
+import threading
+import time
+
+
+class CapturedFrame:
+    """A frame stamped with its capture sequence number and monotonic time
+
+    image is a view into the capture ring buffer. It stays valid until the
+    ring wraps around (buffer_size - 1 newer frames); copy() a frame before
+    handing it to anything that may read it later (streams, encoders).
+    """
+    __slots__ = ('seq', 'timestamp', 'image')
+
+    def __init__(self, seq, timestamp, image):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.image = image
+
+    def copy(self):
+        """The same frame with pixels of its own, safe from ring reuse"""
+        return CapturedFrame(self.seq, self.timestamp, self.image.copy())
+
+
+class FrameCapture:
+    """Continuously grab frames on a thread into a preallocated ring buffer
+
+    The loop never sleeps: grab() blocks until the driver has the next frame,
+    so the driver buffer stays drained and readers always see the freshest
+    frame. Anything with grab()/retrieve()/isOpened() can be captured.
+
+    Given a frame_bus.FrameBus as `ring`, its shared memory slots are the
+    ring buffer: frames are retrieved straight into them and committed to
+    the bus, so other processes read them without another copy.
+    """
+
+    def __init__(self, source, buffer_size=8, ring=None):
+        self.source = source
+        self.shared_ring = ring
+        self.buffer_size = ring.slots if ring is not None else buffer_size
+        self.running = False
+        self.thread = None
+        self.condition = threading.Condition()
+
+        # Ring buffer, allocated on the first frame once the shape is known
+        # (frame seq n lives in slot n % buffer_size)
+        self._ring = ring.frames() if ring is not None else None
+        self._timestamps = np.zeros(self.buffer_size, dtype=np.float64)
+        self.seq = 0
+
+        self.read_failures = 0
+        self.started_at = None
+
+    def start(self):
+        """Start the capture thread"""
+        if self.running:
+            return
+        # Ask the driver not to queue frames we are going to skip anyway
+        if hasattr(self.source, 'set'):
+            self.source.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.running = True
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the capture thread (the source is left open for its owner)"""
+        self.running = False
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+    def _capture_loop(self):
+        try:
+            self._capture_frames()
+        finally:
+            self.running = False
+            with self.condition:
+                self.condition.notify_all()
+
+    def _capture_frames(self):
+        while self.running and self.source.isOpened():
+            if not self.source.grab():
+                self.read_failures += 1
+                time.sleep(0.005)
+                continue
+            timestamp = time.monotonic()
+
+            slot = (self.seq + 1) % self.buffer_size
+            target = self._ring[slot] if self._ring is not None else None
+            if self.shared_ring is not None:
+                self.shared_ring.begin()  # other processes now see the slot as incomplete
+            ret, image = self.source.retrieve(target) if target is not None else self.source.retrieve()
+            if not ret or image is None:
+                self.read_failures += 1
+                continue
+
+            if self._ring is None or self._ring.shape[1:] != image.shape or self._ring.dtype != image.dtype:
+                if self.shared_ring is not None:
+                    # A shared ring has a fixed frame size
+                    self.read_failures += 1
+                    continue
+                self._ring = np.empty((self.buffer_size,) + image.shape, dtype=image.dtype)
+            if not np.shares_memory(image, self._ring[slot]):
+                np.copyto(self._ring[slot], image)
+            if self.shared_ring is not None:
+                self.shared_ring.commit(self.seq + 1, self.seq + 1, image.nbytes, timestamp)
+
+            with self.condition:
+                self._timestamps[slot] = timestamp
+                self.seq += 1
+                self.condition.notify_all()
+
+    def latest(self):
+        """Return the freshest CapturedFrame, or None before the first frame"""
+        with self.condition:
+            return self._latest_locked()
+
+    def _latest_locked(self):
+        if self.seq == 0:
+            return None
+        slot = self.seq % self.buffer_size
+        return CapturedFrame(self.seq, float(self._timestamps[slot]), self._ring[slot])
+
+    def wait_for_frame(self, last_seq, timeout=1.0):
+        """Block until a frame newer than last_seq exists and return the freshest one"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.seq > last_seq or not self.running, timeout=timeout)
+            if self.seq <= last_seq:
+                return None
+            return self._latest_locked()
+
+    def reader(self):
+        """Create a FrameReader that tracks its own delivered/dropped/duplicate counts"""
+        return FrameReader(self)
+
+    def get_fps(self):
+        """Measured capture rate over the frames currently in the ring buffer"""
+        with self.condition:
+            count = min(self.seq, self.buffer_size)
+            if count < 2:
+                return 0.0
+            newest = self.seq % self.buffer_size
+            oldest = (self.seq - count + 1) % self.buffer_size
+            span = self._timestamps[newest] - self._timestamps[oldest]
+        return (count - 1) / span if span > 0 else 0.0
+
+    def get_stats(self):
+        """Capture counters and measured FPS"""
+        uptime = time.monotonic() - self.started_at if self.started_at else 0.0
+        return {
+            "running": self.running,
+            "frames_captured": self.seq,
+            "read_failures": self.read_failures,
+            "capture_fps": round(self.get_fps(), 1),
+            "average_fps": round(self.seq / uptime, 1) if uptime > 0 else 0.0,
+            "buffer_size": self.buffer_size
+        }
+
+
+class FrameReader:
+    """One consumer's view of a FrameCapture with frame accounting"""
+
+    def __init__(self, capture):
+        self.capture = capture
+        self.last_seq = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.duplicates = 0
+
+    def read(self, timeout=1.0):
+        """Wait for the next fresh frame; frames skipped meanwhile count as dropped"""
+        frame = self.capture.wait_for_frame(self.last_seq, timeout)
+        if frame is not None:
+            self._account(frame)
+        return frame
+
+    def read_latest(self):
+        """Return the freshest frame without waiting; a repeat counts as a duplicate"""
+        frame = self.capture.latest()
+        if frame is not None:
+            self._account(frame)
+        return frame
+
+    def _account(self, frame):
+        if frame.seq == self.last_seq:
+            self.duplicates += 1
+            return
+        if self.last_seq:
+            self.dropped += max(0, frame.seq - self.last_seq - 1)
+        self.delivered += 1
+        self.last_seq = frame.seq
+
+    def get_stats(self):
+        return {
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "duplicates": self.duplicates
+        }
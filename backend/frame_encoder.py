@@ -0,0 +1,323 @@
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+Rung = namedtuple('Rung', ['name', 'scale', 'quality'])
+
+# Best first; each step down roughly halves the bytes per frame
+LADDER = (
+    Rung('full_hq', 1.0, 90),
+    Rung('full', 1.0, 70),
+    Rung('half', 0.5, 70),
+    Rung('half_lq', 0.5, 45),
+)
+AUTO = 'auto'
+
+
+def rung_size(rung, shape):
+    """Encoded (width, height) of a rung for a frame shape, None for native size"""
+    if rung.scale == 1.0:
+        return None
+    height, width = shape[:2]
+    return (max(1, round(width * rung.scale)), max(1, round(height * rung.scale)))
+
+
+class EncoderPool:
+    """JPEG encoder threads shared by every session
+
+    cv2.imencode and cv2.resize release the GIL, so a few threads encode in
+    parallel without holding up the capture loop or request threads. Jobs
+    beyond max_pending are dropped instead of queued: by the time a backlog
+    clears, a newer frame has replaced the one it would have encoded.
+    """
+
+    def __init__(self, workers=2, max_pending=None):
+        self.workers = workers
+        self.max_pending = max_pending or workers * 4
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jpeg-encoder')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.busy_s = 0.0
+
+    def submit(self, fn, *args):
+        """Run fn(*args) on a worker; returns False if the job was dropped"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            self.submitted += 1
+        self._executor.submit(self._run, fn, args)
+        return True
+
+    def _run(self, fn, args):
+        start = time.perf_counter()
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"⚠️ Encoder job failed: {e}")
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.busy_s += time.perf_counter() - start
+
+    def get_stats(self):
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "avg_encode_ms": round(self.busy_s / self.completed * 1000, 2) if self.completed else 0.0
+        }
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_encoder_pool():
+    """The process-wide EncoderPool (ENCODER_WORKERS threads), built on first use"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = EncoderPool(workers=int(os.environ.get('ENCODER_WORKERS', 2)))
+        return _shared_pool
+
+
+class Subscription:
+    """One stream's interest in a (variant, rung) pair of a LadderEncoder"""
+
+    def __init__(self, encoder, variant, rung, fps):
+        self.encoder = encoder
+        self.variant = variant
+        self.rung = rung
+        self.fps = fps
+
+    def switch(self, rung):
+        """Move the stream to another rung"""
+        if rung != self.rung:
+            with self.encoder._lock:
+                self.rung = rung
+
+    def close(self):
+        self.encoder.unsubscribe(self)
+
+
+class LadderEncoder:
+    """Encode each produced frame into the ladder rungs that streams watch
+
+    publish() hands every subscribed (variant, rung) of a new frame to the
+    shared pool, at no more than the fastest subscriber's frame rate, so the
+    JPEG is usually in the frame cache before a stream asks for it. Rungs
+    nobody subscribes to are never encoded ahead of time; one-off readers
+    such as polled feeds still encode on demand through encode().
+    """
+
+    def __init__(self, frame_cache, pool=None, ladder=LADDER):
+        self.frame_cache = frame_cache
+        self.pool = pool
+        self.ladder = ladder
+        self.rungs = {rung.name: rung for rung in ladder}
+        self._subscriptions = set()
+        self._last_published = {}  # (variant, rung name) -> monotonic time
+        self._lock = threading.Lock()
+        self.frame_bytes = {}  # rung name -> typical encoded frame size
+        self.published = 0
+
+    def get_rung(self, name):
+        """Rung by name; raises ValueError for unknown names"""
+        rung = self.rungs.get(name)
+        if rung is None:
+            raise ValueError(f"Unknown rung '{name}' (expected one of: {', '.join(self.rungs)})")
+        return rung
+
+    def subscribe(self, variant, rung, fps):
+        """Start pre-encoding variant at rung for a stream running at fps"""
+        self.get_rung(rung)
+        subscription = Subscription(self, variant, rung, fps)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def wanted(self):
+        """{(variant, rung name): highest subscriber fps}"""
+        with self._lock:
+            wanted = {}
+            for subscription in self._subscriptions:
+                key = (subscription.variant, subscription.rung)
+                wanted[key] = max(wanted.get(key, 0.0), subscription.fps)
+        return wanted
+
+    def publish(self, seq, images):
+        """Queue encodes of a new frame; images maps variant -> image"""
+        if self.pool is None:
+            return
+        now = time.monotonic()
+        for (variant, rung), fps in self.wanted().items():
+            image = images.get(variant)
+            if image is None:
+                continue
+            # A little slack so a stream throttled to fps still finds its frames
+            if now - self._last_published.get((variant, rung), 0.0) < 0.8 / fps:
+                continue
+            if self.pool.submit(self.encode, seq, image, variant, rung):
+                self._last_published[(variant, rung)] = now
+                self.published += 1
+
+    def encode(self, seq, image, variant, rung):
+        """EncodedFrame of image at a rung, shared through the frame cache"""
+        rung = self.get_rung(rung)
+        encoded = self.frame_cache.get(seq, image, rung.quality, rung_size(rung, image.shape), variant=variant)
+        if encoded is not None:
+            previous = self.frame_bytes.get(rung.name)
+            size = len(encoded.jpeg)
+            self.frame_bytes[rung.name] = size if previous is None else previous + 0.1 * (size - previous)
+        return encoded
+
+    def make_etag(self, seq, shape, variant, rung):
+        rung = self.get_rung(rung)
+        return self.frame_cache.make_etag(seq, variant, rung.quality, rung_size(rung, shape))
+
+    def get_stats(self):
+        return {
+            "rungs": [rung.name for rung in self.ladder],
+            "subscriptions": {f"{variant}/{rung}": fps for (variant, rung), fps in self.wanted().items()},
+            "published": self.published,
+            "frame_bytes": {name: int(size) for name, size in self.frame_bytes.items()},
+            "pool": self.pool.get_stats() if self.pool else None
+        }
+
+
+class RungSelector:
+    """Pick a ladder rung for one stream from the throughput its client takes
+
+    A socket write returns as soon as its bytes are buffered, so the time one
+    write takes says nothing about the link until the buffers are full. The
+    selector instead keeps a sliding window of `window_s` seconds and divides
+    the bytes the client actually took (written minus whatever the transport
+    still has queued) by the wall time of the window. While the writer is
+    backlogged (bytes piling up in the transport, or most of the window spent
+    blocked in writes) that rate is the link's capacity; otherwise the link
+    kept up and can take at least that much.
+
+    Capacity divided by the target frame rate is the byte budget per frame:
+    the selector steps down as soon as a backlogged stream's current rung no
+    longer fits, and steps up after `upgrade_after` consecutive uncongested
+    frames in which the next better rung would fit within `headroom` of the
+    budget. A link that keeps up never shows how much more it could take, so
+    after `probe_after` uncongested frames the better rung is tried anyway.
+    """
+
+    def __init__(self, encoder, fps, start='full', headroom=0.7, upgrade_after=15,
+                 probe_after=150, window_s=2.0, backlog_share=0.5):
+        self.encoder = encoder
+        self.fps = fps
+        self.names = [rung.name for rung in encoder.ladder]
+        self.index = self.names.index(start)
+        self.headroom = headroom
+        self.upgrade_after = upgrade_after
+        self.probe_after = probe_after
+        self.window_s = window_s
+        self.backlog_share = backlog_share
+
+        self._window = deque()  # (time, sent bytes, blocked s, queued bytes)
+        self.throughput = None  # bytes/s
+        self.backlogged = False
+        self._fits_better = 0
+        self._uncongested = 0
+        self.switches = 0
+
+    @property
+    def rung(self):
+        return self.names[self.index]
+
+    def _frame_bytes(self, index):
+        """Typical frame size of a rung, guessed from its neighbour if not seen yet"""
+        size = self.encoder.frame_bytes.get(self.names[index])
+        if size is None and index + 1 < len(self.names):
+            size = self.encoder.frame_bytes.get(self.names[index + 1])
+            size = size * 2 if size else None
+        return size
+
+    def _measure(self, now, queued_bytes):
+        """(delivered bytes/s, backlogged) over the window, None until it spans a few frames"""
+        window = self._window
+        while len(window) > 3 and now - window[1][0] >= self.window_s:
+            window.popleft()
+        elapsed = now - window[0][0]
+        if len(window) < 3 or elapsed <= 0:
+            return None
+        sent = sum(entry[1] for entry in islice(window, 1, None))
+        blocked = sum(entry[2] for entry in islice(window, 1, None))
+        backlogged = blocked >= elapsed * self.backlog_share
+        start_queued = window[0][3]
+        if queued_bytes is not None and start_queued is not None:
+            # Bytes still sitting in the transport have not reached the client
+            sent -= queued_bytes - start_queued
+            backlogged = backlogged or queued_bytes > window[-1][1]
+        return max(sent, 0) / elapsed, backlogged
+
+    def _switch(self, step):
+        self.index += step
+        self.switches += 1
+        self._fits_better = 0
+        self._uncongested = 0
+        # Frames of the old rung would skew the next measurement
+        self._window.clear()
+
+    def record(self, sent_bytes, blocked_s, queued_bytes=None, now=None):
+        """Account for one written frame; returns the rung for the next frame
+
+        blocked_s is how long writing the frame held the stream up and
+        queued_bytes, where the transport can tell, is how much it still has
+        buffered afterwards.
+        """
+        now = time.monotonic() if now is None else now
+        self._window.append((now, sent_bytes, blocked_s, queued_bytes))
+        measured = self._measure(now, queued_bytes)
+        if measured is None:
+            return self.rung
+        rate, self.backlogged = measured
+
+        if self.backlogged:
+            self.throughput = rate
+            self._fits_better = 0
+            self._uncongested = 0
+            current = self._frame_bytes(self.index)
+            if current is not None and current > rate / self.fps and self.index + 1 < len(self.names):
+                self._switch(1)
+            return self.rung
+
+        # Not congested: the link takes at least what it was given
+        self.throughput = max(self.throughput or 0.0, rate)
+        self._uncongested += 1
+        if self.index == 0:
+            return self.rung
+        better = self._frame_bytes(self.index - 1)
+        if better is not None and better <= self.throughput / self.fps * self.headroom:
+            self._fits_better += 1
+        else:
+            self._fits_better = 0
+        if self._fits_better >= self.upgrade_after or self._uncongested >= self.probe_after:
+            self._switch(-1)
+        return self.rung
+
+    def get_stats(self):
+        return {
+            "rung": self.rung,
+            "throughput_kbps": round(self.throughput * 8 / 1000, 1) if self.throughput else None,
+            "backlogged": self.backlogged,
+            "switches": self.switches
+        }
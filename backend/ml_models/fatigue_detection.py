@@ -1,26 +1,30 @@
-import numpy as np
-from collections import deque
 import time
+from ml_models.streaming_stats import RollingWindow, RollingSlope
 
 class FatigueDetector:
     def __init__(self, window_size=8):
         self.window_size = window_size
-        self.form_scores = deque(maxlen=window_size)
-        self.rep_times = deque(maxlen=window_size)
+        # Last 3 values and the 3 before them, kept as running sums
+        tails = tuple(k for k in (3, 6) if k <= window_size)
+        self.form_scores = RollingWindow(window_size, tails=tails)
+        self.rep_times = RollingWindow(window_size, tails=tails)
+        self.form_trend = RollingSlope(window_size)
         self.fatigue_level = 0
         self.last_rep_time = None
         
-    def analyze_fatigue(self, current_form_score):
+    def analyze_fatigue(self, current_form_score, timestamp=None):
         """Detect fatigue based on form degradation and timing"""
-        current_time = time.time()
+        # Offline analysis passes the media timestamp of the rep
+        current_time = time.time() if timestamp is None else timestamp
         
         # Track form scores
-        self.form_scores.append(current_form_score)
+        self.form_scores.push(current_form_score)
+        self.form_trend.push(current_form_score)
         
         # Track rep timing
         if self.last_rep_time is not None:
             rep_duration = current_time - self.last_rep_time
-            self.rep_times.append(rep_duration)
+            self.rep_times.push(rep_duration)
         self.last_rep_time = current_time
         
         # Calculate fatigue indicators
@@ -28,9 +32,9 @@ class FatigueDetector:
         
         # 1. Form degradation (50% weight)
         if len(self.form_scores) >= 3:
-            recent_avg = np.mean(list(self.form_scores)[-3:])
+            recent_avg = self.form_scores.tail_mean(3)
             if len(self.form_scores) >= 6:
-                older_avg = np.mean(list(self.form_scores)[-6:-3])
+                older_avg = self.form_scores.window_mean(3, 6)
                 form_decline = older_avg - recent_avg
                 if form_decline > 10:
                     fatigue_score += 50
@@ -38,16 +42,14 @@ class FatigueDetector:
                     fatigue_score += 25
         
         # 2. Slowing pace (30% weight)
-        if len(self.rep_times) >= 3:
-            recent_times = list(self.rep_times)[-3:]
-            if len(self.rep_times) >= 6:
-                older_times = list(self.rep_times)[-6:-3]
-                if older_times and recent_times:
-                    pace_slowdown = (np.mean(recent_times) - np.mean(older_times)) / np.mean(older_times)
-                    if pace_slowdown > 0.3:  # 30% slower
-                        fatigue_score += 30
-                    elif pace_slowdown > 0.15:  # 15% slower
-                        fatigue_score += 15
+        if len(self.rep_times) >= 6:
+            older_avg = self.rep_times.window_mean(3, 6)
+            if older_avg > 0:
+                pace_slowdown = (self.rep_times.tail_mean(3) - older_avg) / older_avg
+                if pace_slowdown > 0.3:  # 30% slower
+                    fatigue_score += 30
+                elif pace_slowdown > 0.15:  # 15% slower
+                    fatigue_score += 15
         
         # 3. Low absolute form score (20% weight)
         if current_form_score < 60:
@@ -62,7 +64,8 @@ class FatigueDetector:
             "indicators": {
                 "form_degradation": fatigue_score >= 25,
                 "slowing_pace": fatigue_score >= 15 and len(self.rep_times) >= 3,
-                "low_form_score": current_form_score < 70
+                "low_form_score": current_form_score < 70,
+                "form_trend": round(self.form_trend.slope(), 2)  # points per rep
             },
             "recommendation": self._get_fatigue_recommendation()
         }
@@ -82,5 +85,6 @@ class FatigueDetector:
         """Reset fatigue tracking"""
         self.form_scores.clear()
         self.rep_times.clear()
+        self.form_trend.clear()
         self.fatigue_level = 0
         self.last_rep_time = None
\ No newline at end of file
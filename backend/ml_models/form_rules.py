@@ -0,0 +1,214 @@
+import numpy as np
+from collections import namedtuple
+from pose_detection.angles import JOINT_NAMES, angles_from_dict
+
+# Metrics derived from joint angles: name -> (op, joints). "mean" and "min"
+# reduce over the joints, "absdiff" is |left - right| and "symmetry" scores
+# the (left, right) pairs as 100 - 2 * mean |left - right|, floored at 0.
+FORM_METRICS = (
+    ("knee_avg", "mean", ("left_knee", "right_knee")),
+    ("knee_min", "min", ("left_knee", "right_knee")),
+    ("hip_avg", "mean", ("left_hip", "right_hip")),
+    ("elbow_avg", "mean", ("left_elbow", "right_elbow")),
+    ("knee_diff", "absdiff", ("left_knee", "right_knee")),
+    ("elbow_diff", "absdiff", ("left_elbow", "right_elbow")),
+    ("hip_diff", "absdiff", ("left_hip", "right_hip")),
+    ("symmetry", "symmetry", ("left_knee", "right_knee", "left_elbow", "right_elbow",
+                              "left_hip", "right_hip")),
+)
+
+# A rule fires when the metric lies in [low, high) and subtracts its penalty
+# (negative penalties are bonuses). `closed` says which ends are included:
+# "left" (the default), "right", "both" or "neither", so each rule keeps the
+# exact '<' / '>' of the if/elif chain it replaces. Rules on the same metric
+# with disjoint ranges replace those chains. Critical feedback is listed first.
+FormRule = namedtuple('FormRule', ['metric', 'low', 'high', 'penalty', 'code', 'severity', 'closed'],
+                      defaults=("left",))
+CLOSED_SIDES = {"left": (True, False), "right": (False, True), "both": (True, True), "neither": (False, False)}
+
+INF = float('inf')
+
+FORM_RULES = {
+    "squats": (
+        FormRule("knee_avg", 140, INF, 20, "squat_too_shallow", "warning", "neither"),
+        FormRule("knee_avg", -INF, 80, -5, "squat_excellent_depth", "info"),
+        FormRule("knee_avg", 80, 100, 0, "squat_good_depth", "info"),
+        FormRule("knee_avg", 100, 140, 0, "squat_adequate_depth", "info", "both"),
+        FormRule("hip_avg", -INF, 80, 30, "back_rounding", "critical"),
+        FormRule("hip_avg", 80, 100, 10, "spine_not_neutral", "warning"),
+        FormRule("hip_avg", 100, INF, 0, "good_back_posture", "info"),
+        FormRule("symmetry", -INF, 80, 10, "squat_asymmetric", "warning"),
+        FormRule("symmetry", 80, INF, 0, "good_symmetry", "info"),
+        FormRule("knee_diff", 15, INF, 0, "knee_difference", "warning", "neither"),
+        FormRule("elbow_diff", 20, INF, 0, "elbow_difference", "warning", "neither"),
+        FormRule("hip_diff", 10, INF, 0, "hip_difference", "warning", "neither"),
+    ),
+    "pushups": (
+        FormRule("elbow_avg", 120, INF, 25, "pushup_too_shallow", "warning", "neither"),
+        FormRule("elbow_avg", -INF, 90, -5, "pushup_chest_to_ground", "info"),
+        FormRule("elbow_avg", 90, 120, 0, "pushup_good_depth", "info", "both"),
+        FormRule("hip_avg", -INF, 150, 30, "hips_sagging", "critical"),
+        FormRule("hip_avg", 170, INF, 5, "body_not_straight", "warning", "neither"),
+        FormRule("hip_avg", 150, 170, 0, "good_body_alignment", "info", "both"),
+        FormRule("symmetry", -INF, 80, 10, "arms_uneven", "warning"),
+        FormRule("knee_diff", 15, INF, 0, "knee_difference", "warning", "neither"),
+        FormRule("elbow_diff", 20, INF, 0, "elbow_difference", "warning", "neither"),
+        FormRule("hip_diff", 10, INF, 0, "hip_difference", "warning", "neither"),
+    ),
+    "lunges": (
+        FormRule("knee_min", 130, INF, 20, "lunge_too_shallow", "warning", "neither"),
+        FormRule("knee_min", -INF, 100, 0, "lunge_good_depth", "info"),
+        FormRule("hip_diff", -INF, 20, 10, "lunge_no_split", "warning"),
+    ),
+}
+
+FEEDBACK_MESSAGES = {
+    "squat_too_shallow": "⬇️ Go deeper for effective squat",
+    "squat_excellent_depth": "🔥 Excellent depth!",
+    "squat_good_depth": "💪 Good squat depth",
+    "squat_adequate_depth": "📏 Adequate depth",
+    "back_rounding": "🚨 Back rounding - risk of injury!",
+    "spine_not_neutral": "📐 Maintain neutral spine",
+    "good_back_posture": "✅ Good back posture",
+    "squat_asymmetric": "⚖️ Work on left-right symmetry",
+    "good_symmetry": "✅ Good symmetry",
+    "knee_difference": "⚖️ Knee difference: {value:.1f}°",
+    "elbow_difference": "⚖️ Elbow difference: {value:.1f}°",
+    "hip_difference": "⚖️ Hip difference: {value:.1f}°",
+    "pushup_too_shallow": "⬇️ Go lower for effective push-up",
+    "pushup_chest_to_ground": "🔥 Chest to ground!",
+    "pushup_good_depth": "💪 Good depth",
+    "hips_sagging": "🚨 Don't sag your hips!",
+    "body_not_straight": "📐 Keep body straight",
+    "good_body_alignment": "✅ Good body alignment",
+    "arms_uneven": "⚖️ Arms uneven",
+    "lunge_too_shallow": "⬇️ Lower your back knee",
+    "lunge_good_depth": "🔥 Great lunge depth!",
+    "lunge_no_split": "👣 Step one foot forward",
+}
+
+# Metrics reported back to the client per exercise: report key -> metric
+FORM_REPORTS = {
+    "squats": {"depth_angle": "knee_avg", "back_angle": "hip_avg", "symmetry_score": "symmetry"},
+    "pushups": {"elbow_angle": "elbow_avg", "body_alignment": "hip_avg", "symmetry_score": "symmetry"},
+    "lunges": {"front_knee_angle": "knee_min", "symmetry_score": "symmetry"},
+}
+
+FormEvaluation = namedtuple('FormEvaluation', ['scores', 'fired', 'metrics'])
+
+_CompiledRules = namedtuple('_CompiledRules', ['rules', 'metric', 'low', 'high', 'low_closed', 'high_closed',
+                                               'penalty', 'critical'])
+
+
+class FormRuleEngine:
+    """Score form by evaluating a rule table as NumPy masks
+
+    Angles are (J,) or (N, J) rows in JOINT_NAMES order (or a dict for one
+    frame). A whole recording is scored with a few array operations per
+    metric and rule table, not a Python loop per frame.
+    """
+
+    def __init__(self, rules=None, metrics=FORM_METRICS, joint_names=JOINT_NAMES,
+                 messages=FEEDBACK_MESSAGES, reports=FORM_REPORTS):
+        self.joint_names = tuple(joint_names)
+        self.messages = messages
+        self.reports = reports
+        joint_index = {name: i for i, name in enumerate(self.joint_names)}
+
+        self.metric_names = tuple(name for name, _, _ in metrics)
+        self.metric_index = {name: i for i, name in enumerate(self.metric_names)}
+        self._metrics = [
+            (op, np.array([joint_index[j] for j in joints], dtype=np.intp))
+            for _, op, joints in metrics
+        ]
+
+        self.rules = {}
+        for exercise, table in (rules or FORM_RULES).items():
+            self.rules[exercise] = _CompiledRules(
+                rules=tuple(table),
+                metric=np.array([self.metric_index[r.metric] for r in table], dtype=np.intp),
+                low=np.array([r.low for r in table], dtype=np.float32),
+                high=np.array([r.high for r in table], dtype=np.float32),
+                low_closed=np.array([CLOSED_SIDES[r.closed][0] for r in table], dtype=bool),
+                high_closed=np.array([CLOSED_SIDES[r.closed][1] for r in table], dtype=bool),
+                penalty=np.array([r.penalty for r in table], dtype=np.int32),
+                critical=np.array([r.severity == "critical" for r in table], dtype=bool)
+            )
+
+    def supports(self, exercise):
+        return exercise in self.rules
+
+    def _as_matrix(self, angles):
+        if isinstance(angles, dict):
+            angles = angles_from_dict(angles, self.joint_names)
+        angles = np.asarray(angles, dtype=np.float32)
+        return angles[None] if angles.ndim == 1 else angles
+
+    def compute_metrics(self, angles):
+        """(N, M) metric values for (N, J) angles (NaN where a joint is missing)"""
+        angles = self._as_matrix(angles)
+        values = np.empty((len(angles), len(self._metrics)), dtype=np.float32)
+        for i, (op, joints) in enumerate(self._metrics):
+            selected = angles[:, joints]
+            if op == "mean":
+                values[:, i] = selected.mean(axis=1)
+            elif op == "min":
+                values[:, i] = selected.min(axis=1)
+            elif op == "absdiff":
+                values[:, i] = np.abs(selected[:, 0] - selected[:, 1])
+            elif op == "symmetry":
+                diffs = np.abs(selected[:, 0::2] - selected[:, 1::2])
+                values[:, i] = np.maximum(100 - diffs.mean(axis=1) * 2, 0)
+            else:
+                raise ValueError(f"Unknown metric op '{op}'")
+        return values
+
+    def evaluate(self, angles, exercise):
+        """Scores (N,), fired-rule mask (N, R) and metrics (N, M) for a batch"""
+        compiled = self.rules[exercise]
+        metrics = self.compute_metrics(angles)
+        values = metrics[:, compiled.metric]
+        with np.errstate(invalid='ignore'):
+            above_low = (values > compiled.low) | (compiled.low_closed & (values == compiled.low))
+            below_high = (values < compiled.high) | (compiled.high_closed & (values == compiled.high))
+            fired = above_low & below_high
+        scores = np.maximum(100 - fired.astype(np.int32) @ compiled.penalty, 0)
+        return FormEvaluation(scores, fired, metrics)
+
+    def score(self, angles, exercise):
+        """Form scores only, (N,) int32"""
+        return self.evaluate(angles, exercise).scores
+
+    def analyze(self, angles, exercise):
+        """Single-frame form analysis in the analyzers' dict format"""
+        compiled = self.rules[exercise]
+        evaluation = self.evaluate(angles, exercise)
+        fired = evaluation.fired[0]
+        metrics = evaluation.metrics[0]
+
+        critical_errors, feedback = [], []
+        for i in np.flatnonzero(fired):
+            rule = compiled.rules[i]
+            message = self.messages[rule.code].format(value=float(metrics[compiled.metric[i]]))
+            (critical_errors if compiled.critical[i] else feedback).append(message)
+
+        report = {
+            key: self._json_value(metrics[self.metric_index[metric]])
+            for key, metric in self.reports.get(exercise, {}).items()
+        }
+        report["has_critical_errors"] = bool(critical_errors)
+        return {
+            "form_score": int(evaluation.scores[0]),
+            "feedback": critical_errors + feedback,
+            "feedback_codes": [compiled.rules[i].code for i in np.flatnonzero(fired)],
+            "metrics": report
+        }
+
+    @staticmethod
+    def _json_value(value):
+        value = float(value)
+        return None if value != value else value
+
+
+# Shared, read-only after construction
+form_rules = FormRuleEngine()
@@ -1,5 +1,6 @@
 import numpy as np
 import math
+from pose_detection.angles import joint_angles, angles_to_dict
 
 class EnhancedPoseDetector:
     def __init__(self):
@@ -58,8 +59,14 @@ class EnhancedPoseDetector:
         
         return angles, current_pos['state']
     
-    def calculate_advanced_angles(self):
-        """Calculate detailed joint angles for better form analysis"""
+    def calculate_advanced_angles(self, landmarks=None):
+        """Calculate detailed joint angles for better form analysis
+
+        With a LandmarkFrame the real angles come from the shared joint-angle
+        kernel; without one the simulated angles are returned.
+        """
+        if landmarks is not None:
+            return angles_to_dict(joint_angles(landmarks.data))
         angles, state = self.simulate_pose_landmarks()
         return angles
     
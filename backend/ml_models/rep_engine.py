@@ -0,0 +1,190 @@
+import numpy as np
+from pose_detection.angles import JOINT_NAMES, angles_from_dict
+
+# Declarative exercise table. Each exercise is driven by one or two joint
+# angles combined with `aggregate`. A rep starts when the driving angle
+# drops below `down_below` and is counted when it rises back above
+# `up_above` (the gap between them is the hysteresis band). The time spent
+# in the bottom phase must lie within [min_phase_s, max_phase_s], which
+# rejects jitter and slow non-reps such as sitting down. Exercises that
+# bend the same joints are told apart by the |left - right| difference of
+# `split_joints` when the rep starts: a lunge's front hip flexes while the
+# back hip stays extended, a squat flexes both hips alike.
+LUNGE_HIP_SPLIT = 30
+
+EXERCISE_DEFINITIONS = {
+    "squats": {
+        "joints": ("left_knee", "right_knee"),
+        "aggregate": "max",  # both knees must bend
+        "down_below": 100,
+        "up_above": 160,
+        "split_joints": ("left_hip", "right_hip"),
+        "split_below": LUNGE_HIP_SPLIT,
+        "min_phase_s": 0.15,
+        "max_phase_s": 10.0,
+    },
+    "pushups": {
+        "joints": ("left_elbow", "right_elbow"),
+        "aggregate": "mean",
+        "down_below": 90,
+        "up_above": 160,
+        "min_phase_s": 0.1,
+        "max_phase_s": 10.0,
+    },
+    "lunges": {
+        "joints": ("left_knee", "right_knee"),
+        "aggregate": "min",  # one knee bends deeply
+        "down_below": 100,
+        "up_above": 160,
+        "split_joints": ("left_hip", "right_hip"),
+        "split_above": LUNGE_HIP_SPLIT,
+        "min_phase_s": 0.15,
+        "max_phase_s": 10.0,
+    },
+}
+
+AGGREGATES = ("mean", "min", "max")
+UP, DOWN = 0, 1
+
+
+class RepEngine:
+    """Count reps for every registered exercise at once from joint angles
+
+    The table is compiled into arrays, so each update is a handful of NumPy
+    operations whose cost does not depend on how many exercises exist.
+    """
+
+    def __init__(self, definitions=None, joint_names=JOINT_NAMES):
+        self.joint_names = tuple(joint_names)
+        self.joint_index = {name: i for i, name in enumerate(joint_names)}
+        self.definitions = {}
+        for name, definition in (definitions or EXERCISE_DEFINITIONS).items():
+            self.definitions[name] = dict(definition)
+        self._compile()
+
+    def register(self, name, definition):
+        """Add or replace an exercise definition (counts are kept for existing ones)"""
+        counts = self.counts()
+        self.definitions[name] = dict(definition)
+        self._compile()
+        for i, exercise in enumerate(self.names):
+            self.rep_counts[i] = counts.get(exercise, 0)
+
+    def _compile(self):
+        self.names = tuple(self.definitions)
+        size = len(self.names)
+        width = max((len(d["joints"]) for d in self.definitions.values()), default=1)
+
+        # Pad short joint lists by repeating their first joint; repeating a
+        # value does not change its mean, min or max.
+        self.driver_index = np.zeros((size, width), dtype=np.intp)
+        self.aggregate = np.zeros(size, dtype=np.int8)
+        self.down_below = np.zeros(size, dtype=np.float32)
+        self.up_above = np.zeros(size, dtype=np.float32)
+        self.min_phase = np.zeros(size, dtype=np.float64)
+        self.max_phase = np.zeros(size, dtype=np.float64)
+        self.split_index = np.zeros((size, 2), dtype=np.intp)
+        self.has_split = np.zeros(size, dtype=bool)
+        self.split_above = np.full(size, -np.inf, dtype=np.float32)
+        self.split_below = np.full(size, np.inf, dtype=np.float32)
+        for i, name in enumerate(self.names):
+            definition = self.definitions[name]
+            joints = [self.joint_index[j] for j in definition["joints"]]
+            self.driver_index[i] = joints + [joints[0]] * (width - len(joints))
+            self.aggregate[i] = AGGREGATES.index(definition.get("aggregate", "mean"))
+            self.down_below[i] = definition["down_below"]
+            self.up_above[i] = definition["up_above"]
+            self.min_phase[i] = definition.get("min_phase_s", 0.0)
+            self.max_phase[i] = definition.get("max_phase_s", np.inf)
+            if "split_joints" in definition:
+                self.split_index[i] = [self.joint_index[j] for j in definition["split_joints"]]
+                self.has_split[i] = True
+                self.split_above[i] = definition.get("split_above", -np.inf)
+                self.split_below[i] = definition.get("split_below", np.inf)
+
+        self.phase = np.full(size, UP, dtype=np.int8)
+        self.phase_start = np.zeros(size, dtype=np.float64)
+        self.rep_counts = np.zeros(size, dtype=np.int64)
+        self.rejected = np.zeros(size, dtype=np.int64)
+        self.entered_down = np.zeros(size, dtype=bool)
+        self.driving_angles = np.full(size, np.nan, dtype=np.float32)
+
+    def update(self, angles, timestamp):
+        """Advance every exercise by one frame of joint angles (JOINT_NAMES order)
+
+        Returns the names of exercises that completed a rep on this frame.
+        NaN angles (e.g. low visibility) leave that exercise's state alone.
+        """
+        angles = np.asarray(angles, dtype=np.float32)
+        values = angles[self.driver_index]
+        split_values = angles[self.split_index]
+        with np.errstate(invalid='ignore'):
+            candidates = np.stack((values.mean(axis=1), values.min(axis=1), values.max(axis=1)))
+            split = np.abs(split_values[:, 0] - split_values[:, 1])
+        driving = candidates[self.aggregate, np.arange(len(self.names))]
+        self.driving_angles = driving
+
+        with np.errstate(invalid='ignore'):
+            # A rep only starts in its own stance (NaN splits never qualify)
+            stance = ~self.has_split | ((split >= self.split_above) & (split <= self.split_below))
+            go_down = (self.phase == UP) & (driving < self.down_below) & stance
+            go_up = (self.phase == DOWN) & (driving > self.up_above)
+
+        duration = timestamp - self.phase_start
+        completed = go_up & (duration >= self.min_phase) & (duration <= self.max_phase)
+        self.rep_counts += completed
+        self.rejected += go_up & ~completed
+
+        changed = go_down | go_up
+        self.phase[go_down] = DOWN
+        self.phase[go_up] = UP
+        self.phase_start[changed] = timestamp
+        self.entered_down = go_down
+
+        if not completed.any():
+            return []
+        return [self.names[i] for i in np.flatnonzero(completed)]
+
+    def update_dict(self, angles, timestamp):
+        """update() for a {joint name: degrees} dict; missing joints count as NaN"""
+        return self.update(angles_from_dict(angles, self.joint_names), timestamp)
+
+    def count_batch(self, angles, timestamps):
+        """Run a whole recording ((N, J) angles, (N,) timestamps) through the engine"""
+        reps = []
+        for row, timestamp in zip(angles, timestamps):
+            for name in self.update(row, timestamp):
+                reps.append((name, float(timestamp)))
+        return reps
+
+    def counts(self):
+        return {name: int(count) for name, count in zip(self.names, self.rep_counts)}
+
+    def count(self, name):
+        return int(self.rep_counts[self.names.index(name)])
+
+    def get_phase(self, name):
+        return "down" if self.phase[self.names.index(name)] == DOWN else "up"
+
+    def just_entered_down(self, name):
+        """True if the last update moved this exercise into its bottom phase"""
+        return bool(self.entered_down[self.names.index(name)])
+
+    def reset(self, name=None):
+        """Reset counters and phases (for one exercise or all)"""
+        selected = slice(None) if name is None else self.names.index(name)
+        self.phase[selected] = UP
+        self.phase_start[selected] = 0.0
+        self.rep_counts[selected] = 0
+        self.rejected[selected] = 0
+        self.entered_down[selected] = False
+
+    def get_status(self):
+        return {
+            name: {
+                "count": int(self.rep_counts[i]),
+                "phase": "down" if self.phase[i] == DOWN else "up",
+                "rejected": int(self.rejected[i])
+            }
+            for i, name in enumerate(self.names)
+        }
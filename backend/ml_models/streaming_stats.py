@@ -0,0 +1,312 @@
+import numpy as np
+
+# Running sums are rebuilt from the buffer this often so float add/subtract
+# error cannot accumulate over a long session.
+RESYNC_INTERVAL = 4096
+
+
+class RollingWindow:
+    """Fixed-size ring buffer with O(1) running sums
+
+    Besides the whole window, it keeps sums of the newest `tails` and the
+    oldest `heads` values (e.g. tails=(3, 6) gives the last 3 and, by
+    difference, the 3 before them). push() touches a constant number of
+    slots and allocates nothing.
+    """
+
+    def __init__(self, size, heads=(), tails=()):
+        if any(k >= size for k in heads) or any(k > size for k in tails):
+            raise ValueError("head windows must be shorter than size, tail windows at most size")
+        self.size = size
+        self.heads = tuple(heads)
+        self.tails = tuple(tails)
+        self._buffer = [0.0] * size
+        self.clear()
+
+    def clear(self):
+        self._pos = 0  # next slot to write; the oldest value once full
+        self.count = 0
+        self.total = 0.0
+        self._head_sums = [0.0] * len(self.heads)
+        self._tail_sums = [0.0] * len(self.tails)
+        self._pushes = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self):
+        return self.count == self.size
+
+    def push(self, value):
+        """Append a value, evicting the oldest once the window is full"""
+        buffer, size, pos, count = self._buffer, self.size, self._pos, self.count
+        full = count == size
+
+        # Read every value that leaves a sub-window before overwriting
+        for i, k in enumerate(self.tails):
+            leaving = buffer[(pos - k) % size] if count >= k else 0.0
+            self._tail_sums[i] += value - leaving
+        for i, k in enumerate(self.heads):
+            if full:
+                self._head_sums[i] += buffer[(pos + k) % size] - buffer[pos]
+            elif count < k:
+                self._head_sums[i] += value
+        self.total += value - (buffer[pos] if full else 0.0)
+
+        buffer[pos] = value
+        self._pos = (pos + 1) % size
+        if not full:
+            self.count = count + 1
+
+        self._pushes += 1
+        if self._pushes % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def _resync(self):
+        values = self.values()
+        self.total = float(sum(values))
+        self._tail_sums = [float(sum(values[len(values) - min(k, len(values)):])) for k in self.tails]
+        self._head_sums = [float(sum(values[:k])) for k in self.heads]
+
+    def values(self):
+        """Window contents, oldest first (allocates; for inspection)"""
+        if not self.full:
+            return self._buffer[:self.count]
+        return self._buffer[self._pos:] + self._buffer[:self._pos]
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def tail_sum(self, k):
+        return self._tail_sums[self.tails.index(k)]
+
+    def tail_mean(self, k):
+        """Mean of the newest k values (fewer if the window holds fewer)"""
+        n = min(k, self.count)
+        return self.tail_sum(k) / n if n else 0.0
+
+    def head_mean(self, k):
+        """Mean of the oldest k values in the window"""
+        n = min(k, self.count)
+        return self._head_sums[self.heads.index(k)] / n if n else 0.0
+
+    def window_mean(self, newest, oldest):
+        """Mean of values from the `oldest`-th to the `newest`+1-th newest (both tails)
+
+        window_mean(3, 6) is the mean of the three values before the last three.
+        """
+        n = min(oldest, self.count) - min(newest, self.count)
+        return (self.tail_sum(oldest) - self.tail_sum(newest)) / n if n > 0 else 0.0
+
+
+class Ewma:
+    """Exponentially weighted moving average; the first sample seeds it"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, sample):
+        if self.value is None:
+            self.value = float(sample)
+        else:
+            self.value += self.alpha * (sample - self.value)
+        return self.value
+
+    def clear(self):
+        self.value = None
+
+
+class RollingSlope:
+    """Least-squares slope of the last `size` (x, y) samples, in O(1) per push
+
+    x defaults to the sample number, giving the change per sample.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._x = [0.0] * size
+        self._y = [0.0] * size
+        self.clear()
+
+    def clear(self):
+        self._pos = 0
+        self.count = 0
+        self._n = 0  # samples pushed in total (the default x)
+        self.sum_x = self.sum_y = self.sum_xx = self.sum_xy = 0.0
+
+    def push(self, y, x=None):
+        x = float(self._n if x is None else x)
+        pos = self._pos
+        if self.count == self.size:
+            old_x, old_y = self._x[pos], self._y[pos]
+            self.sum_x -= old_x
+            self.sum_y -= old_y
+            self.sum_xx -= old_x * old_x
+            self.sum_xy -= old_x * old_y
+        else:
+            self.count += 1
+        self._x[pos], self._y[pos] = x, y
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xx += x * x
+        self.sum_xy += x * y
+        self._pos = (pos + 1) % self.size
+        self._n += 1
+        if self._n % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def _resync(self):
+        xs, ys = self._x[:self.count], self._y[:self.count]
+        self.sum_x, self.sum_y = float(sum(xs)), float(sum(ys))
+        self.sum_xx = float(sum(x * x for x in xs))
+        self.sum_xy = float(sum(x * y for x, y in zip(xs, ys)))
+
+    def slope(self):
+        """Slope of the window, or 0.0 with fewer than two distinct x values"""
+        n = self.count
+        denominator = n * self.sum_xx - self.sum_x * self.sum_x
+        if n < 2 or denominator <= 1e-12 * max(1.0, n * self.sum_xx):
+            return 0.0
+        return (n * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+
+class RollingWindowBank:
+    """RollingWindow state for many sessions as one struct-of-arrays
+
+    Each session owns a row (slot). push() updates any set of rows with a
+    few vectorized NumPy operations, so thousands of sessions advance in a
+    single step. Slots passed to one push() must be unique.
+    """
+
+    def __init__(self, size, capacity=64, heads=(), tails=(), ewma_alpha=None):
+        if any(k >= size for k in heads) or any(k > size for k in tails):
+            raise ValueError("head windows must be shorter than size, tail windows at most size")
+        self.size = size
+        self.heads = tuple(heads)
+        self.tails = tuple(tails)
+        self.ewma_alpha = ewma_alpha
+        self.capacity = 0
+        self._free = []
+        self._pushes = 0
+        self._allocate_arrays(capacity)
+
+    def _allocate_arrays(self, capacity):
+        """Grow every per-slot array to capacity, keeping existing rows"""
+        def grow(array, shape, fill=0):
+            grown = np.full(shape, fill, dtype=array.dtype if array is not None else np.float64)
+            if array is not None:
+                grown[:len(array)] = array
+            return grown
+
+        old = self.capacity
+        self.buffer = grow(getattr(self, 'buffer', None), (capacity, self.size))
+        self.position = grow(getattr(self, 'position', None), capacity).astype(np.intp)
+        self.count = grow(getattr(self, 'count', None), capacity).astype(np.intp)
+        self.total = grow(getattr(self, 'total', None), capacity)
+        self.head_sums = grow(getattr(self, 'head_sums', None), (capacity, len(self.heads)))
+        self.tail_sums = grow(getattr(self, 'tail_sums', None), (capacity, len(self.tails)))
+        self.ewma = grow(getattr(self, 'ewma', None), capacity, np.nan)
+        self.in_use = grow(getattr(self, 'in_use', None), capacity, False).astype(bool)
+        self.capacity = capacity
+        self._free.extend(range(capacity - 1, old - 1, -1))
+
+    def allocate(self):
+        """Reserve a cleared slot (the bank doubles in size when full)"""
+        if not self._free:
+            self._allocate_arrays(max(self.capacity * 2, 1))
+        slot = self._free.pop()
+        self.clear(slot)
+        self.in_use[slot] = True
+        return slot
+
+    def release(self, slot):
+        self.in_use[slot] = False
+        self._free.append(slot)
+
+    def clear(self, slots):
+        self.buffer[slots] = 0.0
+        self.position[slots] = 0
+        self.count[slots] = 0
+        self.total[slots] = 0.0
+        self.head_sums[slots] = 0.0
+        self.tail_sums[slots] = 0.0
+        self.ewma[slots] = np.nan
+
+    def push(self, values, slots=None):
+        """Append one value per slot (all in-use slots when slots is None)"""
+        slots = np.flatnonzero(self.in_use) if slots is None else np.asarray(slots, dtype=np.intp)
+        values = np.asarray(values, dtype=np.float64)
+        size = self.size
+        position = self.position[slots]
+        count = self.count[slots]
+        full = count == size
+        buffer = self.buffer
+
+        oldest = buffer[slots, position]
+        for i, k in enumerate(self.tails):
+            leaving = np.where(count >= k, buffer[slots, (position - k) % size], 0.0)
+            self.tail_sums[slots, i] += values - leaving
+        for i, k in enumerate(self.heads):
+            entering = buffer[slots, (position + k) % size]
+            delta = np.where(full, entering - oldest, np.where(count < k, values, 0.0))
+            self.head_sums[slots, i] += delta
+        self.total[slots] += values - np.where(full, oldest, 0.0)
+
+        if self.ewma_alpha is not None:
+            previous = self.ewma[slots]
+            self.ewma[slots] = np.where(np.isnan(previous), values,
+                                        previous + self.ewma_alpha * (values - previous))
+
+        buffer[slots, position] = values
+        self.position[slots] = (position + 1) % size
+        self.count[slots] = np.minimum(count + 1, size)
+
+        self._pushes += 1
+        if self._pushes % RESYNC_INTERVAL == 0:
+            self._resync()
+
+    def _resync(self):
+        """Rebuild every running sum from the buffers"""
+        size = self.size
+        # Column j of `ordered` is the j-th oldest value in each row
+        order = (self.position[:, None] + np.arange(size)) % size
+        ordered = np.take_along_axis(self.buffer, order, axis=1)
+        partial = self.count < size
+        ordered[partial] = self.buffer[partial]  # not wrapped yet: oldest is column 0
+        valid = np.arange(size) < self.count[:, None]
+        ordered = np.where(valid, ordered, 0.0)
+        self.total = ordered.sum(axis=1)
+        for i, k in enumerate(self.heads):
+            self.head_sums[:, i] = ordered[:, :k].sum(axis=1)
+        newest = self.count
+        cumulative = np.concatenate((np.zeros((len(ordered), 1)), np.cumsum(ordered, axis=1)), axis=1)
+        rows = np.arange(len(ordered))
+        for i, k in enumerate(self.tails):
+            start = np.maximum(newest - k, 0)
+            self.tail_sums[:, i] = cumulative[rows, newest] - cumulative[rows, start]
+
+    def mean(self, slots=None):
+        slots = slice(None) if slots is None else slots
+        count = self.count[slots]
+        return np.divide(self.total[slots], count, out=np.zeros(np.shape(count)), where=count > 0)
+
+    def tail_mean(self, k, slots=None):
+        slots = slice(None) if slots is None else slots
+        n = np.minimum(self.count[slots], k)
+        sums = self.tail_sums[slots, self.tails.index(k)]
+        return np.divide(sums, n, out=np.zeros(np.shape(n)), where=n > 0)
+
+    def head_mean(self, k, slots=None):
+        slots = slice(None) if slots is None else slots
+        n = np.minimum(self.count[slots], k)
+        sums = self.head_sums[slots, self.heads.index(k)]
+        return np.divide(sums, n, out=np.zeros(np.shape(n)), where=n > 0)
+
+    def get_stats(self):
+        return {
+            "capacity": self.capacity,
+            "in_use": int(self.in_use.sum()),
+            "window_size": self.size
+        }
@@ -0,0 +1,82 @@
+import numpy as np
+from pose_detection.landmarks import (
+    LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST,
+    LEFT_HIP, RIGHT_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE,
+    LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX, VISIBILITY
+)
+
+# Joint angle table: name -> (first point, vertex, second point)
+JOINTS = (
+    ("left_elbow", (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST)),
+    ("right_elbow", (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST)),
+    ("left_shoulder", (LEFT_ELBOW, LEFT_SHOULDER, LEFT_HIP)),
+    ("right_shoulder", (RIGHT_ELBOW, RIGHT_SHOULDER, RIGHT_HIP)),
+    ("left_hip", (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE)),
+    ("right_hip", (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE)),
+    ("left_knee", (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)),
+    ("right_knee", (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)),
+    ("left_ankle", (LEFT_KNEE, LEFT_ANKLE, LEFT_FOOT_INDEX)),
+    ("right_ankle", (RIGHT_KNEE, RIGHT_ANKLE, RIGHT_FOOT_INDEX)),
+)
+JOINT_NAMES = tuple(name for name, _ in JOINTS)
+JOINT_TRIPLETS = np.array([triplet for _, triplet in JOINTS], dtype=np.intp)
+JOINT_INDEX = {name: i for i, name in enumerate(JOINT_NAMES)}
+
+
+def joint_angles(landmarks, triplets=JOINT_TRIPLETS, use_z=False, min_visibility=None):
+    """Angles in degrees (0-180) for every joint triplet, for one or many frames
+
+    landmarks is (33, C) or (N, 33, C) with C >= 2 columns (x, y[, z[, visibility]]).
+    Returns (J,) or (N, J) float32. With min_visibility set, angles whose
+    three points are not all at least that visible are NaN (needs C == 4).
+    """
+    points = np.asarray(landmarks, dtype=np.float32)
+    single = points.ndim == 2
+    if single:
+        points = points[None]
+
+    coords = points[..., :3] if use_z else points[..., :2]
+    vertex = coords[:, triplets[:, 1]]
+    first = coords[:, triplets[:, 0]] - vertex
+    second = coords[:, triplets[:, 2]] - vertex
+
+    # atan2(|a x b|, a . b) is stable near 0 and 180 degrees, unlike arccos
+    dot = np.einsum('njk,njk->nj', first, second)
+    if use_z:
+        cross = np.linalg.norm(np.cross(first, second), axis=-1)
+    else:
+        cross = np.abs(first[..., 0] * second[..., 1] - first[..., 1] * second[..., 0])
+    angles = np.degrees(np.arctan2(cross, dot)).astype(np.float32, copy=False)
+
+    if min_visibility is not None:
+        visible = (points[:, triplets, VISIBILITY] >= min_visibility).all(axis=-1)
+        angles[~visible] = np.nan
+
+    return angles[0] if single else angles
+
+
+def three_point_angle(point1, point2, point3, use_z=False):
+    """Angle at point2 (degrees) between point1 and point3"""
+    points = np.array([point1, point2, point3], dtype=np.float32)
+    return float(joint_angles(points, np.array([[0, 1, 2]]), use_z=use_z)[0])
+
+
+def angles_to_dict(angles, names=JOINT_NAMES, decimals=None):
+    """Map one frame's angle row to {joint name: degrees} (NaN becomes None)"""
+    result = {}
+    for name, value in zip(names, angles.tolist()):
+        if value != value:  # NaN
+            result[name] = None
+        else:
+            result[name] = round(value, decimals) if decimals is not None else value
+    return result
+
+
+def angles_from_dict(angles, names=JOINT_NAMES):
+    """Inverse of angles_to_dict: a (J,) float32 row, NaN for missing joints"""
+    row = np.full(len(names), np.nan, dtype=np.float32)
+    for i, name in enumerate(names):
+        value = angles.get(name)
+        if value is not None:
+            row[i] = value
+    return row
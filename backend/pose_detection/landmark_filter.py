@@ -0,0 +1,88 @@
+import numpy as np
+from pose_detection.landmarks import NUM_LANDMARKS, VISIBILITY
+
+
+class OneEuroFilter:
+    """One-Euro filter over a whole (33, 4) landmark array in one step
+
+    Every x/y/z coordinate is smoothed with an adaptive low-pass filter: the
+    cutoff rises with speed (beta), so slow jitter is removed while fast
+    movement keeps little lag. Each joint's minimum cutoff is scaled by its
+    visibility, so uncertain joints are smoothed harder. Visibility itself
+    passes through unchanged. One instance holds one person's state.
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=5.0, d_cutoff=1.0, min_visibility_scale=0.25,
+                 max_gap_s=0.5, default_dt=1.0 / 30):
+        self.min_cutoff = min_cutoff
+        self.beta = beta  # coordinates are normalized, so speeds are small
+        self.d_cutoff = d_cutoff
+        self.min_visibility_scale = min_visibility_scale
+        self.max_gap_s = max_gap_s
+        self.default_dt = default_dt
+
+        self._value = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._speed = np.zeros((NUM_LANDMARKS, 3), dtype=np.float32)
+        self._cutoff = np.empty((NUM_LANDMARKS, 1), dtype=np.float32)
+        self._last_timestamp = None
+
+        self.frames_filtered = 0
+        self.resets = 0
+
+    def reset(self):
+        """Forget the previous frame (e.g. after the person was lost)"""
+        if self._last_timestamp is not None:
+            self.resets += 1
+        self._last_timestamp = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        tau = 1.0 / (2.0 * np.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, data, timestamp):
+        """Filter an (33, 4) x, y, z, visibility array in place and return it"""
+        coords = data[:, :3]
+        if self._last_timestamp is not None:
+            dt = timestamp - self._last_timestamp
+            if dt > self.max_gap_s:
+                self.reset()
+        if self._last_timestamp is None:
+            self._value[:] = coords
+            self._speed[:] = 0.0
+            self._last_timestamp = timestamp
+            return data
+
+        dt = timestamp - self._last_timestamp
+        if dt <= 0:
+            dt = self.default_dt
+        self._last_timestamp = timestamp
+
+        # Smoothed speed drives the adaptive cutoff
+        speed = (coords - self._value) / dt
+        self._speed += self._alpha(self.d_cutoff, dt) * (speed - self._speed)
+
+        visibility = np.clip(data[:, VISIBILITY:VISIBILITY + 1], self.min_visibility_scale, 1.0)
+        np.multiply(visibility, self.min_cutoff, out=self._cutoff)
+        cutoff = self._cutoff + self.beta * np.abs(self._speed)
+
+        self._value += self._alpha(cutoff, dt) * (coords - self._value)
+        coords[:] = self._value
+        self.frames_filtered += 1
+        return data
+
+    def filter_sequence(self, data, timestamps):
+        """Offline replay: filter an (N, 33, 4) recording, returning a filtered copy"""
+        filtered = np.array(data, dtype=np.float32, copy=True)
+        self.reset()
+        for frame, timestamp in zip(filtered, timestamps):
+            self(frame, timestamp)
+        return filtered
+
+    def get_stats(self):
+        return {
+            "min_cutoff": self.min_cutoff,
+            "beta": self.beta,
+            "frames_filtered": self.frames_filtered,
+            "resets": self.resets
+        }
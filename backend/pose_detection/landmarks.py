@@ -0,0 +1,111 @@
+import numpy as np
+
+# MediaPipe Pose landmark indices
+NOSE = 0
+LEFT_EYE_INNER = 1
+LEFT_EYE = 2
+LEFT_EYE_OUTER = 3
+RIGHT_EYE_INNER = 4
+RIGHT_EYE = 5
+RIGHT_EYE_OUTER = 6
+LEFT_EAR = 7
+RIGHT_EAR = 8
+MOUTH_LEFT = 9
+MOUTH_RIGHT = 10
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_PINKY = 17
+RIGHT_PINKY = 18
+LEFT_INDEX = 19
+RIGHT_INDEX = 20
+LEFT_THUMB = 21
+RIGHT_THUMB = 22
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+LEFT_HEEL = 29
+RIGHT_HEEL = 30
+LEFT_FOOT_INDEX = 31
+RIGHT_FOOT_INDEX = 32
+
+NUM_LANDMARKS = 33
+
+# Column indices in LandmarkFrame.data
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+
+class LandmarkFrame:
+    """One frame of pose landmarks as a (33, 4) float32 array of x, y, z, visibility
+
+    Indexing a frame returns the landmark's row, so frame[LEFT_KNEE][:2] is
+    the knee's (x, y). Buffers can be refilled in place with
+    fill_from_mediapipe() to avoid per-frame allocation; copy() a frame you
+    need to keep.
+    """
+    __slots__ = ('data', 'timestamp', 'seq', 'source')
+
+    def __init__(self, data=None, timestamp=0.0, seq=0, source=None):
+        if data is None:
+            data = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self.data = data
+        self.timestamp = timestamp
+        self.seq = seq
+        self.source = source
+
+    @classmethod
+    def from_mediapipe(cls, pose_landmarks, timestamp=0.0, seq=0, source=None):
+        """Build a frame from a MediaPipe NormalizedLandmarkList"""
+        frame = cls(timestamp=timestamp, seq=seq, source=source)
+        return frame.fill_from_mediapipe(pose_landmarks)
+
+    def fill_from_mediapipe(self, pose_landmarks, timestamp=None, seq=None):
+        """Overwrite this frame's buffer from a MediaPipe NormalizedLandmarkList"""
+        points = pose_landmarks.landmark
+        self.data.reshape(-1)[:] = np.fromiter(
+            (v for p in points for v in (p.x, p.y, p.z, p.visibility)),
+            dtype=np.float32, count=NUM_LANDMARKS * 4
+        )
+        if timestamp is not None:
+            self.timestamp = timestamp
+        if seq is not None:
+            self.seq = seq
+        return self
+
+    @property
+    def xy(self):
+        return self.data[:, :2]
+
+    @property
+    def xyz(self):
+        return self.data[:, :3]
+
+    @property
+    def visibility(self):
+        return self.data[:, VISIBILITY]
+
+    def __getitem__(self, index):
+        return self.data[index]
+
+    def __len__(self):
+        return NUM_LANDMARKS
+
+    def copy(self):
+        return LandmarkFrame(self.data.copy(), self.timestamp, self.seq, self.source)
+
+    def to_dicts(self):
+        """Legacy list-of-dicts form ({'x', 'y', 'z', 'visibility'} per landmark)"""
+        return [
+            {'x': float(x), 'y': float(y), 'z': float(z), 'visibility': float(v)}
+            for x, y, z, v in self.data
+        ]
+
+    def to_list(self):
+        """JSON-friendly nested list"""
+        return self.data.tolist()
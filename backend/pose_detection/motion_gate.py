@@ -0,0 +1,90 @@
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Skip pose inference while the scene is static
+
+    Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+    thumbnail of the last frame that was actually analysed (not merely the
+    previous frame, so slow movement still adds up). Inference is skipped
+    while fewer than `motion_threshold` of the pixels changed by more than
+    `pixel_threshold`, but never for longer than `max_interval_s`.
+    """
+
+    def __init__(self, width=64, pixel_threshold=12, motion_threshold=0.005, max_interval_s=1.0):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+        self.max_interval_s = max_interval_s
+
+        self._reference = None
+        self._thumbnail = None
+        self._diff = None
+        self._last_inference = None
+        self.last_motion = 1.0
+
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.forced_refreshes = 0
+
+    def reset(self):
+        """Require inference on the next frame"""
+        self._reference = None
+        self._last_inference = None
+
+    def _make_thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, round(height * self.width / width)))
+        if self._thumbnail is None or self._thumbnail.shape[::-1] != size:
+            self._thumbnail = np.empty(size[::-1], dtype=np.uint8)
+            self._diff = np.empty(size[::-1], dtype=np.uint8)
+        # Shrink first (a strided view, then area averaging) so the color
+        # conversion only touches a few thousand pixels
+        step = max(1, width // (self.width * 4))
+        small = cv2.resize(frame[::step, ::step], size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            cv2.cvtColor(small, cv2.COLOR_BGR2GRAY, dst=self._thumbnail)
+        else:
+            self._thumbnail[:] = small
+        return self._thumbnail
+
+    def should_analyze(self, frame, timestamp):
+        """True if this frame needs pose inference (and makes it the new reference)"""
+        self.frames_checked += 1
+        thumbnail = self._make_thumbnail(frame)
+
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            self.last_motion = 1.0
+            return self._accept(thumbnail, timestamp)
+
+        cv2.absdiff(thumbnail, self._reference, dst=self._diff)
+        self.last_motion = cv2.countNonZero(
+            cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)[1]
+        ) / float(self._diff.size)
+        if self.last_motion >= self.motion_threshold:
+            return self._accept(thumbnail, timestamp)
+
+        if timestamp - self._last_inference >= self.max_interval_s:
+            self.forced_refreshes += 1
+            return self._accept(thumbnail, timestamp)
+
+        self.frames_skipped += 1
+        return False
+
+    def _accept(self, thumbnail, timestamp):
+        if self._reference is None or self._reference.shape != thumbnail.shape:
+            self._reference = thumbnail.copy()
+        else:
+            self._reference[:] = thumbnail
+        self._last_inference = timestamp
+        return True
+
+    def get_stats(self):
+        return {
+            "frames_checked": self.frames_checked,
+            "frames_skipped": self.frames_skipped,
+            "forced_refreshes": self.forced_refreshes,
+            "skip_rate": round(self.frames_skipped / self.frames_checked, 3) if self.frames_checked else 0.0,
+            "last_motion": round(self.last_motion, 4)
+        }
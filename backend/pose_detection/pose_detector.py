@@ -1,30 +1,44 @@
 import cv2
 import mediapipe as mp
 import numpy as np
+from pose_detection.landmarks import LandmarkFrame
 
 class PoseDetector:
-    def __init__(self):
+    def __init__(self, pose_pool=None):
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=1,
-            smooth_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+        self.pose_pool = pose_pool
+        if pose_pool:
+            self.pose = pose_pool.acquire()
+        else:
+            self.pose = self.mp_pose.Pose(
+                static_image_mode=False,
+                model_complexity=1,
+                smooth_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
         self.mp_drawing = mp.solutions.drawing_utils
     
-    def detect_pose(self, image):
-        """Detect human pose in image"""
+    def close(self):
+        """Release the pose graph (back to the pool if leased)"""
+        if self.pose is None:
+            return
+        if self.pose_pool:
+            self.pose_pool.release(self.pose)
+        else:
+            self.pose.close()
+        self.pose = None
+    
+    def detect_pose(self, image, timestamp=0.0, seq=0):
+        """Detect human pose in image, returning a LandmarkFrame or None"""
         # Convert BGR to RGB
         image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         results = self.pose.process(image_rgb)
         
         if results.pose_landmarks:
-            landmarks = []
-            for landmark in results.pose_landmarks.landmark:
-                landmarks.append([landmark.x, landmark.y, landmark.z])
-            return landmarks
+            return LandmarkFrame.from_mediapipe(
+                results.pose_landmarks, timestamp=timestamp, seq=seq, source="pose_detector"
+            )
         return None
     
     def draw_pose(self, image, landmarks):
@@ -0,0 +1,201 @@
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import mediapipe as mp
+import numpy as np
+
+DEFAULT_POSE_OPTIONS = {
+    "static_image_mode": False,
+    "smooth_landmarks": True,
+    "min_detection_confidence": 0.5,
+    "min_tracking_confidence": 0.5,
+}
+
+
+class PosePool:
+    """Pre-built, pre-warmed MediaPipe Pose graphs leased out one per user
+
+    Building a Pose graph takes hundreds of ms and the first process() call
+    is slower still, and a graph must not be shared between threads. The
+    pool builds instances ahead of time, runs a dummy frame through each,
+    and hands them out exclusively. Returned instances have their tracking
+    state reset so the next user starts clean; a lease that is dropped
+    without being returned gives its slot back when the instance is
+    garbage-collected.
+    """
+
+    def __init__(self, size=2, max_size=None, model_complexity=1, **pose_options):
+        self.size = size
+        self.max_size = max(max_size or size * 2, size)
+        self.model_complexity = model_complexity
+        self.pose_options = {**DEFAULT_POSE_OPTIONS, **pose_options}
+
+        self._idle = {}      # model_complexity -> [Pose]
+        self._leased = {}    # id(pose) -> (finalizer, model_complexity)
+        self._created = 0
+        self._condition = threading.Condition()
+
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self._warming = set()  # complexities being prewarmed
+
+    def _build(self, model_complexity):
+        pose = mp.solutions.pose.Pose(model_complexity=model_complexity, **self.pose_options)
+        # Run one dummy frame so the first real frame doesn't pay graph start-up
+        pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+        pose.reset()
+        return pose
+
+    def prewarm(self, count=None, model_complexity=None, background=False):
+        """Build and warm instances up to count (default: size) ahead of use"""
+        if background:
+            threading.Thread(target=self.prewarm, args=(count, model_complexity), daemon=True).start()
+            return
+        complexity = self.model_complexity if model_complexity is None else model_complexity
+        target = self.size if count is None else count
+        with self._condition:
+            if complexity in self._warming:
+                return
+            self._warming.add(complexity)
+        try:
+            while True:
+                with self._condition:
+                    idle = len(self._idle.get(complexity, []))
+                    if idle >= target or self._created >= self.max_size:
+                        return
+                    self._created += 1
+                try:
+                    pose = self._build(complexity)
+                except Exception:
+                    with self._condition:
+                        self._created -= 1
+                    raise
+                with self._condition:
+                    self._idle.setdefault(complexity, []).append(pose)
+                    self._condition.notify_all()
+        finally:
+            with self._condition:
+                self._warming.discard(complexity)
+
+    def acquire(self, model_complexity=None, timeout=None):
+        """Lease a Pose instance; raises TimeoutError if none frees up in time"""
+        complexity = self.model_complexity if model_complexity is None else model_complexity
+        started = time.monotonic()
+        waited = False
+        with self._condition:
+            while True:
+                idle = self._idle.get(complexity)
+                if idle:
+                    pose = idle.pop()
+                    self._lend(pose, complexity)
+                    if waited:
+                        self._record_wait(time.monotonic() - started)
+                    else:
+                        self.hits += 1
+                    return pose
+
+                if self._created >= self.max_size:
+                    # Make room by retiring an idle instance of another complexity
+                    spare = next((c for c, poses in self._idle.items() if poses), None)
+                    if spare is not None:
+                        self._idle[spare].pop().close()
+                        self._created -= 1
+
+                if self._created < self.max_size:
+                    self._created += 1
+                    self.misses += 1
+                    break
+
+                remaining = None if timeout is None else timeout - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No pose engine available")
+                waited = True
+                self._condition.wait(remaining)
+
+        try:
+            pose = self._build(complexity)
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            self._lend(pose, complexity)
+        return pose
+
+    def _lend(self, pose, complexity):
+        # The finalizer drops the entry before the id can be reused
+        key = id(pose)
+        self._leased[key] = (weakref.finalize(pose, self._lease_dropped, key), complexity)
+
+    def _lease_dropped(self, key):
+        """A leased instance was garbage-collected without being released"""
+        with self._condition:
+            if self._leased.pop(key, None) is not None:
+                self._created -= 1
+                self._condition.notify_all()
+
+    def _record_wait(self, wait_s):
+        self.waits += 1
+        self.total_wait_s += wait_s
+        self.max_wait_s = max(self.max_wait_s, wait_s)
+
+    def release(self, pose):
+        """Return a leased instance; its tracking state is reset first"""
+        with self._condition:
+            lease = self._leased.pop(id(pose), None)
+        if lease is None:
+            return
+        finalizer, complexity = lease
+        finalizer.detach()
+        try:
+            pose.reset()
+        except Exception:
+            pose.close()
+            with self._condition:
+                self._created -= 1
+                self._condition.notify_all()
+            return
+        with self._condition:
+            self._idle.setdefault(complexity, []).append(pose)
+            self._condition.notify_all()
+
+    @contextmanager
+    def lease(self, model_complexity=None, timeout=None):
+        """Context manager form of acquire()/release()"""
+        pose = self.acquire(model_complexity, timeout)
+        try:
+            yield pose
+        finally:
+            self.release(pose)
+
+    def close(self):
+        """Close all idle instances"""
+        with self._condition:
+            for poses in self._idle.values():
+                for pose in poses:
+                    pose.close()
+                    self._created -= 1
+            self._idle.clear()
+
+    def get_stats(self):
+        with self._condition:
+            requests = self.hits + self.misses + self.waits
+            return {
+                "size": self.size,
+                "max_size": self.max_size,
+                "created": self._created,
+                "idle": {c: len(p) for c, p in self._idle.items()},
+                "in_use": len(self._leased),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "hit_rate": round(self.hits / requests, 3) if requests else 0.0,
+                "avg_wait_ms": round(self.total_wait_s / self.waits * 1000, 1) if self.waits else 0.0,
+                "max_wait_ms": round(self.max_wait_s * 1000, 1)
+            }
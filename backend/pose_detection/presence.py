@@ -0,0 +1,110 @@
+import cv2
+
+ACTIVE = "active"
+IDLE = "idle"
+
+
+class PresenceMonitor:
+    """Drop to a cheap, low-rate person check when nobody is in view
+
+    After `idle_after_frames` analysed frames without a person the monitor
+    goes idle: only one frame every `idle_check_interval_s` is checked, at
+    `idle_input_width`. The first check that finds a person switches back
+    to full-rate tracking. The wake latency is the time since the previous
+    empty check, i.e. the longest the person can have gone unnoticed.
+    """
+
+    def __init__(self, idle_after_frames=30, idle_check_interval_s=0.5, idle_input_width=256):
+        self.idle_after_frames = idle_after_frames
+        self.idle_check_interval_s = idle_check_interval_s
+        self.idle_input_width = idle_input_width
+
+        self.state = ACTIVE
+        self.empty_frames = 0
+        self._last_check = None
+        self._idle_since = None
+        self._now = 0.0  # latest frame timestamp (capture and media clocks differ)
+
+        self.idle_checks = 0
+        self.frames_skipped = 0
+        self.idle_entries = 0
+        self.wakeups = 0
+        self.idle_time_s = 0.0
+        self.last_wake_latency_s = None
+        self.max_wake_latency_s = 0.0
+
+    @property
+    def idle(self):
+        return self.state == IDLE
+
+    def reset(self):
+        """Back to full-rate tracking"""
+        if self.idle:
+            self._leave_idle(self._last_check or 0.0)
+        self.state = ACTIVE
+        self.empty_frames = 0
+
+    def should_check(self, timestamp):
+        """True if this frame should be analysed at all"""
+        self._now = timestamp
+        if not self.idle or timestamp - self._last_check >= self.idle_check_interval_s:
+            return True
+        self.frames_skipped += 1
+        return False
+
+    def prepare_input(self, frame):
+        """Reduced-resolution inference input for idle checks"""
+        height, width = frame.shape[:2]
+        if width <= self.idle_input_width:
+            return frame
+        size = (self.idle_input_width, max(1, round(height * self.idle_input_width / width)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def update(self, person_found, timestamp):
+        """Record the outcome of an analysed frame; returns True if the state changed"""
+        if self.idle:
+            self.idle_checks += 1
+            if person_found:
+                latency = timestamp - self._last_check
+                self.last_wake_latency_s = round(latency, 3)
+                self.max_wake_latency_s = max(self.max_wake_latency_s, self.last_wake_latency_s)
+                self.wakeups += 1
+                self._leave_idle(timestamp)
+                print(f"👋 Person detected - full-rate tracking resumed ({latency * 1000:.0f} ms)")
+                return True
+            self._last_check = timestamp
+            return False
+
+        if person_found:
+            self.empty_frames = 0
+            return False
+        self.empty_frames += 1
+        if self.empty_frames < self.idle_after_frames:
+            return False
+        self.state = IDLE
+        self.idle_entries += 1
+        self._idle_since = self._last_check = timestamp
+        print(f"💤 No one in view - checking every {self.idle_check_interval_s:g}s")
+        return True
+
+    def _leave_idle(self, timestamp):
+        self.idle_time_s += max(0.0, timestamp - self._idle_since)
+        self.state = ACTIVE
+        self.empty_frames = 0
+        self._idle_since = None
+
+    def get_stats(self):
+        idle_time = self.idle_time_s
+        if self.idle:
+            idle_time += max(0.0, self._now - self._idle_since)
+        return {
+            "state": self.state,
+            "empty_frames": self.empty_frames,
+            "idle_entries": self.idle_entries,
+            "idle_checks": self.idle_checks,
+            "frames_skipped": self.frames_skipped,
+            "wakeups": self.wakeups,
+            "idle_time_s": round(idle_time, 1),
+            "last_wake_latency_s": self.last_wake_latency_s,
+            "max_wake_latency_s": round(self.max_wake_latency_s, 3)
+        }
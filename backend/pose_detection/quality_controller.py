@@ -0,0 +1,138 @@
+import cv2
+from collections import namedtuple
+
+QualityLevel = namedtuple('QualityLevel', ['model_complexity', 'input_width', 'stride'])
+
+# Ordered from most accurate to cheapest. Each step trades a little accuracy
+# for less inference work: analyse fewer frames, shrink the input, or drop to
+# a lighter MediaPipe model.
+QUALITY_LEVELS = (
+    QualityLevel(2, 640, 1),
+    QualityLevel(2, 640, 2),
+    QualityLevel(1, 640, 1),
+    QualityLevel(1, 640, 2),
+    QualityLevel(1, 640, 3),  # the old fixed setting
+    QualityLevel(1, 480, 3),
+    QualityLevel(0, 480, 3),
+    QualityLevel(0, 320, 4),
+    QualityLevel(0, 256, 6),
+)
+DEFAULT_LEVEL = 4
+
+
+class AdaptiveQualityController:
+    """Pick stride, input size and model complexity to fit a latency budget
+
+    budget_ms is the inference time a session may spend per *captured* frame,
+    so a 30 ms inference analysed every 3rd frame costs 10 ms. When the
+    smoothed cost goes over budget the controller steps to a cheaper level;
+    when it stays well under budget it steps back up.
+    """
+
+    def __init__(self, budget_ms=12.0, levels=QUALITY_LEVELS, start_level=DEFAULT_LEVEL,
+                 smoothing=0.2, min_samples=10, upgrade_samples=30, headroom=0.5):
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.level_index = min(start_level, len(levels) - 1)
+        self.smoothing = smoothing
+        self.min_samples = min_samples
+        self.upgrade_samples = upgrade_samples
+        self.headroom = headroom
+        self.unavailable_complexities = set()
+
+        self.latency_ms = None
+        self.samples = 0
+        self.total_samples = 0
+        self.level_changes = 0
+
+    @property
+    def level(self):
+        return self.levels[self.level_index]
+
+    def should_analyze(self, frame_count):
+        """True if this frame falls on the current analysis stride"""
+        return frame_count % self.level.stride == 0
+
+    def prepare_input(self, frame):
+        """Downscale frame to the current input width (never upscales)"""
+        width = self.level.input_width
+        height, frame_width = frame.shape[:2]
+        if frame_width <= width:
+            return frame
+        return cv2.resize(frame, (width, int(height * width / frame_width)),
+                          interpolation=cv2.INTER_AREA)
+
+    def record(self, latency_s):
+        """Record one inference latency; returns True if the level changed"""
+        latency_ms = latency_s * 1000.0
+        if self.latency_ms is None:
+            self.latency_ms = latency_ms
+        else:
+            self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+        self.samples += 1
+        self.total_samples += 1
+
+        if self.samples < self.min_samples:
+            return False
+
+        cost = self.cost_ms()
+        if cost > self.budget_ms:
+            return self._set_level(self._next_index(+1))
+        if cost < self.budget_ms * self.headroom and self.samples >= self.upgrade_samples:
+            return self._set_level(self._next_index(-1))
+        return False
+
+    def cost_ms(self):
+        """Smoothed inference cost per captured frame at the current level"""
+        if self.latency_ms is None:
+            return 0.0
+        return self.latency_ms / self.level.stride
+
+    def mark_unavailable(self, model_complexity, fallback_complexity):
+        """Stop using a model complexity (e.g. its model cannot be loaded)
+
+        Moves back to the nearest level that uses fallback_complexity.
+        """
+        self.unavailable_complexities.add(model_complexity)
+        return self.fall_back_to(fallback_complexity)
+
+    def fall_back_to(self, model_complexity):
+        """Move to the nearest level that uses model_complexity (e.g. a switch failed)"""
+        candidates = [i for i, level in enumerate(self.levels)
+                      if level.model_complexity == model_complexity]
+        if not candidates:
+            return False
+        return self._set_level(min(candidates, key=lambda i: abs(i - self.level_index)))
+
+    def _next_index(self, direction):
+        """Nearest usable level in direction (+1 cheaper, -1 better)"""
+        index = self.level_index + direction
+        while 0 <= index < len(self.levels):
+            if self.levels[index].model_complexity not in self.unavailable_complexities:
+                return index
+            index += direction
+        return self.level_index
+
+    def _set_level(self, index):
+        if index == self.level_index:
+            return False
+        self.level_index = index
+        self.level_changes += 1
+        # Measure the new level from scratch before deciding again
+        self.latency_ms = None
+        self.samples = 0
+        return True
+
+    def get_status(self):
+        """Current decisions for the status endpoints"""
+        level = self.level
+        return {
+            "level": self.level_index,
+            "model_complexity": level.model_complexity,
+            "input_width": level.input_width,
+            "analysis_stride": level.stride,
+            "budget_ms": self.budget_ms,
+            "inference_ms": round(self.latency_ms, 2) if self.latency_ms is not None else None,
+            "cost_per_frame_ms": round(self.cost_ms(), 2),
+            "level_changes": self.level_changes
+        }
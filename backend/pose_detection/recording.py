@@ -0,0 +1,263 @@
+"""Binary landmark session recordings, stored column by column.
+
+A recording is a directory (named *.lmrec) holding header.json (format
+version, the joint and exercise names, each column's dtype and shape, and
+free-form metadata) and one append-only raw file per column: timestamp,
+seq, flags, form_score, landmarks, angles and rep_counts. Each column is a
+single contiguous array on disk, so landmarks map straight onto an
+(N, 33, 4) float32 array and timestamps onto an (N,) float64 array, each a
+zero-copy view of its memory-mapped file.
+"""
+import json
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from pose_detection.angles import JOINT_NAMES, joint_angles
+from pose_detection.landmarks import LandmarkFrame, NUM_LANDMARKS
+from ml_models.rep_engine import EXERCISE_DEFINITIONS
+
+FORMAT = 'lmrec'
+VERSION = 2
+HEADER_FILE = 'header.json'
+COLUMN_SUFFIX = '.bin'
+FILE_EXTENSION = '.lmrec'
+
+# Bits of the flags column
+POSE_DETECTED = 1
+UNCHANGED = 2  # result reused while the scene was static
+
+ReplayFrame = namedtuple('ReplayFrame', ['index', 'landmarks', 'pose_detected', 'unchanged'])
+
+
+def column_layout(num_joints=len(JOINT_NAMES), num_exercises=len(EXERCISE_DEFINITIONS)):
+    """{column: (dtype, per-frame shape)} of a recording"""
+    return {
+        'timestamp': (np.dtype('<f8'), ()),
+        'seq': (np.dtype('<i8'), ()),
+        'flags': (np.dtype('<u4'), ()),
+        'form_score': (np.dtype('<f4'), ()),
+        'landmarks': (np.dtype('<f4'), (NUM_LANDMARKS, 4)),  # x, y, z, visibility
+        'angles': (np.dtype('<f4'), (num_joints,)),
+        'rep_counts': (np.dtype('<u4'), (num_exercises,)),
+    }
+
+
+def _column_path(path, name):
+    return os.path.join(path, name + COLUMN_SUFFIX)
+
+
+def _frame_bytes(layout):
+    return sum(dtype.itemsize * int(np.prod(shape)) for dtype, shape in layout.values())
+
+
+class LandmarkRecorder:
+    """Append analysed frames to a recording
+
+    Frames are buffered column by column and written `flush_every` at a
+    time. A reader only counts frames present in every column file, so a
+    recording can be read (and replayed) while it is still being written.
+    """
+
+    def __init__(self, path, metadata=None, flush_every=30):
+        self.path = path
+        self.joint_names = JOINT_NAMES
+        self.exercises = tuple(EXERCISE_DEFINITIONS)
+        self.layout = column_layout(len(self.joint_names), len(self.exercises))
+        self.flush_every = flush_every
+        self._buffers = {
+            name: np.zeros((flush_every,) + shape, dtype=dtype) for name, (dtype, shape) in self.layout.items()
+        }
+        self._pending = 0
+        self.frames_recorded = 0
+
+        header = {
+            "format": FORMAT,
+            "version": VERSION,
+            "columns": {name: {"dtype": dtype.str, "shape": list(shape)}
+                        for name, (dtype, shape) in self.layout.items()},
+            "joint_names": list(self.joint_names),
+            "exercises": list(self.exercises),
+            "created": time.time(),
+            **(metadata or {})
+        }
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, HEADER_FILE), 'w') as f:
+            json.dump(header, f)
+        self._files = {name: open(_column_path(path, name), 'wb') for name in self.layout}
+
+    def record(self, timestamp, seq, landmarks=None, analysis=None):
+        """Add one frame; landmarks is a (33, 4) array or None if no pose was found"""
+        analysis = analysis or {}
+        i = self._pending
+        columns = self._buffers
+        columns['timestamp'][i] = timestamp
+        columns['seq'][i] = seq
+        flags = 0
+        if landmarks is not None:
+            flags |= POSE_DETECTED
+            columns['landmarks'][i] = landmarks
+            columns['angles'][i] = joint_angles(landmarks)
+        else:
+            columns['landmarks'][i] = np.nan
+            columns['angles'][i] = np.nan
+        if analysis.get("unchanged"):
+            flags |= UNCHANGED
+        columns['flags'][i] = flags
+        columns['form_score'][i] = analysis.get("form_score", np.nan)
+        counts = analysis.get("rep_counts") or {}
+        columns['rep_counts'][i] = [counts.get(name, 0) for name in self.exercises]
+
+        self._pending += 1
+        self.frames_recorded += 1
+        if self._pending == self.flush_every:
+            self.flush()
+
+    def flush(self):
+        for name, f in self._files.items():
+            if self._pending:
+                f.write(self._buffers[name][:self._pending].tobytes())
+            f.flush()
+        self._pending = 0
+
+    def close(self):
+        if self._files:
+            self.flush()
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "frames_recorded": self.frames_recorded,
+            "bytes": self.frames_recorded * _frame_bytes(self.layout)
+        }
+
+
+class LandmarkRecording:
+    """Read-only, memory-mapped view of a recording, one array per column"""
+
+    def __init__(self, path):
+        self.path = path
+        header_path = os.path.join(path, HEADER_FILE)
+        if not os.path.isfile(header_path):
+            raise ValueError(f"{path} is not a landmark recording")
+        with open(header_path) as f:
+            self.header = json.load(f)
+        if self.header.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a landmark recording")
+        if self.header.get("version", 0) > VERSION:
+            raise ValueError(f"{path} has unsupported recording version {self.header['version']}")
+        self.joint_names = tuple(self.header["joint_names"])
+        self.exercises = tuple(self.header["exercises"])
+        self.layout = column_layout(len(self.joint_names), len(self.exercises))
+        for name, (dtype, shape) in self.layout.items():
+            column = self.header["columns"].get(name)
+            if column is None or np.dtype(column["dtype"]) != dtype or tuple(column["shape"]) != shape:
+                raise ValueError(f"{path} has an unexpected '{name}' column")
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the columns to pick up frames appended since opening"""
+        sizes = {
+            name: dtype.itemsize * int(np.prod(shape)) for name, (dtype, shape) in self.layout.items()
+        }
+        count = min(os.path.getsize(_column_path(self.path, name)) // size for name, size in sizes.items())
+        self.columns = {}
+        for name, (dtype, shape) in self.layout.items():
+            if count:
+                self.columns[name] = np.memmap(_column_path(self.path, name), dtype=dtype, mode='r',
+                                               shape=(count,) + shape)
+            else:
+                self.columns[name] = np.zeros((0,) + shape, dtype=dtype)
+        self.count = count
+        return self
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def timestamps(self):
+        return self.columns['timestamp']
+
+    @property
+    def seqs(self):
+        return self.columns['seq']
+
+    @property
+    def landmarks(self):
+        return self.columns['landmarks']
+
+    @property
+    def angles(self):
+        return self.columns['angles']
+
+    @property
+    def form_scores(self):
+        return self.columns['form_score']
+
+    @property
+    def rep_counts(self):
+        return self.columns['rep_counts']
+
+    @property
+    def pose_detected(self):
+        return (self.columns['flags'] & POSE_DETECTED).astype(bool)
+
+    @property
+    def unchanged(self):
+        return (self.columns['flags'] & UNCHANGED).astype(bool)
+
+    @property
+    def duration(self):
+        return float(self.timestamps[-1] - self.timestamps[0]) if len(self) > 1 else 0.0
+
+    def describe(self):
+        return {
+            "path": self.path,
+            "frames": len(self),
+            "poses_detected": int(self.pose_detected.sum()),
+            "duration_s": round(self.duration, 2),
+            "exercises": list(self.exercises)
+        }
+
+
+class LandmarkReplay:
+    """Feed a recording back frame by frame with its recorded timestamps
+
+    speed=1.0 paces frames like the original session, 4.0 four times as
+    fast, and None (or 0) as fast as possible. Each item is a ReplayFrame
+    whose LandmarkFrame carries the recorded timestamp and seq, so
+    analyzers never see the replay's wall clock.
+    """
+
+    def __init__(self, recording, speed=None, start=0, stop=None):
+        self.recording = recording if isinstance(recording, LandmarkRecording) else LandmarkRecording(recording)
+        self.speed = speed
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return len(range(*slice(self.start, self.stop).indices(len(self.recording))))
+
+    def __iter__(self):
+        recording = self.recording
+        indices = range(*slice(self.start, self.stop).indices(len(recording)))
+        if not indices:
+            return
+        timestamps = recording.timestamps
+        detected = recording.pose_detected
+        unchanged = recording.unchanged
+        first = float(timestamps[indices[0]])
+        wall_start = time.monotonic()
+        for i in indices:
+            timestamp = float(timestamps[i])
+            if self.speed:
+                delay = (timestamp - first) / self.speed - (time.monotonic() - wall_start)
+                if delay > 0:
+                    time.sleep(delay)
+            frame = LandmarkFrame(np.array(recording.landmarks[i]), timestamp, int(recording.seqs[i]), source="replay")
+            yield ReplayFrame(i, frame, bool(detected[i]), bool(unchanged[i]))
@@ -0,0 +1,143 @@
+import numpy as np
+
+
+class ROITracker:
+    """Crop pose inference input to the person found in the previous frame
+
+    The next region of interest is the bounding box of the visible landmarks,
+    padded more when visibility is low. The ROI is kept steady while the
+    person stays well inside it so MediaPipe's own tracking and smoothing
+    see a stable image. Tracking is dropped (and the next frame searched in
+    full) when visibility falls or landmarks touch the crop edge.
+    """
+
+    def __init__(self, padding=0.25, min_visibility=0.5, min_confidence=0.6,
+                 min_landmarks=8, min_size=0.3, edge_margin=0.02, max_area_ratio=1.6):
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self.min_confidence = min_confidence
+        self.min_landmarks = min_landmarks
+        self.min_size = min_size
+        self.edge_margin = edge_margin
+        self.max_area_ratio = max_area_ratio
+
+        self.roi = None  # (x0, y0, x1, y1), normalized to the full frame
+
+        self.cropped_frames = 0
+        self.full_frames = 0
+        self.tracking_lost = 0
+        self.pixel_fraction_total = 0.0
+
+    @property
+    def tracking(self):
+        return self.roi is not None
+
+    def crop(self, frame):
+        """Return (image for inference, roi used) — roi is None for a full-frame search"""
+        height, width = frame.shape[:2]
+        if self.roi is None:
+            self.full_frames += 1
+            self.pixel_fraction_total += 1.0
+            return frame, None
+
+        x0 = int(self.roi[0] * width)
+        y0 = int(self.roi[1] * height)
+        x1 = max(int(np.ceil(self.roi[2] * width)), x0 + 1)
+        y1 = max(int(np.ceil(self.roi[3] * height)), y0 + 1)
+        self.cropped_frames += 1
+        self.pixel_fraction_total += (x1 - x0) * (y1 - y0) / float(width * height)
+        # Report the pixel-aligned ROI so landmarks map back exactly
+        return frame[y0:y1, x0:x1], (x0 / width, y0 / height, x1 / width, y1 / height)
+
+    @staticmethod
+    def map_to_frame(landmarks, roi):
+        """Map landmark x/y/z (objects with attributes, in place) from crop to full-frame coordinates"""
+        if roi is None:
+            return landmarks
+        x0, y0, x1, y1 = roi
+        scale_x, scale_y = x1 - x0, y1 - y0
+        for landmark in landmarks:
+            landmark.x = x0 + landmark.x * scale_x
+            landmark.y = y0 + landmark.y * scale_y
+            landmark.z = landmark.z * scale_x  # z shares the x scale in MediaPipe
+        return landmarks
+
+    @staticmethod
+    def map_array_to_frame(data, roi):
+        """Vectorized map_to_frame for an (N, 4) x, y, z, visibility array, in place"""
+        if roi is None:
+            return data
+        x0, y0, x1, y1 = roi
+        data[:, 0] = x0 + data[:, 0] * (x1 - x0)
+        data[:, 1] = y0 + data[:, 1] * (y1 - y0)
+        data[:, 2] *= (x1 - x0)
+        return data
+
+    def update(self, landmarks, roi=None):
+        """Choose the next ROI from this frame's full-frame landmarks
+
+        landmarks is an (N, 4) array-like of x, y, z, visibility. roi is the
+        crop they were found in, used to detect the person leaving it.
+        """
+        points = np.asarray(landmarks, dtype=np.float32)
+        visible = points[points[:, 3] >= self.min_visibility]
+        confidence = float(points[:, 3].mean()) if len(points) else 0.0
+
+        if len(visible) < self.min_landmarks or confidence < self.min_confidence:
+            return self.lost()
+
+        if roi is not None and self._touches_crop_edge(visible, roi):
+            # Part of the person may be outside the crop
+            return self.lost()
+
+        box = self._padded_box(visible, confidence)
+        if self.roi is None or not self._contains(self.roi, box) or \
+                self._area(self.roi) > self._area(box) * self.max_area_ratio:
+            self.roi = box
+        return self.roi
+
+    def _touches_crop_edge(self, visible, roi):
+        """True if landmarks reach a crop edge that is not also the frame edge"""
+        margin_x = (roi[2] - roi[0]) * self.edge_margin
+        margin_y = (roi[3] - roi[1]) * self.edge_margin
+        return ((roi[0] > 0.0 and visible[:, 0].min() <= roi[0] + margin_x) or
+                (roi[2] < 1.0 and visible[:, 0].max() >= roi[2] - margin_x) or
+                (roi[1] > 0.0 and visible[:, 1].min() <= roi[1] + margin_y) or
+                (roi[3] < 1.0 and visible[:, 1].max() >= roi[3] - margin_y))
+
+    def lost(self):
+        """Drop tracking so the next frame is searched in full"""
+        if self.roi is not None:
+            self.tracking_lost += 1
+        self.roi = None
+        return None
+
+    def _padded_box(self, visible, confidence):
+        x0, y0 = visible[:, 0].min(), visible[:, 1].min()
+        x1, y1 = visible[:, 0].max(), visible[:, 1].max()
+        # Less confident landmarks get a more generous margin
+        padding = self.padding * (1.0 + (1.0 - confidence))
+        pad_x = max((x1 - x0) * padding, (self.min_size - (x1 - x0)) / 2, 0.0)
+        pad_y = max((y1 - y0) * padding, (self.min_size - (y1 - y0)) / 2, 0.0)
+        return (max(0.0, float(x0 - pad_x)), max(0.0, float(y0 - pad_y)),
+                min(1.0, float(x1 + pad_x)), min(1.0, float(y1 + pad_y)))
+
+    @staticmethod
+    def _contains(outer, inner):
+        return (outer[0] <= inner[0] and outer[1] <= inner[1] and
+                outer[2] >= inner[2] and outer[3] >= inner[3])
+
+    @staticmethod
+    def _area(box):
+        return max(box[2] - box[0], 0.0) * max(box[3] - box[1], 0.0)
+
+    def get_stats(self):
+        frames = self.cropped_frames + self.full_frames
+        return {
+            "tracking": self.tracking,
+            "roi": [round(v, 3) for v in self.roi] if self.roi else None,
+            "cropped_frames": self.cropped_frames,
+            "full_frame_searches": self.full_frames,
+            "tracking_lost": self.tracking_lost,
+            "avg_pixel_fraction": round(self.pixel_fraction_total / frames, 3) if frames else 1.0
+        }
@@ -0,0 +1,140 @@
+import os
+import secrets
+import threading
+import time
+
+# Limits for the server's session managers (app.py and camera_service.py)
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 8))
+SESSION_IDLE_TIMEOUT = float(os.environ.get('SESSION_IDLE_TIMEOUT', 600))
+
+
+class SessionLimitError(Exception):
+    """Raised when a new session would exceed max_sessions"""
+
+
+class Session:
+    """One client's isolated state (its own source, detectors, counters, history)"""
+    __slots__ = ('session_id', 'state', 'created_at', 'last_seen')
+
+    def __init__(self, session_id, state):
+        self.session_id = session_id
+        self.state = state
+        self.created_at = time.time()
+        self.last_seen = time.monotonic()
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_seen
+
+    def describe(self):
+        return {
+            "session_id": self.session_id,
+            "created_at": self.created_at,
+            "idle_seconds": round(self.idle_seconds(), 1)
+        }
+
+
+class SessionManager:
+    """Create, look up and evict isolated sessions keyed by session id
+
+    factory builds the per-session state object; close (optional) is called
+    with that object when the session ends or is evicted for being idle.
+    """
+
+    def __init__(self, factory, max_sessions=8, idle_timeout=600.0, close=None, reap_interval=None):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.close_state = close
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+        self.reap_interval = reap_interval or max(1.0, min(60.0, idle_timeout / 2))
+        self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+        self._reaper.start()
+
+    def create(self):
+        """Create a new session; raises SessionLimitError when full"""
+        self.evict_idle()
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(
+                    f"Session limit reached ({self.max_sessions} active sessions)"
+                )
+            session_id = secrets.token_urlsafe(16)
+            # Reserve the slot before building state so concurrent creates
+            # cannot overshoot max_sessions
+            self._sessions[session_id] = None
+        try:
+            session = Session(session_id, self.factory())
+        except Exception:
+            with self._lock:
+                self._sessions.pop(session_id, None)
+            raise
+        with self._lock:
+            self._sessions[session_id] = session
+            self.created += 1
+        return session
+
+    def get(self, session_id):
+        """Return the live session for session_id (refreshing its idle timer) or None"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+        if session is not None:
+            session.touch()
+        return session
+
+    def close(self, session_id):
+        """End a session and release its resources"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._close(session)
+        return True
+
+    def _close(self, session):
+        if self.close_state:
+            try:
+                self.close_state(session.state)
+            except Exception as e:
+                print(f"⚠️ Error closing session {session.session_id}: {e}")
+
+    def evict_idle(self):
+        """Close sessions idle for longer than idle_timeout; returns how many"""
+        with self._lock:
+            expired = [s for s in self._sessions.values()
+                       if s is not None and s.idle_seconds() > self.idle_timeout]
+            for session in expired:
+                del self._sessions[session.session_id]
+            self.evicted += len(expired)
+        for session in expired:
+            print(f"💤 Evicting idle session {session.session_id}")
+            self._close(session)
+        return len(expired)
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            self.evict_idle()
+
+    def sessions(self):
+        with self._lock:
+            return [s for s in self._sessions.values() if s is not None]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def get_stats(self):
+        return {
+            "active_sessions": len(self),
+            "max_sessions": self.max_sessions,
+            "idle_timeout_s": self.idle_timeout,
+            "created": self.created,
+            "evicted": self.evicted
+        }
@@ -0,0 +1,444 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit, parse_qs
+
+from analysis_events import format_sse
+from frame_encoder import RungSelector, AUTO
+
+# Streaming routes served here; variant names match the session's frames
+FRAME_ROUTES = {
+    '/api/camera/stream': 'raw',
+    '/api/camera/stream-with-analysis': 'analysis',
+}
+EVENTS_ROUTE = '/api/events'
+STATS_ROUTE = '/api/streams'
+
+MAX_REQUEST_HEAD = 16 * 1024
+WRITE_BUFFER_LIMIT = 128 * 1024  # drain() blocks once this much is unsent
+STATUS_TEXT = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 503: 'Service Unavailable'}
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox: a newer frame replaces one the client has not taken yet"""
+
+    def __init__(self):
+        self._item = None
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.offered = 0
+        self.dropped = 0
+
+    @property
+    def depth(self):
+        return 0 if self._item is None else 1
+
+    def offer(self, item):
+        if self._item is not None:
+            self.dropped += 1
+        self._item = item
+        self.offered += 1
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def get(self):
+        """Next item, or None once closed"""
+        await self._ready.wait()
+        self._ready.clear()
+        item, self._item = self._item, None
+        return None if self.closed else item
+
+
+class StreamClient:
+    """One connected viewer and its delivery counters"""
+
+    def __init__(self, session_id, route, variant=None, rung=None, fps=None):
+        self.session_id = session_id
+        self.route = route
+        self.variant = variant
+        self.rung = rung
+        self.min_interval = 1.0 / fps if fps else 0.0
+        self.next_due = 0.0
+        self.slot = LatestFrameSlot()
+        self.sent = 0
+        self.bytes_sent = 0
+        self.connected_at = time.monotonic()
+
+    def get_stats(self):
+        return {
+            "session": self.session_id[:8],
+            "route": self.route,
+            "rung": self.rung,
+            "queue_depth": self.slot.depth,
+            "sent": self.sent,
+            "dropped": self.slot.dropped,
+            "bytes_sent": self.bytes_sent,
+            "connected_s": round(time.monotonic() - self.connected_at, 1)
+        }
+
+
+class SessionFanout:
+    """Hands one session's produced frames to all of its viewers on the event loop
+
+    The capture thread makes a single call_soon_threadsafe per frame; the
+    loop then offers the frame to every viewer that is due for one (per
+    its frame rate). A viewer still busy writing its previous frame has the
+    pending one replaced, so slow sockets drop stale frames, never queue.
+    """
+
+    def __init__(self, loop, ai):
+        self.loop = loop
+        self.ai = ai
+        self.clients = set()
+
+    def add(self, client):
+        if not self.clients:
+            self.ai.add_frame_listener(self._on_frame)
+        self.clients.add(client)
+
+    def remove(self, client):
+        self.clients.discard(client)
+        if not self.clients:
+            self.ai.remove_frame_listener(self._on_frame)
+
+    def _on_frame(self, seq, raw, annotated):
+        """Called from the capture thread"""
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, seq, raw, annotated)
+        except RuntimeError:
+            pass  # loop already closed
+
+    def _deliver(self, seq, raw, annotated):
+        now = self.loop.time()
+        for client in self.clients:
+            if now < client.next_due:
+                continue
+            frame = annotated if client.variant == 'analysis' else raw
+            if frame is not None:
+                client.slot.offer((seq, frame))
+
+
+class StreamServer:
+    """asyncio front end for the long-lived video and analysis streams
+
+    Serves the MJPEG stream routes, the SSE analysis route and a stats route
+    from one event loop on its own thread and port, next to the Flask app
+    that keeps every REST route. Sessions are looked up in the same
+    SessionManager, by the same header, query parameter or cookie. Writes
+    are flow-controlled (WRITE_BUFFER_LIMIT), so a slow client only ever
+    holds its latest frame.
+    """
+
+    def __init__(self, sessions, host='0.0.0.0', port=5001, default_fps=15, max_fps=30,
+                 default_rung=AUTO, keepalive_s=15.0, retry_ms=2000, encode_workers=4,
+                 session_header='X-Session-ID', session_cookie='fitness_session'):
+        self.sessions = sessions
+        self.host = host
+        self.port = port
+        self.default_fps = default_fps
+        self.max_fps = max_fps
+        self.default_rung = default_rung
+        self.keepalive_s = keepalive_s
+        self.retry_ms = retry_ms
+        self.session_header = session_header.lower()
+        self.session_cookie = session_cookie
+
+        # Encodes (mostly cache hits from the encoder pool) run off the loop
+        self._executor = ThreadPoolExecutor(max_workers=encode_workers, thread_name_prefix='stream-encode')
+        self.loop = None
+        self._server = None
+        self._thread = None
+        self._fanouts = {}  # session id -> SessionFanout
+        self.clients = set()
+        self.running = False
+        self.connections = 0
+        self.total_sent = 0
+        self.total_dropped = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        """Run the event loop on a daemon thread; returns once it is listening"""
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(started,), daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def _run(self, started):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self._server = self.loop.run_until_complete(
+                asyncio.start_server(self._handle, self.host, self.port, limit=MAX_REQUEST_HEAD)
+            )
+            self.port = self._server.sockets[0].getsockname()[1]
+            self.running = True
+            print(f"📡 Stream server listening on http://{self.host}:{self.port}")
+        except OSError as e:
+            print(f"❌ Stream server failed to start: {e}")
+            started.set()
+            return
+        started.set()
+        try:
+            self.loop.run_until_complete(self._server.serve_forever())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.running = False
+
+    def stop(self):
+        """Close every stream and stop listening"""
+        if not self.running:
+            return
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self._thread.join(timeout=5)
+
+    def _shutdown(self):
+        for client in self.clients:
+            client.slot.close()
+        self._server.close()
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
+
+    # ---------- HTTP ----------
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            try:
+                method, target, _ = request_line.split(' ', 2)
+            except ValueError:
+                await self._send_json(writer, 400, {"error": "Bad request line", "status": "error"})
+                return
+            headers = {}
+            for line in header_lines:
+                name, sep, value = line.partition(':')
+                if sep:
+                    headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            await self._route(writer, method, url.path, query, headers)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        except Exception as e:
+            print(f"⚠️ Stream request failed: {e}")
+        finally:
+            writer.close()
+
+    async def _route(self, writer, method, path, query, headers):
+        if method == 'OPTIONS':
+            await self._send_head(writer, 204, {'Content-Length': '0'})
+            return
+        if method != 'GET':
+            await self._send_json(writer, 405, {"error": "Only GET is supported", "status": "error"})
+            return
+        if path == STATS_ROUTE:
+            await self._send_json(writer, 200, self.get_stats())
+            return
+        if path not in FRAME_ROUTES and path != EVENTS_ROUTE:
+            await self._send_json(writer, 404, {"error": f"No stream at {path}", "status": "error"})
+            return
+
+        session = self._lookup_session(headers, query)
+        if session is None:
+            await self._send_json(writer, 404, {
+                "error": "Unknown session (create one with the REST API first)",
+                "status": "error"
+            })
+            return
+
+        if path == EVENTS_ROUTE:
+            last_event_id = headers.get('last-event-id') or query.get('last_event_id')
+            await self._stream_events(writer, session, last_event_id)
+            return
+
+        ai = session.state
+        if not ai.camera_active:
+            await self._send_json(writer, 503, {"error": "No camera feed available", "status": "error"})
+            return
+        try:
+            fps = float(query.get('fps', self.default_fps))
+        except ValueError:
+            fps = self.default_fps
+        fps = max(1.0, min(fps, self.max_fps))
+        rung = query.get('rung', self.default_rung)
+        if rung != AUTO and rung not in ai.encoder.rungs:
+            await self._send_json(writer, 400, {
+                "error": f"Unknown rung '{rung}'",
+                "rungs": [AUTO] + list(ai.encoder.rungs),
+                "status": "error"
+            })
+            return
+        await self._stream_frames(writer, session, FRAME_ROUTES[path], fps, rung)
+
+    def _lookup_session(self, headers, query):
+        session_id = headers.get(self.session_header) or query.get('session_id')
+        if not session_id and 'cookie' in headers:
+            cookie = SimpleCookie()
+            cookie.load(headers['cookie'])
+            if self.session_cookie in cookie:
+                session_id = cookie[self.session_cookie].value
+        return self.sessions.get(session_id) if session_id else None
+
+    async def _send_head(self, writer, status, headers):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+                 "Access-Control-Allow-Origin: *",
+                 f"Access-Control-Allow-Headers: Content-Type,Last-Event-ID,{self.session_header}",
+                 "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+    async def _send_json(self, writer, status, payload):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        await self._send_head(writer, status, {'Content-Type': 'application/json',
+                                               'Content-Length': str(len(body))})
+        writer.write(body)
+        await writer.drain()
+
+    # ---------- streams ----------
+
+    def _register(self, session, client):
+        self.clients.add(client)
+        fanout = self._fanouts.get(session.session_id)
+        if fanout is None or fanout.ai is not session.state:
+            fanout = self._fanouts[session.session_id] = SessionFanout(self.loop, session.state)
+        fanout.add(client)
+        return fanout
+
+    def _unregister(self, session, client, fanout):
+        self.clients.discard(client)
+        self.total_sent += client.sent
+        self.total_dropped += client.slot.dropped
+        if fanout:
+            fanout.remove(client)
+            if not fanout.clients and self._fanouts.get(session.session_id) is fanout:
+                del self._fanouts[session.session_id]
+
+    async def _stream_frames(self, writer, session, variant, fps, rung):
+        """multipart/x-mixed-replace stream of the session's latest frames"""
+        ai = session.state
+        selector = RungSelector(ai.encoder, fps) if rung == AUTO else None
+        subscription = ai.encoder.subscribe(variant, selector.rung if selector else rung, fps)
+        client = StreamClient(session.session_id, 'frames', variant, subscription.rung, fps)
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_LIMIT)
+        fanout = self._register(session, client)
+        try:
+            await self._send_head(writer, 200, {
+                'Content-Type': 'multipart/x-mixed-replace; boundary=frame',
+                'Cache-Control': 'no-cache, no-store'
+            })
+            while ai.camera_active:
+                try:
+                    item = await asyncio.wait_for(client.slot.get(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    continue
+                if item is None:
+                    break
+                seq, frame = item
+                client.next_due = self.loop.time() + client.min_interval
+                # An open stream keeps the session from being evicted as idle
+                session.touch()
+
+                encoded = await self.loop.run_in_executor(
+                    self._executor, ai.encoder.encode, seq, frame, variant, subscription.rung
+                )
+                if encoded is None:
+                    continue
+                jpeg = encoded.jpeg
+                part = (b'--frame\r\n'
+                        b'Content-Type: image/jpeg\r\n'
+                        b'Content-Length: ' + str(len(jpeg)).encode() + b'\r\n\r\n' +
+                        jpeg + b'\r\n')
+                started = self.loop.time()
+                writer.write(part)
+                await writer.drain()
+                client.sent += 1
+                client.bytes_sent += len(jpeg)
+                if selector:
+                    # drain() only waits above WRITE_BUFFER_LIMIT; the bytes the
+                    # transport still holds tell how far the client is behind
+                    written = self.loop.time()
+                    subscription.switch(selector.record(
+                        len(part), written - started, writer.transport.get_write_buffer_size(), now=written
+                    ))
+                    client.rung = subscription.rung
+        finally:
+            self._unregister(session, client, fanout)
+            subscription.close()
+
+    async def _stream_events(self, writer, session, last_event_id):
+        """Server-Sent Events stream of the session's analysis changes"""
+        log = session.state.events
+        client = StreamClient(session.session_id, 'events')
+        wake = asyncio.Event()
+
+        def notify():
+            try:
+                self.loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+        log.add_listener(notify)
+        self.clients.add(client)
+        try:
+            await self._send_head(writer, 200, {
+                'Content-Type': 'text/event-stream',
+                'Cache-Control': 'no-cache'
+            })
+            writer.write(f"retry: {self.retry_ms}\n\n".encode())
+            seq = log.parse_id(last_event_id)
+            events = log.events_since(seq)
+            timed_out = False
+            while not log.closed and not client.slot.closed:
+                if events is None:
+                    seq, state = log.snapshot()
+                    writer.write(format_sse({**state, "seq": seq}, log.event_id(seq), event='snapshot'))
+                    client.sent += 1
+                elif events:
+                    for event in events:
+                        writer.write(format_sse({**event.changes, "seq": event.seq, "timestamp": event.timestamp},
+                                                log.event_id(event.seq), event='analysis'))
+                    seq = events[-1].seq
+                    client.sent += len(events)
+                elif timed_out:
+                    writer.write(b": keepalive\n\n")
+                await writer.drain()
+                session.touch()
+
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=self.keepalive_s)
+                    timed_out = False
+                except asyncio.TimeoutError:
+                    timed_out = True
+                wake.clear()
+                events = log.events_since(seq)
+        finally:
+            log.remove_listener(notify)
+            self.clients.discard(client)
+            self.total_sent += client.sent
+
+    def get_stats(self):
+        clients = [client.get_stats() for client in list(self.clients)]
+        return {
+            "running": self.running,
+            "port": self.port,
+            "connections": self.connections,
+            "active_clients": len(clients),
+            "sent": self.total_sent + sum(c["sent"] for c in clients),
+            "dropped": self.total_dropped + sum(c["dropped"] for c in clients),
+            "clients": clients
+        }
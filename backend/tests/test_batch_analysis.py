@@ -0,0 +1,17 @@
+import os
+
+import batch_analysis
+
+
+def test_recordings_with_the_same_stem_get_separate_reports(tmp_path):
+    (tmp_path / "a.mp4").write_bytes(b"")
+    (tmp_path / "a.lmrec").mkdir()
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "0001.jpg").write_bytes(b"")
+
+    recordings = batch_analysis.find_recordings(str(tmp_path))
+    reports = [batch_analysis._report_path("reports", recording) for recording in recordings]
+
+    assert len(recordings) == 3
+    names = ["a.json", "a.lmrec.json", "a.mp4.json"]
+    assert sorted(reports) == [os.path.join("reports", name) for name in names]
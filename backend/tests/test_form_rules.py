@@ -0,0 +1,128 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from ml_models.form_rules import FormRuleEngine
+
+
+def _symmetry(angles):
+    knee_diff = abs(angles['left_knee'] - angles['right_knee'])
+    elbow_diff = abs(angles['left_elbow'] - angles['right_elbow'])
+    hip_diff = abs(angles['left_hip'] - angles['right_hip'])
+    score = max(0, 100 - (knee_diff + elbow_diff + hip_diff) / 3 * 2)
+    feedback = []
+    if knee_diff > 15:
+        feedback.append(f"⚖️ Knee difference: {knee_diff:.1f}°")
+    if elbow_diff > 20:
+        feedback.append(f"⚖️ Elbow difference: {elbow_diff:.1f}°")
+    if hip_diff > 10:
+        feedback.append(f"⚖️ Hip difference: {hip_diff:.1f}°")
+    return score, feedback
+
+
+def old_squat_form(angles):
+    """The if/elif chain the squat rules replaced"""
+    feedback, critical, score = [], [], 100
+    knee = (angles['left_knee'] + angles['right_knee']) / 2
+    hip = (angles['left_hip'] + angles['right_hip']) / 2
+    if knee > 140:
+        feedback.append("⬇️ Go deeper for effective squat")
+        score -= 20
+    elif knee < 80:
+        feedback.append("🔥 Excellent depth!")
+        score += 5
+    elif knee < 100:
+        feedback.append("💪 Good squat depth")
+    else:
+        feedback.append("📏 Adequate depth")
+    if hip < 80:
+        critical.append("🚨 Back rounding - risk of injury!")
+        score -= 30
+    elif hip < 100:
+        feedback.append("📐 Maintain neutral spine")
+        score -= 10
+    else:
+        feedback.append("✅ Good back posture")
+    symmetry, symmetry_feedback = _symmetry(angles)
+    if symmetry < 80:
+        feedback.append("⚖️ Work on left-right symmetry")
+        score -= 10
+    else:
+        feedback.append("✅ Good symmetry")
+    return max(score, 0), critical + feedback + symmetry_feedback
+
+
+def old_pushup_form(angles):
+    """The if/elif chain the push-up rules replaced"""
+    feedback, critical, score = [], [], 100
+    elbow = (angles['left_elbow'] + angles['right_elbow']) / 2
+    hip = (angles['left_hip'] + angles['right_hip']) / 2
+    if elbow > 120:
+        feedback.append("⬇️ Go lower for effective push-up")
+        score -= 25
+    elif elbow < 90:
+        feedback.append("🔥 Chest to ground!")
+        score += 5
+    else:
+        feedback.append("💪 Good depth")
+    if hip < 150:
+        critical.append("🚨 Don't sag your hips!")
+        score -= 30
+    elif hip > 170:
+        feedback.append("📐 Keep body straight")
+        score -= 5
+    else:
+        feedback.append("✅ Good body alignment")
+    symmetry, symmetry_feedback = _symmetry(angles)
+    if symmetry < 80:
+        feedback.append("⚖️ Arms uneven")
+        score -= 10
+    return max(score, 0), critical + feedback + symmetry_feedback
+
+
+def _pose(knee, hip, elbow, knee_diff=0.0, hip_diff=0.0, elbow_diff=0.0):
+    return {
+        "left_knee": knee + knee_diff / 2, "right_knee": knee - knee_diff / 2,
+        "left_hip": hip + hip_diff / 2, "right_hip": hip - hip_diff / 2,
+        "left_elbow": elbow + elbow_diff / 2, "right_elbow": elbow - elbow_diff / 2,
+        "left_shoulder": 90.0, "right_shoulder": 90.0,
+    }
+
+
+# Every threshold of the old chains, plus a step either side
+KNEES = (79, 80, 81, 99, 100, 101, 139, 140, 141)
+HIPS = (79, 80, 81, 99, 100, 101, 149, 150, 151, 169, 170, 171)
+ELBOWS = (89, 90, 91, 119, 120, 121)
+DIFFS = ((0, 0, 0), (15, 0, 0), (16, 0, 0), (0, 0, 20), (0, 0, 21), (0, 10, 0), (0, 11, 0), (15, 10, 20))
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return FormRuleEngine()
+
+
+@pytest.mark.parametrize("exercise, old", [("squats", old_squat_form), ("pushups", old_pushup_form)])
+def test_matches_old_chains_on_every_boundary(engine, exercise, old):
+    for knee, hip, elbow, (knee_diff, hip_diff, elbow_diff) in itertools.product(KNEES, HIPS, ELBOWS, DIFFS):
+        angles = _pose(knee, hip, elbow, knee_diff, hip_diff, elbow_diff)
+        result = engine.analyze(angles, exercise)
+        score, feedback = old(angles)
+        assert (result["form_score"], result["feedback"]) == (score, feedback), angles
+
+
+def test_batch_scores_match_single_frames(engine):
+    poses = [_pose(k, h, e) for k, h, e in itertools.product(KNEES, HIPS, ELBOWS)]
+    rows = np.stack([engine._as_matrix(p)[0] for p in poses])
+
+    scores = engine.score(rows, "squats")
+
+    assert scores.tolist() == [engine.analyze(p, "squats")["form_score"] for p in poses]
+
+
+def test_values_on_a_strict_threshold_stay_below_it(engine):
+    assert "squat_adequate_depth" in engine.analyze(_pose(140, 120, 160), "squats")["feedback_codes"]
+    assert "pushup_good_depth" in engine.analyze(_pose(170, 170, 120), "pushups")["feedback_codes"]
+    assert "good_body_alignment" in engine.analyze(_pose(170, 170, 100), "pushups")["feedback_codes"]
+    codes = engine.analyze(_pose(170, 170, 160, knee_diff=15, hip_diff=10, elbow_diff=20), "squats")["feedback_codes"]
+    assert not {"knee_difference", "hip_difference", "elbow_difference"} & set(codes)
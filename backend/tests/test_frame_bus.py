@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from frame_bus import FrameBus, ResultBus
+from frame_capture import FrameCapture
+from test_frame_capture import SHAPE, SteppedSource, step
+
+
+@pytest.fixture
+def bus():
+    bus = FrameBus(SHAPE, slots=4)
+    yield bus
+    bus.close()
+
+
+def test_capture_writes_straight_into_the_bus(bus):
+    source = SteppedSource()
+    capture = FrameCapture(source, ring=bus)
+    capture.start()
+    try:
+        step(capture, 6)
+        assert capture.buffer_size == bus.slots
+        assert all(np.shares_memory(target, bus.data) for target in source.retrieved_into)
+        slot = bus.latest_frame()
+        assert (slot.write_no, slot.seq) == (6, 6)
+        assert np.all(slot.payload == 6)
+        # The frame in the bus is the one the capture hands out locally
+        assert np.shares_memory(capture.latest().image, slot.payload)
+    finally:
+        capture.stop()
+        capture._ring = None  # let the bus unmap its memory
+
+
+def test_rewritten_slot_is_not_valid(bus):
+    write_no = bus.write_frame(np.ones(SHAPE, dtype=np.uint8), 1, 0.0)
+    assert bus.valid(write_no)
+    for seq in range(2, 2 + bus.slots):
+        bus.write_frame(np.full(SHAPE, seq, dtype=np.uint8), seq, 0.0)
+    assert not bus.valid(write_no)
+
+
+def test_results_carry_the_worker_quality_status():
+    results = ResultBus(slots=2)
+    try:
+        landmarks = np.arange(33 * 4, dtype=np.float32).reshape(33, 4)
+        results.write_result(7, 1.5, landmarks, {"pose_detected": True}, {"inference_ms": 12.5})
+        result = results.latest_result()
+    finally:
+        results.close()
+
+    assert (result.seq, result.timestamp) == (7, 1.5)
+    assert result.analysis == {"pose_detected": True}
+    assert result.quality == {"inference_ms": 12.5}
+    assert np.array_equal(result.landmarks, landmarks)
@@ -0,0 +1,87 @@
+import threading
+
+import numpy as np
+import pytest
+
+from frame_capture import FrameCapture
+
+SHAPE = (4, 6, 3)
+
+
+class SteppedSource:
+    """Source that yields one frame (filled with its number) per step()"""
+
+    def __init__(self):
+        self.frames = threading.Semaphore(0)
+        self.value = 0
+        self.retrieved_into = []
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        pass
+
+    def grab(self):
+        return self.frames.acquire(timeout=0.05)
+
+    def retrieve(self, image=None):
+        self.value += 1
+        self.retrieved_into.append(image)
+        if image is None:
+            image = np.empty(SHAPE, dtype=np.uint8)
+        image[:] = self.value
+        return True, image
+
+
+@pytest.fixture
+def capture():
+    source = SteppedSource()
+    capture = FrameCapture(source, buffer_size=4)
+    capture.start()
+    yield capture
+    capture.stop()
+
+
+def step(capture, count=1):
+    for _ in range(count):
+        seq = capture.seq
+        capture.source.frames.release()
+        assert capture.wait_for_frame(seq, timeout=2.0) is not None
+
+
+def test_ring_is_allocated_once_and_filled_in_place(capture):
+    step(capture)
+    ring = capture._ring
+    step(capture, 10)
+    assert capture._ring is ring
+    # After the first frame every retrieve() writes straight into a ring slot
+    targets = capture.source.retrieved_into[1:]
+    assert all(target is not None and np.shares_memory(target, ring) for target in targets)
+
+
+def test_latest_frame_is_a_view_that_the_ring_overwrites(capture):
+    step(capture)
+    view = capture.latest()
+    assert view.seq == 1 and view.image[0, 0, 0] == 1
+    step(capture, capture.buffer_size)
+    # Same slot, newer pixels
+    assert view.image[0, 0, 0] == 1 + capture.buffer_size
+
+
+def test_copy_survives_ring_reuse(capture):
+    step(capture)
+    kept = capture.latest().copy()
+    step(capture, capture.buffer_size * 3)
+    assert kept.seq == 1
+    assert not np.shares_memory(kept.image, capture._ring)
+    assert np.all(kept.image == 1)
+
+
+def test_reader_counts_frames_it_skipped(capture):
+    reader = capture.reader()
+    step(capture)
+    assert reader.read(timeout=1.0).seq == 1
+    step(capture, 3)
+    assert reader.read(timeout=1.0).seq == 4
+    assert reader.get_stats() == {"delivered": 2, "dropped": 2, "duplicates": 0}
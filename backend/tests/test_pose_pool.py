@@ -0,0 +1,174 @@
+import gc
+import threading
+
+import pytest
+
+import camera_processor
+from camera_processor import RealCameraProcessor
+from pose_detection.pose_pool import PosePool
+
+
+class FakePose:
+    """Stands in for a MediaPipe Pose graph; records its complexity"""
+
+    def __init__(self, model_complexity):
+        self.model_complexity = model_complexity
+        self.closed = False
+
+    def process(self, image):
+        return None
+
+    def reset(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePosePool(PosePool):
+    def _build(self, model_complexity):
+        return FakePose(model_complexity)
+
+
+def _run_with_deadline(fn, seconds=5.0):
+    """Run fn in a thread; fail instead of hanging the suite"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome["value"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "call did not return"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome.get("value")
+
+
+def _level_with_complexity(quality, complexity):
+    return next(i for i, level in enumerate(quality.levels) if level.model_complexity == complexity)
+
+
+def test_acquire_times_out_when_exhausted():
+    pool = FakePosePool(size=1, max_size=2)
+    held = [pool.acquire(1), pool.acquire(1)]
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(1, timeout=0.05)
+    with pytest.raises(TimeoutError):
+        pool.acquire(0, timeout=0.05)
+    assert pool.get_stats()["in_use"] == len(held)
+
+
+def test_release_wakes_a_waiting_acquire():
+    pool = FakePosePool(size=1, max_size=1)
+    held = pool.acquire(1)
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+
+    assert pool.acquire(1, timeout=2.0) is held
+
+
+def test_dropped_lease_gives_its_slot_back():
+    pool = FakePosePool(size=1, max_size=1)
+    pool.acquire(1)
+    gc.collect()
+
+    assert pool.get_stats()["in_use"] == 0
+    held = pool.acquire(1, timeout=0.05)
+    assert held is not None
+    assert pool.get_stats()["created"] == 1
+
+
+def test_release_after_reused_id_keeps_accounting():
+    pool = FakePosePool(size=1, max_size=2)
+    pool.acquire(1)
+    gc.collect()
+    held = pool.acquire(1)
+    pool.release(held)
+
+    assert pool.get_stats()["in_use"] == 0
+    assert pool.get_stats()["created"] == 1
+
+
+def test_prewarm_of_another_complexity_is_not_skipped():
+    building = threading.Event()
+    proceed = threading.Event()
+
+    class SlowPool(FakePosePool):
+        def _build(self, model_complexity):
+            if model_complexity == 1:
+                building.set()
+                proceed.wait(5.0)
+            return super()._build(model_complexity)
+
+    pool = SlowPool(size=1, max_size=2)
+    pool.prewarm(model_complexity=1, background=True)
+    assert building.wait(5.0)
+    try:
+        _run_with_deadline(lambda: pool.prewarm(model_complexity=0))
+        assert pool.get_stats()["idle"].get(0) == 1
+    finally:
+        proceed.set()
+
+
+def test_prewarm_builds_idle_instances():
+    pool = FakePosePool(size=2)
+    pool.prewarm()
+
+    assert pool.get_stats()["idle"] == {1: 2}
+    assert pool.acquire(1) is not None
+    assert pool.hits == 1
+
+
+def test_quality_switch_with_every_instance_leased():
+    # The processor holds the pool's only instance: it must give it back
+    # before leasing the other complexity, or it waits on itself forever
+    pool = FakePosePool(size=1, max_size=1)
+    processor = RealCameraProcessor(pose_pool=pool)
+    processor.quality._set_level(_level_with_complexity(processor.quality, 0))
+
+    _run_with_deadline(processor._apply_quality_level)
+
+    assert processor.pose_complexity == 0
+    assert processor.pose.model_complexity == 0
+    assert pool.get_stats()["in_use"] == 1
+    processor.close()
+    assert pool.get_stats()["in_use"] == 0
+
+
+def test_quality_switch_keeps_current_level_on_timeout(monkeypatch):
+    monkeypatch.setattr(camera_processor, "POSE_LEASE_TIMEOUT_S", 0.05)
+    pool = FakePosePool(size=1, max_size=2)
+    processor = RealCameraProcessor(pose_pool=pool)
+    quality = processor.quality
+    start_index = quality.level_index
+    other = pool.acquire(1)
+
+    # Someone else takes our instance the moment it is returned
+    release = pool.release
+    taken = []
+
+    def release_to_other_user(pose):
+        release(pose)
+        if pose is not other:
+            taken.append(pool.acquire(1))
+    monkeypatch.setattr(pool, "release", release_to_other_user)
+
+    quality._set_level(_level_with_complexity(quality, 2))
+    _run_with_deadline(processor._apply_quality_level)
+
+    # Stayed on complexity 1 instead of hanging; no graph to run right now
+    assert quality.level.model_complexity == 1
+    assert quality.level_index == start_index - 2
+    assert processor.pose_complexity == 1
+    assert processor.pose is None
+    assert 2 not in quality.unavailable_complexities
+
+    # Picks a graph up again once one is returned
+    monkeypatch.setattr(pool, "release", release)
+    pool.release(other)
+    _run_with_deadline(processor._apply_quality_level)
+    assert processor.pose.model_complexity == 1
@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+from pose_detection.recording import LandmarkRecorder, LandmarkRecording, LandmarkReplay
+
+
+def _landmarks(i):
+    return np.full((33, 4), i, dtype=np.float32)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "session.lmrec")
+
+
+def test_each_column_is_one_contiguous_array(path):
+    recorder = LandmarkRecorder(path, flush_every=4)
+    for i in range(10):
+        recorder.record(i / 30, i, _landmarks(i), {"form_score": 90 - i, "rep_counts": {"squats": i}})
+    recorder.close()
+
+    recording = LandmarkRecording(path)
+    assert len(recording) == 10
+    assert recording.landmarks.shape == (10, 33, 4) and recording.landmarks.dtype == np.float32
+    assert recording.timestamps.shape == (10,) and recording.timestamps.dtype == np.float64
+    for column in (recording.landmarks, recording.timestamps, recording.angles, recording.form_scores):
+        assert column.flags['C_CONTIGUOUS']
+    assert os.path.getsize(os.path.join(path, "landmarks.bin")) == 10 * 33 * 4 * 4
+    assert np.array_equal(recording.landmarks[:, 0, 0], np.arange(10, dtype=np.float32))
+    assert recording.seqs.tolist() == list(range(10))
+    assert recording.rep_counts[:, recording.exercises.index("squats")].tolist() == list(range(10))
+
+
+def test_frames_without_a_pose(path):
+    recorder = LandmarkRecorder(path)
+    recorder.record(0.0, 1, None, {"unchanged": True})
+    recorder.record(0.1, 2, _landmarks(1))
+    recorder.close()
+
+    recording = LandmarkRecording(path)
+    assert recording.pose_detected.tolist() == [False, True]
+    assert recording.unchanged.tolist() == [True, False]
+    assert np.isnan(recording.landmarks[0]).all()
+
+
+def test_readable_while_being_written(path):
+    recorder = LandmarkRecorder(path, flush_every=4)
+    for i in range(6):
+        recorder.record(i / 30, i, _landmarks(i))
+
+    recording = LandmarkRecording(path)
+    assert len(recording) == 4  # only flushed frames are visible
+
+    recorder.close()
+    assert len(recording.refresh()) == 6
+    replayed = [item.landmarks.seq for item in LandmarkReplay(recording)]
+    assert replayed == list(range(6))
+
+
+def test_rejects_a_directory_that_is_not_a_recording(tmp_path):
+    with pytest.raises(ValueError):
+        LandmarkRecording(str(tmp_path))
@@ -0,0 +1,62 @@
+import numpy as np
+
+from ml_models.rep_engine import RepEngine
+from pose_detection.angles import JOINT_NAMES
+
+
+def _angles(knee, left_hip=170.0, right_hip=170.0):
+    row = np.full(len(JOINT_NAMES), 170.0, dtype=np.float32)
+    row[JOINT_NAMES.index("left_knee")] = knee
+    row[JOINT_NAMES.index("right_knee")] = knee
+    row[JOINT_NAMES.index("left_hip")] = left_hip
+    row[JOINT_NAMES.index("right_hip")] = right_hip
+    return row
+
+
+def test_a_squat_is_not_a_lunge():
+    engine = RepEngine()
+    # Both hips flex alike in a squat
+    engine.update(_angles(90, 95, 100), 0.0)
+    assert engine.update(_angles(170), 1.0) == ["squats"]
+    assert engine.counts() == {"squats": 1, "pushups": 0, "lunges": 0}
+
+
+def test_a_lunge_is_not_a_squat():
+    engine = RepEngine()
+    # Front hip flexed, back hip extended
+    engine.update(_angles(90, 100, 170), 0.0)
+    assert engine.update(_angles(170), 1.0) == ["lunges"]
+    assert engine.counts() == {"squats": 0, "pushups": 0, "lunges": 1}
+
+
+def test_unknown_hip_split_starts_neither():
+    engine = RepEngine()
+    engine.update(_angles(90, np.nan, 170), 0.0)
+    assert engine.update(_angles(170), 1.0) == []
+
+
+def test_reset_clears_a_half_finished_rep():
+    engine = RepEngine()
+    engine.update(_angles(90), 0.0)
+    assert engine.just_entered_down("squats")
+
+    engine.reset()
+
+    assert not engine.just_entered_down("squats")
+    assert engine.get_phase("squats") == "up"
+    # Standing up after the reset is not a rep
+    assert engine.update(_angles(170), 1.0) == []
+    assert engine.counts() == {"squats": 0, "pushups": 0, "lunges": 0}
+
+
+def test_reset_one_exercise_leaves_the_others():
+    engine = RepEngine()
+    row = _angles(90)
+    row[JOINT_NAMES.index("left_elbow")] = row[JOINT_NAMES.index("right_elbow")] = 80
+    engine.update(row, 0.0)
+
+    engine.reset("squats")
+
+    assert not engine.just_entered_down("squats")
+    assert engine.just_entered_down("pushups")
+    assert engine.get_phase("pushups") == "down"
@@ -0,0 +1,91 @@
+from frame_encoder import LADDER, RungSelector
+
+FPS = 15
+# Typical frame sizes of each rung: 50 KB at 'full', halving down the ladder
+FRAME_BYTES = {'full_hq': 80000, 'full': 50000, 'half': 14000, 'half_lq': 7000}
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.ladder = LADDER
+        self.frame_bytes = dict(FRAME_BYTES)
+
+
+class ThrottledWriter:
+    """A link of `rate` bytes/s behind a socket buffer of `buffer` bytes
+
+    write() returns at once while the frame fits in the buffer and blocks
+    until enough of it has drained otherwise, like a blocking socket send.
+    """
+
+    def __init__(self, rate, buffer=256 * 1024):
+        self.rate = rate
+        self.buffer = buffer
+        self.queued = 0.0
+        self.now = 0.0
+
+    def advance(self, seconds):
+        self.queued = max(0.0, self.queued - seconds * self.rate)
+        self.now += seconds
+
+    def write(self, size):
+        """Blocked seconds"""
+        overflow = self.queued + size - self.buffer
+        blocked = overflow / self.rate if overflow > 0 else 0.0
+        self.advance(blocked)
+        self.queued += size
+        return blocked
+
+
+def _stream(selector, writer, seconds):
+    """Send one frame of the selected rung per frame interval, as a stream does"""
+    interval = 1.0 / FPS
+    for _ in range(int(seconds * FPS)):
+        blocked = writer.write(FRAME_BYTES[selector.rung])
+        selector.record(FRAME_BYTES[selector.rung], blocked, now=writer.now)
+        writer.advance(max(0.0, interval - blocked))
+    return selector
+
+
+def test_slow_link_steps_down_despite_buffered_writes():
+    # 1 Mbit/s takes about 8 KB per frame at 15 fps; 'full' sends 50 KB
+    writer = ThrottledWriter(rate=125000)
+    selector = _stream(RungSelector(FakeEncoder(), FPS), writer, seconds=20)
+
+    assert selector.rung == 'half_lq'
+    assert abs(selector.throughput - 125000) < 125000 * 0.2
+
+
+def test_fast_link_never_steps_down():
+    writer = ThrottledWriter(rate=12500000)
+    selector = _stream(RungSelector(FakeEncoder(), FPS), writer, seconds=20)
+
+    # Only ever moves up, once the uncongested link is probed
+    assert selector.rung == 'full_hq'
+    assert selector.switches == 1
+    assert not selector.backlogged
+
+
+def test_recovered_link_is_probed_back_up():
+    writer = ThrottledWriter(rate=125000)
+    selector = _stream(RungSelector(FakeEncoder(), FPS), writer, seconds=20)
+    assert selector.rung == 'half_lq'
+
+    writer.rate = 12500000
+    _stream(selector, writer, seconds=60)
+    assert selector.rung in ('full_hq', 'full')
+
+
+def test_queued_bytes_reveal_a_backlog_before_writes_block():
+    # An asyncio transport buffers without blocking below its high-water mark
+    selector = RungSelector(FakeEncoder(), FPS)
+    rate = 125000
+    queued = 0.0
+    now = 0.0
+    for _ in range(2 * FPS):
+        size = FRAME_BYTES[selector.rung]
+        queued = max(0.0, queued + size - rate / FPS)
+        now += 1.0 / FPS
+        selector.record(size, 0.0, queued_bytes=queued, now=now)
+
+    assert selector.rung == 'half_lq'
@@ -0,0 +1,114 @@
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from workout_store import WorkoutStore, bucket, merge_rollups, owner_key
+
+
+def _ts(day, hour=12):
+    return datetime(2026, 10, day, hour).timestamp()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WorkoutStore(str(tmp_path / "workouts.db"), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def _workout(store, user_id, started_at, reps, final_fatigue=None, end=True):
+    workout_id = store.start_workout(user_id, "s-" + str(user_id), started_at=started_at)
+    for i, (exercise, score, fatigue) in enumerate(reps):
+        store.record_rep(workout_id, exercise, i + 1, form_score=score, fatigue_level=fatigue,
+                         timestamp=started_at + 60 * (i + 1))
+    if end:
+        store.end_workout(workout_id, len(reps), final_fatigue=final_fatigue, ended_at=started_at + 3600)
+    return workout_id
+
+
+def _history(store):
+    # 2026-10-12 is a Monday: days 12..18 are ISO week 42, day 19 starts week 43
+    _workout(store, "alice", _ts(12), [("squats", 80, 10), ("squats", 90, 20), ("pushups", 70, 30)], 35)
+    _workout(store, "alice", _ts(12, 18), [("squats", None, 40)], 45)
+    _workout(store, "alice", _ts(19), [("lunges", 60, 5)], 5)
+    _workout(store, "alice", _ts(20), [("squats", 100, 50)], end=False)  # still open
+    _workout(store, None, _ts(13), [("squats", 50, 15)], 15)
+    store.flush()
+
+
+def _rollup_rows(path):
+    with sqlite3.connect(path) as db:
+        return sorted(db.execute("SELECT * FROM rollups").fetchall())
+
+
+def test_incremental_rollups_match_a_full_rebuild(store):
+    _history(store)
+    incremental = _rollup_rows(store.path)
+
+    with sqlite3.connect(store.path) as db:
+        store._rebuild_rollups(db)
+    assert _rollup_rows(store.path) == incremental
+
+
+def test_totals(store):
+    _history(store)
+    totals = store.totals("alice")
+
+    assert totals["workouts"] == 3  # ended workouts only
+    assert totals["reps"] == 6
+    assert totals["avg_form_score"] == round((80 + 90 + 70 + 60 + 100) / 5, 1)
+    assert totals["peak_fatigue"] == 50
+    assert totals["exercises"]["squats"] == {"workouts": 0, "reps": 4, "avg_form_score": 90.0, "peak_fatigue": 50}
+    assert totals["exercises"]["pushups"]["reps"] == 1
+    assert store.totals(session_id="s-None")["reps"] == 1
+    assert store.totals("nobody") == {"workouts": 0, "reps": 0, "avg_form_score": None, "peak_fatigue": None,
+                                      "exercises": {}}
+
+
+def test_day_and_week_buckets(store):
+    _history(store)
+
+    days = store.rollups("alice", granularity="day")
+    assert [(d["bucket"], d["workouts"], d["reps"]) for d in days] == [
+        ("2026-10-12", 2, 4), ("2026-10-19", 1, 1), ("2026-10-20", 0, 1)
+    ]
+    assert days[0]["exercises"]["squats"]["reps"] == 3
+    assert days[0]["peak_fatigue"] == 45
+
+    weeks = store.rollups("alice", granularity="week")
+    assert [(w["bucket"], w["workouts"], w["reps"]) for w in weeks] == [("2026-W42", 2, 4), ("2026-W43", 1, 2)]
+
+
+def test_bucket_range_and_exercise_filter(store):
+    _history(store)
+
+    # start and end are inclusive
+    days = store.rollups("alice", granularity="day", start="2026-10-19", end="2026-10-20")
+    assert [d["bucket"] for d in days] == ["2026-10-19", "2026-10-20"]
+    assert store.rollups("alice", granularity="day", start="2026-10-13", end="2026-10-18") == []
+
+    squats = store.rollups("alice", granularity="week", exercise="squats")
+    assert [(w["bucket"], w["reps"], w["avg_form_score"]) for w in squats] == [
+        ("2026-W42", 3, 85.0), ("2026-W43", 1, 100.0)
+    ]
+    assert "exercises" not in squats[0]
+
+    with pytest.raises(ValueError):
+        store.rollups("alice", granularity="year")
+
+
+def test_merge_rollups_folds_deltas_per_key():
+    owner = owner_key("alice")
+    rows = merge_rollups([
+        (owner, _ts(12), "squats", 0, 1, 80.0, 1, 10.0),
+        (owner, _ts(12, 18), "squats", 0, 1, 0.0, 0, None),
+        (owner, _ts(12), "", 1, 0, 0.0, 0, 30.0),
+    ])
+    by_key = {row[:4]: row[4:] for row in rows}
+
+    assert bucket("week", _ts(12)) == "2026-W42"
+    assert by_key[(owner, "day", "2026-10-12", "squats")] == (0, 2, 80.0, 1, 10.0)
+    assert by_key[(owner, "all", "", "")] == (1, 2, 80.0, 1, 30.0)
+    assert (owner, "day", "2026-10-12", "") in by_key
+    assert len(rows) == 3 * 2
@@ -0,0 +1,100 @@
+import os
+import tempfile
+
+import pytest
+
+from workout_store import WorkoutStore
+
+T0 = 1_760_000_000.0  # fixed timestamps keep the rows predictable
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = WorkoutStore(str(tmp_path / "workouts.db"), flush_interval=0.01)
+    yield store
+    store.close()
+
+
+def _workout(store, user_id=None, session_id="s1", reps=(("squats", 80),), started_at=T0):
+    workout_id = store.start_workout(user_id, session_id, started_at=started_at)
+    counts = {}
+    for i, (exercise, score) in enumerate(reps):
+        counts[exercise] = counts.get(exercise, 0) + 1
+        store.record_rep(workout_id, exercise, counts[exercise], form_score=score, fatigue_level=10.0 + i,
+                         timestamp=started_at + i + 1)
+    store.end_workout(workout_id, len(reps), final_fatigue=20.0, ended_at=started_at + len(reps) + 1)
+    return workout_id
+
+
+def test_workout_sets_and_reps_are_saved(store):
+    reps = (("squats", 80), ("squats", 90), ("pushups", 70), ("pushups", None), ("squats", 60))
+    workout_id = _workout(store, "alice", reps=reps)
+    store.flush()
+
+    workout = store.get_workout(workout_id, "alice")
+    assert workout["user_id"] == "alice"
+    assert workout["total_reps"] == 5
+    assert workout["final_fatigue"] == 20.0
+    assert [(s["exercise"], s["position"], s["reps"], s["avg_form_score"]) for s in workout["sets"]] == [
+        ("squats", 1, 2, 85.0), ("pushups", 2, 2, 70.0), ("squats", 3, 1, 60.0)
+    ]
+    assert [(r["exercise"], r["rep_number"], r["form_score"]) for r in workout["reps"]] == [
+        ("squats", 1, 80.0), ("squats", 2, 90.0), ("pushups", 1, 70.0), ("pushups", 2, None), ("squats", 3, 60.0)
+    ]
+    assert store.get_stats()["open_workouts"] == 0
+
+
+def test_reps_after_the_end_are_ignored(store):
+    workout_id = _workout(store)
+    assert store.record_rep(workout_id, "squats", 2) is None
+    store.flush()
+    assert len(store.get_workout(workout_id, session_id="s1")["reps"]) == 1
+
+
+def test_get_workout_only_returns_the_owners(store):
+    users = _workout(store, "alice", session_id="s1")
+    anonymous = _workout(store, None, session_id="s2")
+    store.flush()
+
+    assert store.get_workout(users, "alice") is not None
+    assert store.get_workout(users, "bob") is None
+    assert store.get_workout(users, session_id="s2") is None
+    assert store.get_workout(anonymous, session_id="s2") is not None
+    assert store.get_workout(anonymous, session_id="s1") is None
+    assert store.get_workout(anonymous, "alice") is None
+
+
+def test_recent_workouts_newest_first_with_limit(store):
+    ids = [_workout(store, "alice", started_at=T0 + i * 3600) for i in range(3)]
+    _workout(store, "bob")
+    store.flush()
+
+    assert [w["id"] for w in store.recent_workouts("alice")] == ids[::-1]
+    assert [w["id"] for w in store.recent_workouts("alice", limit=2)] == ids[:0:-1]
+
+
+class TestWorkoutEndpoints:
+    @pytest.fixture
+    def client(self, store, monkeypatch):
+        os.environ.setdefault("WORKOUT_DB", os.path.join(tempfile.mkdtemp(), "workouts.db"))
+        import app
+        monkeypatch.setattr(app, "workout_store", store)
+        return app.app.test_client()
+
+    def test_limit_is_clamped(self, client, store):
+        for i in range(3):
+            _workout(store, "alice", started_at=T0 + i)
+        store.flush()
+        headers = {"X-User-ID": "alice"}
+
+        for limit, expected in ((0, 1), (-1, 1), (2, 2), (10_000, 3)):
+            response = client.get(f"/api/workouts?limit={limit}", headers=headers)
+            assert len(response.get_json()["workouts"]) == expected, limit
+
+    def test_other_users_workouts_are_not_found(self, client, store):
+        workout_id = _workout(store, "alice")
+        store.flush()
+
+        assert client.get(f"/api/workouts/{workout_id}", headers={"X-User-ID": "alice"}).status_code == 200
+        assert client.get(f"/api/workouts/{workout_id}", headers={"X-User-ID": "bob"}).status_code == 404
+        assert client.get(f"/api/workouts/{workout_id}").status_code == 404
@@ -0,0 +1,239 @@
+import cv2
+import numpy as np
+import os
+import time
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class VideoSource:
+    """Frame source with a cv2.VideoCapture-like interface
+
+    Sources work with FrameCapture (grab/retrieve) and with plain read()
+    loops. timestamp is the media time in seconds of the last frame read,
+    so offline analysis does not depend on wall-clock time.
+    """
+    is_live = False
+
+    def __init__(self, fps=30.0):
+        self.fps = fps
+        self.frame_index = -1
+        self.timestamp = 0.0
+        self._pending = None
+
+    def isOpened(self):
+        return True
+
+    def _next_frame(self):
+        """Return the next frame, or None when the source is exhausted"""
+        raise NotImplementedError
+
+    def read(self):
+        frame = self._next_frame()
+        if frame is None:
+            return False, None
+        self.frame_index += 1
+        self.timestamp = self.frame_index / self.fps
+        return True, frame
+
+    def grab(self):
+        ret, self._pending = self.read()
+        return ret
+
+    def retrieve(self, image=None):
+        frame, self._pending = self._pending, None
+        if frame is None:
+            return False, None
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def set(self, prop, value):
+        return False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        return 0.0
+
+    def release(self):
+        pass
+
+    def describe(self):
+        return {"type": type(self).__name__, "fps": self.fps, "live": self.is_live}
+
+
+class CameraSource(VideoSource):
+    """Live webcam; falls back to other camera ids if the first cannot open"""
+    is_live = True
+
+    def __init__(self, camera_id=0, fallback_ids=(1, 2, 3), width=640, height=480, fps=30):
+        super().__init__(fps)
+        self.camera_id = camera_id
+        self.capture = cv2.VideoCapture(camera_id)
+        if not self.capture.isOpened():
+            for alt_id in fallback_ids:
+                self.capture = cv2.VideoCapture(alt_id)
+                if self.capture.isOpened():
+                    self.camera_id = alt_id
+                    break
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.capture.set(cv2.CAP_PROP_FPS, fps)
+        self._started = time.monotonic()
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        ret, frame = self.capture.read()
+        if ret:
+            self.frame_index += 1
+            self.timestamp = time.monotonic() - self._started
+        return ret, frame
+
+    def grab(self):
+        ret = self.capture.grab()
+        if ret:
+            self.frame_index += 1
+            self.timestamp = time.monotonic() - self._started
+        return ret
+
+    def retrieve(self, image=None):
+        return self.capture.retrieve(image)
+
+    def set(self, prop, value):
+        return self.capture.set(prop, value)
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+    def release(self):
+        self.capture.release()
+
+    def describe(self):
+        return {**super().describe(), "camera_id": self.camera_id}
+
+
+class VideoFileSource(VideoSource):
+    """Recorded video file, decoded as fast as the caller reads it"""
+
+    def __init__(self, path):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        super().__init__(self.capture.get(cv2.CAP_PROP_FPS) or 30.0)
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def _media_time(self):
+        position_ms = self.capture.get(cv2.CAP_PROP_POS_MSEC)
+        return position_ms / 1000.0 if position_ms > 0 else self.frame_index / self.fps
+
+    def read(self):
+        ret, frame = self.capture.read()
+        if ret:
+            self.frame_index += 1
+            self.timestamp = self._media_time()
+        return ret, frame
+
+    def grab(self):
+        ret = self.capture.grab()
+        if ret:
+            self.frame_index += 1
+            self.timestamp = self._media_time()
+        return ret
+
+    def retrieve(self, image=None):
+        return self.capture.retrieve(image)
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+    def release(self):
+        self.capture.release()
+
+    def describe(self):
+        return {**super().describe(), "path": self.path, "frame_count": self.frame_count}
+
+
+class ImageDirectorySource(VideoSource):
+    """Directory of still images played back in name order at a nominal fps"""
+
+    def __init__(self, path, fps=30.0):
+        super().__init__(fps)
+        self.path = path
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+
+    def isOpened(self):
+        return self.frame_index + 1 < len(self.files)
+
+    def _next_frame(self):
+        while self.frame_index + 1 < len(self.files):
+            frame = cv2.imread(self.files[self.frame_index + 1])
+            if frame is not None:
+                return frame
+            self.frame_index += 1  # skip unreadable images
+        return None
+
+    def describe(self):
+        return {**super().describe(), "path": self.path, "frame_count": len(self.files)}
+
+
+class SyntheticSource(VideoSource):
+    """Generated frames (moving block over a gradient) for testing without a camera"""
+
+    def __init__(self, width=640, height=480, fps=30.0, num_frames=None, realtime=False):
+        super().__init__(fps)
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self.realtime = realtime
+        gradient = np.linspace(40, 200, width, dtype=np.uint8)
+        self._background = np.repeat(np.tile(gradient, (height, 1))[:, :, None], 3, axis=2)
+        self._next_due = None
+
+    def isOpened(self):
+        return self.num_frames is None or self.frame_index + 1 < self.num_frames
+
+    def _next_frame(self):
+        if not self.isOpened():
+            return None
+        if self.realtime:
+            # Pace like a camera would
+            now = time.monotonic()
+            if self._next_due is not None and now < self._next_due:
+                time.sleep(self._next_due - now)
+            self._next_due = max(now, self._next_due or now) + 1.0 / self.fps
+        frame = self._background.copy()
+        t = (self.frame_index + 1) / self.fps
+        box = self.height // 4
+        x = int((self.width - box) * (0.5 + 0.5 * np.sin(t)))
+        y = int((self.height - box) * (0.5 + 0.5 * np.cos(t * 0.7)))
+        frame[y:y + box, x:x + box] = (0, 180, 255)
+        return frame
+
+    def describe(self):
+        return {**super().describe(), "size": f"{self.width}x{self.height}", "frame_count": self.num_frames}
+
+
+def open_source(spec, **kwargs):
+    """Open a source from a spec: 'camera[:id]', 'synthetic', a video file or an image directory"""
+    if isinstance(spec, int):
+        return CameraSource(spec, **kwargs)
+    if spec == 'camera' or spec.startswith('camera:'):
+        camera_id = int(spec.split(':', 1)[1]) if ':' in spec else 0
+        return CameraSource(camera_id, **kwargs)
+    if spec == 'synthetic':
+        return SyntheticSource(**kwargs)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, **kwargs)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec)
+    raise ValueError(f"Unknown video source: {spec}")
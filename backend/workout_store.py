@@ -0,0 +1,464 @@
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+SCHEMA_VERSION = 2  # 2: rollups
+GRANULARITIES = ('all', 'day', 'week')
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workouts (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    session_id TEXT,
+    date TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    total_reps INTEGER NOT NULL DEFAULT 0,
+    final_fatigue REAL
+);
+CREATE INDEX IF NOT EXISTS idx_workouts_user ON workouts (user_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_workouts_user_date ON workouts (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_workouts_session ON workouts (session_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_workouts_date ON workouts (date);
+
+CREATE TABLE IF NOT EXISTS sets (
+    id TEXT PRIMARY KEY,
+    workout_id TEXT NOT NULL REFERENCES workouts (id),
+    exercise TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    reps INTEGER NOT NULL DEFAULT 0,
+    avg_form_score REAL,
+    started_at REAL NOT NULL,
+    ended_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_sets_workout ON sets (workout_id, position);
+
+CREATE TABLE IF NOT EXISTS reps (
+    id INTEGER PRIMARY KEY,
+    workout_id TEXT NOT NULL REFERENCES workouts (id),
+    set_id TEXT NOT NULL REFERENCES sets (id),
+    exercise TEXT NOT NULL,
+    rep_number INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    form_score REAL,
+    fatigue_level REAL
+);
+CREATE INDEX IF NOT EXISTS idx_reps_workout ON reps (workout_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_reps_set ON reps (set_id);
+
+-- Aggregates kept up to date by the writer in the same transaction as the
+-- rows they summarize. owner is "user:<id>" or "session:<id>"; bucket is ''
+-- for period 'all', else a day (2026-10-17) or ISO week (2026-W42);
+-- exercise '' holds every exercise together.
+CREATE TABLE IF NOT EXISTS rollups (
+    owner TEXT NOT NULL,
+    period TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    workouts INTEGER NOT NULL DEFAULT 0,
+    reps INTEGER NOT NULL DEFAULT 0,
+    form_score_sum REAL NOT NULL DEFAULT 0,
+    form_scores INTEGER NOT NULL DEFAULT 0,
+    peak_fatigue REAL,
+    PRIMARY KEY (owner, period, bucket, exercise)
+) WITHOUT ROWID;
+"""
+
+INSERT_WORKOUT = "INSERT INTO workouts (id, user_id, session_id, date, started_at) VALUES (?, ?, ?, ?, ?)"
+END_WORKOUT = "UPDATE workouts SET ended_at = ?, total_reps = ?, final_fatigue = ? WHERE id = ?"
+UPSERT_SET = """
+INSERT INTO sets (id, workout_id, exercise, position, reps, avg_form_score, started_at, ended_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET reps = excluded.reps, avg_form_score = excluded.avg_form_score,
+                               ended_at = excluded.ended_at
+"""
+INSERT_REP = """
+INSERT INTO reps (workout_id, set_id, exercise, rep_number, timestamp, form_score, fatigue_level)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO rollups (owner, period, bucket, exercise, workouts, reps, form_score_sum, form_scores, peak_fatigue)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (owner, period, bucket, exercise) DO UPDATE SET
+    workouts = workouts + excluded.workouts,
+    reps = reps + excluded.reps,
+    form_score_sum = form_score_sum + excluded.form_score_sum,
+    form_scores = form_scores + excluded.form_scores,
+    peak_fatigue = MAX(COALESCE(peak_fatigue, excluded.peak_fatigue), COALESCE(excluded.peak_fatigue, peak_fatigue))
+"""
+# Queued like a statement, but merged per batch and written as UPSERT_ROLLUP rows
+ROLLUP = 'rollup'
+
+_STOP = object()
+
+
+def owner_key(user_id=None, session_id=None):
+    """Rollup owner: the user if known, else the session"""
+    return f"user:{user_id}" if user_id else f"session:{session_id}"
+
+
+def bucket(period, when):
+    """Rollup bucket of a timestamp or date for a granularity"""
+    if period == 'all':
+        return ''
+    if isinstance(when, (int, float)):
+        when = datetime.fromtimestamp(when)
+    if period == 'day':
+        return when.strftime("%Y-%m-%d")
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def merge_rollups(deltas):
+    """Fold (owner, timestamp, exercise, workouts, reps, form_sum, form_count, fatigue)
+    deltas into one row per rollup key"""
+    merged = {}
+    for owner, timestamp, exercise, workouts, reps, form_sum, form_count, fatigue in deltas:
+        when = datetime.fromtimestamp(timestamp)
+        for period in GRANULARITIES:
+            key_bucket = bucket(period, when)
+            for name in ((exercise, '') if exercise else ('',)):
+                key = (owner, period, key_bucket, name)
+                row = merged.get(key)
+                if row is None:
+                    merged[key] = [workouts, reps, form_sum, form_count, fatigue]
+                    continue
+                row[0] += workouts
+                row[1] += reps
+                row[2] += form_sum
+                row[3] += form_count
+                if fatigue is not None and (row[4] is None or fatigue > row[4]):
+                    row[4] = fatigue
+    return [key + tuple(row) for key, row in merged.items()]
+
+
+class _ActiveWorkout:
+    """In-memory state of a workout between start and end"""
+    __slots__ = ('owner', 'started_at', 'sets', 'open_set')
+
+    def __init__(self, owner, started_at):
+        self.owner = owner
+        self.started_at = started_at
+        self.sets = 0
+        self.open_set = None
+
+
+class _OpenSet:
+    """Running totals of the set a workout is currently in"""
+    __slots__ = ('set_id', 'exercise', 'position', 'reps', 'score_sum', 'scored', 'started_at')
+
+    def __init__(self, set_id, exercise, position, started_at):
+        self.set_id = set_id
+        self.exercise = exercise
+        self.position = position
+        self.reps = 0
+        self.score_sum = 0.0
+        self.scored = 0
+        self.started_at = started_at
+
+    @property
+    def avg_form_score(self):
+        return round(self.score_sum / self.scored, 1) if self.scored else None
+
+
+class WorkoutStore:
+    """SQLite store for workouts, their sets and per-rep records
+
+    Writes never touch the disk on the caller's thread: they are queued and
+    a background writer commits them in batches (up to `batch_size` writes per
+    transaction, at least every `flush_interval` seconds). Ids are made
+    here, so callers get them back immediately. The queue is bounded; if
+    the disk falls that far behind, further writes are dropped and counted
+    rather than growing memory. Reads use a per-thread connection and see
+    writes once the writer has committed them.
+
+    Totals and daily/weekly rollups (reps, workouts, average form score,
+    peak fatigue; overall and per exercise) are updated by the writer in the
+    same transaction as the reps and workouts they count, so stats() costs
+    a primary-key lookup however long the history is.
+    """
+
+    def __init__(self, path, flush_interval=0.25, batch_size=500, max_pending=10000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._active = {}  # workout id -> _ActiveWorkout
+
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0  # queue full
+        self.failed = 0  # statements in batches that failed to commit
+        self.write_time_s = 0.0
+
+        with sqlite3.connect(path) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            version = db.execute("PRAGMA user_version").fetchone()[0]
+            db.executescript(SCHEMA)
+            if version < 2:
+                self._rebuild_rollups(db)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        self._writer = threading.Thread(target=self._write_loop, name='workout-store-writer', daemon=True)
+        self._writer.start()
+
+    # ---------- write path (never blocks on disk) ----------
+
+    def _enqueue(self, *writes):
+        """Queue (sql, params) writes that are committed, or dropped, together"""
+        try:
+            self._queue.put_nowait(writes)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped == 1 or self.dropped % 10000 == 0:
+                print(f"⚠️ Workout store is behind, dropped {self.dropped} writes")
+
+    def start_workout(self, user_id=None, session_id=None, started_at=None):
+        """Open a workout; returns its id"""
+        started_at = started_at or time.time()
+        workout_id = uuid.uuid4().hex
+        date = datetime.fromtimestamp(started_at).strftime("%Y-%m-%d")
+        with self._lock:
+            self._active[workout_id] = _ActiveWorkout(owner_key(user_id, session_id), started_at)
+        self._enqueue((INSERT_WORKOUT, (workout_id, user_id, session_id, date, started_at)))
+        return workout_id
+
+    def record_rep(self, workout_id, exercise, rep_number, form_score=None, fatigue_level=None, timestamp=None):
+        """Record one completed rep; consecutive reps of an exercise form a set"""
+        timestamp = timestamp or time.time()
+        with self._lock:
+            workout = self._active.get(workout_id)
+            if workout is None:
+                return None  # workout already ended
+            current = workout.open_set
+            if current is None or current.exercise != exercise:
+                workout.sets += 1
+                current = workout.open_set = _OpenSet(uuid.uuid4().hex, exercise, workout.sets, timestamp)
+            current.reps += 1
+            if form_score is not None:
+                current.score_sum += form_score
+                current.scored += 1
+            set_row = (current.set_id, workout_id, exercise, current.position, current.reps,
+                       current.avg_form_score, current.started_at, timestamp)
+        self._enqueue(
+            (UPSERT_SET, set_row),
+            (INSERT_REP, (workout_id, current.set_id, exercise, rep_number, timestamp, form_score, fatigue_level)),
+            (ROLLUP, (workout.owner, timestamp, exercise, 0, 1, form_score or 0.0,
+                      int(form_score is not None), fatigue_level))
+        )
+        return current.set_id
+
+    def end_workout(self, workout_id, total_reps, final_fatigue=None, ended_at=None):
+        """Close a workout and forget its in-memory set state"""
+        with self._lock:
+            workout = self._active.pop(workout_id, None)
+        writes = [(END_WORKOUT, (ended_at or time.time(), total_reps, final_fatigue, workout_id))]
+        if workout is not None:
+            writes.append((ROLLUP, (workout.owner, workout.started_at, '', 1, 0, 0.0, 0, final_fatigue)))
+        self._enqueue(*writes)
+
+    # ---------- background writer ----------
+
+    def _write_loop(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA synchronous=NORMAL")
+        try:
+            while True:
+                item = self._queue.get()
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while item is not _STOP and len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                stop = batch[-1] is _STOP
+                writes = [write for item in batch if item is not _STOP for write in item]
+                if writes:
+                    self._commit(db, writes)
+                for _ in batch:
+                    self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            db.close()
+
+    def _commit(self, db, writes):
+        start = time.perf_counter()
+        # A set's row is re-upserted on every rep; only its latest state needs writing
+        latest_set = {params[0]: i for i, (sql, params) in enumerate(writes) if sql is UPSERT_SET}
+        rows = [write for i, write in enumerate(writes)
+                if write[0] is not ROLLUP and (write[0] is not UPSERT_SET or latest_set[write[1][0]] == i)]
+        rows.extend((UPSERT_ROLLUP, row) for row in merge_rollups(params for sql, params in writes if sql is ROLLUP))
+        try:
+            with db:
+                # Runs of the same statement go through executemany
+                run_sql, run = None, []
+                for sql, params in rows:
+                    if sql != run_sql and run:
+                        db.executemany(run_sql, run)
+                        run = []
+                    run_sql = sql
+                    run.append(params)
+                if run:
+                    db.executemany(run_sql, run)
+            self.written += len(writes)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.failed += len(writes)
+            print(f"❌ Workout store write failed ({len(writes)} writes lost): {e}")
+        self.write_time_s += time.perf_counter() - start
+
+    def _rebuild_rollups(self, db):
+        """Recompute every rollup from the reps and workouts tables"""
+        owner = "CASE WHEN w.user_id IS NOT NULL AND w.user_id != '' THEN 'user:' || w.user_id " \
+                "ELSE 'session:' || w.session_id END"
+        reps = db.execute(
+            f"SELECT {owner}, r.timestamp, r.exercise, 0, 1, COALESCE(r.form_score, 0), "
+            f"r.form_score IS NOT NULL, r.fatigue_level FROM reps r JOIN workouts w ON w.id = r.workout_id"
+        )
+        rows = merge_rollups(reps)
+        ended = db.execute(
+            f"SELECT {owner}, w.started_at, '', 1, 0, 0.0, 0, w.final_fatigue FROM workouts w "
+            f"WHERE w.ended_at IS NOT NULL"
+        )
+        rows += merge_rollups(ended)
+        db.execute("DELETE FROM rollups")
+        db.executemany(UPSERT_ROLLUP, rows)
+        if rows:
+            count = db.execute("SELECT COUNT(*) FROM rollups").fetchone()[0]
+            print(f"🗄️ Rebuilt {count} workout rollups")
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is committed (for shutdown and tools)"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """Commit pending writes and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    # ---------- reads ----------
+
+    def _reader(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path)
+            db.row_factory = sqlite3.Row
+        return db
+
+    @staticmethod
+    def _owner_filter(user_id, session_id):
+        if user_id:
+            return "user_id = ?", (user_id,)
+        return "session_id = ?", (session_id,)
+
+    def recent_workouts(self, user_id=None, session_id=None, limit=20):
+        """Newest workouts of a user (or, without one, of a session)"""
+        where, params = self._owner_filter(user_id, session_id)
+        rows = self._reader().execute(
+            f"SELECT * FROM workouts WHERE {where} ORDER BY started_at DESC LIMIT ?", params + (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_workout(self, workout_id, user_id=None, session_id=None):
+        """One workout of a user (or, without one, of a session) with its sets and reps, or None"""
+        where, params = self._owner_filter(user_id, session_id)
+        db = self._reader()
+        workout = db.execute(f"SELECT * FROM workouts WHERE id = ? AND {where}", (workout_id,) + params).fetchone()
+        if workout is None:
+            return None
+        sets = db.execute("SELECT * FROM sets WHERE workout_id = ? ORDER BY position", (workout_id,)).fetchall()
+        reps = db.execute("SELECT exercise, set_id, rep_number, timestamp, form_score, fatigue_level "
+                          "FROM reps WHERE workout_id = ? ORDER BY timestamp", (workout_id,)).fetchall()
+        return {**dict(workout), "sets": [dict(row) for row in sets], "reps": [dict(row) for row in reps]}
+
+    @staticmethod
+    def _rollup_dict(row):
+        return {
+            "workouts": row["workouts"],
+            "reps": row["reps"],
+            "avg_form_score": round(row["form_score_sum"] / row["form_scores"], 1) if row["form_scores"] else None,
+            "peak_fatigue": row["peak_fatigue"]
+        }
+
+    def totals(self, user_id=None, session_id=None):
+        """All-time rollup of a user (or session): completed workouts, saved reps,
+        average form score, peak fatigue and the same per exercise"""
+        rows = self._reader().execute(
+            "SELECT * FROM rollups WHERE owner = ? AND period = 'all' AND bucket = ''",
+            (owner_key(user_id, session_id),)
+        ).fetchall()
+        totals = {"workouts": 0, "reps": 0, "avg_form_score": None, "peak_fatigue": None, "exercises": {}}
+        for row in rows:
+            if row["exercise"]:
+                totals["exercises"][row["exercise"]] = self._rollup_dict(row)
+            else:
+                totals.update(self._rollup_dict(row))
+        return totals
+
+    def rollups(self, user_id=None, session_id=None, granularity='day', start=None, end=None, exercise=None):
+        """Rollup buckets of a user (or session), oldest first
+
+        granularity is 'day', 'week' or 'all'; start and end are inclusive
+        dates (datetime.date or 'YYYY-MM-DD'). Each bucket has the totals
+        over every exercise plus a per-exercise breakdown, or just the one
+        exercise if given.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity '{granularity}' (use {', '.join(GRANULARITIES)})")
+        if isinstance(start, str):
+            start = datetime.strptime(start, "%Y-%m-%d")
+        if isinstance(end, str):
+            end = datetime.strptime(end, "%Y-%m-%d")
+        sql = "SELECT * FROM rollups WHERE owner = ? AND period = ?"
+        params = [owner_key(user_id, session_id), granularity]
+        if start is not None and granularity != 'all':
+            sql += " AND bucket >= ?"
+            params.append(bucket(granularity, start))
+        if end is not None and granularity != 'all':
+            sql += " AND bucket <= ?"
+            params.append(bucket(granularity, end))
+        if exercise:
+            sql += " AND exercise = ?"
+            params.append(exercise)
+        buckets = {}
+        for row in self._reader().execute(sql + " ORDER BY bucket", params):
+            entry = buckets.setdefault(row["bucket"], {"bucket": row["bucket"]})
+            if exercise:
+                entry.update(self._rollup_dict(row))
+            elif row["exercise"]:
+                entry.setdefault("exercises", {})[row["exercise"]] = self._rollup_dict(row)
+            else:
+                entry.update(self._rollup_dict(row))
+        return list(buckets.values())
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "open_workouts": len(self._active),
+            "avg_batch_ms": round(self.write_time_s / self.batches * 1000, 2) if self.batches else 0.0
+        }